@@ -0,0 +1,136 @@
+import sys
+from bisect import bisect_right
+from itertools import permutations
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+from .Material import Material
+from .Exchange import Exchange, MaterialExchange
+from .OrderBook import matchBooks
+
+if TYPE_CHECKING:
+	from .ExchangeSnapshot import ExchangeSnapshot
+
+
+class ArbitrageOpportunity:
+	"""
+	Buying a material on one exchange and selling it on another, using the full depth of both books
+	Prices, profits and costs are in the currency `exchangeRates` are relative to, so exchanges with different currencies can be compared
+	"""
+
+	def __init__(self, buyExchange: MaterialExchange, sellExchange: MaterialExchange, maxQuantity: Optional[int] = None, exchangeRates: dict[str, float] = None):
+		"""
+		:param maxQuantity: The most items to trade, `None` trades everything up to market maker to market maker, which never runs out (see `isUnlimited`)
+		:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+		"""
+		self.buyExchange = buyExchange
+		self.sellExchange = sellExchange
+		exchangeRates = {} if exchangeRates is None else exchangeRates
+		askRate, bidRate = exchangeRates.get(buyExchange.currency, 1), exchangeRates.get(sellExchange.currency, 1)
+		askBook, bidBook = buyExchange.askBook, sellExchange.bidBook
+		# If it would still be profitable once only the market makers are left, there is no end to it
+		self.isUnlimited = False
+		# Breakpoints of the profit curve, `quantities[i]` items makes `profits[i]` profit, it's linear between them
+		self.quantities: list[int] = [0]
+		self.profits: list[float] = [0.0]
+		self.costs: list[float] = [0.0]
+		# Each stretch is less profitable than the last, so the first unprofitable one (once converted) is where it ends
+		for itemCount, askPrice, bidPrice, askOrder, bidOrder in matchBooks(askBook, bidBook, sys.maxsize if maxQuantity is None else maxQuantity, stopIfUnprofitable=False):
+			askPrice, bidPrice = askPrice * askRate, bidPrice * bidRate
+			if bidPrice <= askPrice:
+				break
+			if maxQuantity is None and askOrder is askBook.unlimitedOrder and bidOrder is bidBook.unlimitedOrder:
+				self.isUnlimited = True
+				break
+			self.quantities.append(self.quantities[-1] + itemCount)
+			self.profits.append(self.profits[-1] + itemCount * (bidPrice - askPrice))
+			self.costs.append(self.costs[-1] + itemCount * askPrice)
+
+	def __repr__(self):
+		return f"<ArbitrageOpportunity `{self.material.ticker}` {self.buyExchangeCode} -> {self.sellExchangeCode} {self.quantity}x for {self.profit:.2f}>"
+
+	@property
+	def material(self) -> Material:
+		return self.buyExchange.material
+
+	@property
+	def buyExchangeCode(self):
+		return self.buyExchange.exchangeCode
+
+	@property
+	def sellExchangeCode(self):
+		return self.sellExchange.exchangeCode
+
+	@property
+	def profitPerUnit(self) -> float:
+		"""Profit of the first item, only using the top of each book"""
+		if len(self.quantities) <= 1:
+			return 0.0
+		return (self.profits[1] - self.profits[0]) / (self.quantities[1] - self.quantities[0])
+
+	@property
+	def quantity(self) -> int:
+		"""The amount of items that can be traded before it stops being profitable"""
+		return self.quantities[-1]
+
+	@property
+	def profit(self) -> float:
+		"""The profit of trading all of `quantity`"""
+		return self.profits[-1]
+
+	@property
+	def cost(self) -> float:
+		"""The amount needed to buy all of `quantity`"""
+		return self.costs[-1]
+
+	def _interpolate(self, values: list[float], quantity: int):
+		quantity = min(max(quantity, 0), self.quantity)
+		i = bisect_right(self.quantities, quantity) - 1
+		if i >= len(self.quantities) - 1:
+			return values[-1]
+		t = (quantity - self.quantities[i]) / (self.quantities[i+1] - self.quantities[i])
+		return values[i] + (values[i+1] - values[i]) * t
+
+	def profitFor(self, quantity: int) -> float:
+		"""The profit of trading `quantity` items, anything past `quantity` isn't traded as it wouldn't be profitable"""
+		return self._interpolate(self.profits, quantity)
+
+	def costFor(self, quantity: int) -> float:
+		"""The amount needed to buy `quantity` items, capped the same way as `profitFor()`"""
+		return self._interpolate(self.costs, quantity)
+
+
+def findArbitrage(
+		snapshot: "ExchangeSnapshot", exchanges: Iterable[Union[Exchange, str]] = None, maxQuantity: Optional[int] = None, exchangeRates: dict[str, float] = None
+) -> list[ArbitrageOpportunity]:
+	"""
+	Every profitable material across every ordered pair of exchanges, in one pass over the snapshot
+	:param exchanges: Only look at trades between these exchanges, defaults to all of them
+	:param maxQuantity: The most items of a material to consider trading, by default market maker to market maker trades (which never run out) are left out
+	:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+	:return: Sorted by profit, most profitable first
+	"""
+	exchangeRates = {} if exchangeRates is None else exchangeRates
+	if exchanges is None:
+		exchangeCodes = snapshot.exchangeCodes
+	else:
+		exchangeCodes = [exchange.comexCode if isinstance(exchange, Exchange) else exchange for exchange in exchanges]
+	opportunities = []
+	for material in snapshot.materials:
+		materialExchanges = snapshot.getMaterialExchanges(material)
+		for buyCode, sellCode in permutations(exchangeCodes, 2):
+			buyExchange = materialExchanges.get(buyCode, None)
+			sellExchange = materialExchanges.get(sellCode, None)
+			if buyExchange is None or sellExchange is None:
+				continue
+			# Top of book is enough to rule out most pairs, the order books are only built for the pairs that are left
+			sellingOrders, buyingOrders = buyExchange.sellingOrders, sellExchange.buyingOrders
+			if len(sellingOrders) <= 0 or len(buyingOrders) <= 0:
+				continue
+			if buyingOrders[0].itemCost * exchangeRates.get(sellExchange.currency, 1) <= sellingOrders[-1].itemCost * exchangeRates.get(buyExchange.currency, 1):
+				continue
+			opportunity = ArbitrageOpportunity(buyExchange, sellExchange, maxQuantity, exchangeRates)
+			if opportunity.quantity > 0:
+				opportunities.append(opportunity)
+	opportunities.sort(key=lambda opportunity: opportunity.profit, reverse=True)
+	return opportunities
+
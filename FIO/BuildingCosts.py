@@ -0,0 +1,189 @@
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+import numpy as np
+
+from .Material import Material
+from .Building import Building
+from .Exchange import Exchange
+from .Planet import Planet, additionalBuildMaterials
+
+if TYPE_CHECKING:
+	from .ExchangeSnapshot import ExchangeSnapshot
+	from .OrderBook import OrderBook
+	from .PlanetTable import PlanetTable
+
+
+def askCurve(askBook: "OrderBook") -> tuple[np.ndarray, np.ndarray, float]:
+	"""
+	A book as running totals starting at `0`, so the cost of any amount is a linear interpolation, see `curveCost()`
+	:return: Cumulative quantities, cumulative costs, and the price past the end of them (`nan` if there's no unlimited order)
+	"""
+	quantities = np.concatenate(([0.0], np.array(askBook.cumulativeQuantities, dtype=np.float64)))
+	costs = np.concatenate(([0.0], np.array(askBook.cumulativeCosts, dtype=np.float64)))
+	return quantities, costs, np.nan if askBook.unlimitedPrice is None else askBook.unlimitedPrice
+
+
+def curveCost(curve: tuple[np.ndarray, np.ndarray, float], amounts: np.ndarray) -> np.ndarray:
+	"""`OrderBook.costFor()` for many amounts at once, `nan` where there isn't enough in the book"""
+	quantities, costs, unlimitedPrice = curve
+	amounts = np.asarray(amounts, dtype=np.float64)
+	beyond = amounts > quantities[-1]
+	return np.where(beyond, costs[-1] + (amounts - quantities[-1]) * unlimitedPrice, np.interp(amounts, quantities, costs))
+
+
+class InfeasibleCost:
+	"""A building that can't be built on a planet from what's on an exchange"""
+
+	def __init__(self, costs: "BuildingCostTensor", building: Building, planetIndex: int, exchangeCode: str, missing: dict[Material, float]):
+		self.costs = costs
+		self.building = building
+		# Into `PlanetTable`
+		self.planetIndex = planetIndex
+		self.exchangeCode = exchangeCode
+		# How much more of each material would be needed than the exchange has
+		self.missing = missing
+
+	def __repr__(self):
+		return f"<InfeasibleCost `{self.building.ticker}` @ `{self.costs.table.planetNaturalIds[self.planetIndex]}` from `{self.exchangeCode}` missing {', '.join(material.ticker for material in self.missing)}>"
+
+	@property
+	def planet(self) -> Planet:
+		return self.costs.table.getPlanet(self.planetIndex)
+
+
+class BuildingCostTensor:
+	"""
+	The cost of every building on every planet from every exchange, `costs[building, planet, exchange]`
+	Extra materials only depend on a planet's environment class, so costs are worked out once per class and spread to the planets in it
+	Cells where something can't be bought in full are `nan`, see `infeasible` and `getInfeasible()`
+	Requires `numpy`, use `PrUnStuff.getBuildingCosts()`
+	"""
+
+	def __init__(
+			self, table: "PlanetTable", snapshot: "ExchangeSnapshot", buildings: Iterable[Building], exchanges: Iterable[Exchange],
+			exchangeRates: dict[str, float] = None
+	):
+		"""
+		:param exchangeRates: The value of each currency (by currency code), so costs can be compared across exchanges, any missing currency is worth `1`
+		"""
+		self.table = table
+		self.fio = table.fio
+		self.buildings: list[Building] = list(buildings)
+		self.buildingIndex: dict[Building, int] = {building: i for i, building in enumerate(self.buildings)}
+		exchanges = list(exchanges)
+		self.exchangeCodes: list[str] = [exchange.comexCode for exchange in exchanges]
+		self.exchangeIndex: dict[str, int] = {exchangeCode: i for i, exchangeCode in enumerate(self.exchangeCodes)}
+		exchangeRates = {} if exchangeRates is None else exchangeRates
+		rates = np.array([exchangeRates.get(exchange.currencyCode, 1) for exchange in exchanges], dtype=np.float64)
+
+		classes = table.environmentClasses
+		# Amount of each material (by ticker) for each building in each environment class
+		self.classAmounts: dict[str, np.ndarray] = {}
+		for b, building in enumerate(self.buildings):
+			for material, amount in building.buildingCosts.items():
+				self._amountsOf(material.ticker)[b, :] += amount
+			for c, environment in enumerate(classes):
+				for ticker, amount in additionalBuildMaterials(environment, building.areaCost).items():
+					self._amountsOf(ticker)[b, c] += amount
+
+		self._curves: dict[tuple[str, str], tuple[np.ndarray, np.ndarray, float]] = {}
+		for ticker in self.classAmounts:
+			for exchangeCode in self.exchangeCodes:
+				materialExchange = snapshot.getMaterialExchange(ticker, exchangeCode)
+				if materialExchange is not None:
+					self._curves[(ticker, exchangeCode)] = askCurve(materialExchange.askBook)
+
+		self.classCosts = np.zeros((len(self.buildings), len(classes), len(self.exchangeCodes)))
+		for e, exchangeCode in enumerate(self.exchangeCodes):
+			for ticker, amounts in self.classAmounts.items():
+				curve = self._curves.get((ticker, exchangeCode), None)
+				if curve is None:
+					self.classCosts[:, :, e] += np.where(amounts > 0, np.nan, 0.0)
+				else:
+					self.classCosts[:, :, e] += np.where(amounts > 0, curveCost(curve, amounts), 0.0)
+		self.classCosts *= rates
+		self.costs = self.classCosts[:, table.environmentClassIndices, :]
+		self.classCosts.flags.writeable = False
+		self.costs.flags.writeable = False
+		for amounts in self.classAmounts.values():
+			amounts.flags.writeable = False
+
+	def _amountsOf(self, ticker: str) -> np.ndarray:
+		if ticker not in self.classAmounts:
+			self.classAmounts[ticker] = np.zeros((len(self.buildings), len(self.table.environmentClasses)))
+		return self.classAmounts[ticker]
+
+	def __repr__(self):
+		return f"<BuildingCostTensor {len(self.buildings)} buildings x {len(self.table)} planets x {len(self.exchangeCodes)} exchanges>"
+
+	@property
+	def shape(self):
+		return self.costs.shape
+
+	@property
+	def infeasible(self) -> np.ndarray:
+		"""`True` where a building can't be built from what's on an exchange"""
+		return np.isnan(self.costs)
+
+	def _buildingIndex(self, building: Union[Building, str]) -> int:
+		return self.buildingIndex[self.fio.getBuilding(building) if isinstance(building, str) else building]
+
+	def _planetIndex(self, planet: Union[Planet, str, int]) -> int:
+		return planet if isinstance(planet, int) else self.table.getPlanetIndex(planet)
+
+	def _exchangeIndex(self, exchange: Union[Exchange, str]) -> int:
+		return self.exchangeIndex[exchange.comexCode if isinstance(exchange, Exchange) else exchange]
+
+	def getCost(self, building: Union[Building, str], planet: Union[Planet, str, int], exchange: Union[Exchange, str]) -> Optional[float]:
+		"""
+		:param building: Building or it's ticker
+		:param planet: Planet, 'PlanetId', 'PlanetNaturalId', 'PlanetName' or it's index in the `PlanetTable`
+		:param exchange: Exchange or it's ComexCode
+		:return: `None` if it can't be built from what's on the exchange
+		"""
+		cost = self.costs[self._buildingIndex(building), self._planetIndex(planet), self._exchangeIndex(exchange)]
+		return None if np.isnan(cost) else float(cost)
+
+	def getMaterials(self, building: Union[Building, str], planet: Union[Planet, str, int]) -> dict[Material, float]:
+		"""Everything the building needs on the planet, including the extra materials"""
+		b, c = self._buildingIndex(building), self.table.environmentClassIndices[self._planetIndex(planet)]
+		return {self.fio.getMaterial(ticker): float(amounts[b, c]) for ticker, amounts in self.classAmounts.items() if amounts[b, c] > 0}
+
+	def _missing(self, b: int, c: int, exchangeCode: str) -> dict[Material, float]:
+		missing = {}
+		for ticker, amounts in self.classAmounts.items():
+			amount = amounts[b, c]
+			if amount <= 0:
+				continue
+			curve = self._curves.get((ticker, exchangeCode), None)
+			depth = 0.0 if curve is None else np.inf if not np.isnan(curve[2]) else curve[0][-1]
+			if amount > depth:
+				missing[self.fio.getMaterial(ticker)] = float(amount - depth)
+		return missing
+
+	def getMissingMaterials(self, building: Union[Building, str], planet: Union[Planet, str, int], exchange: Union[Exchange, str]) -> dict[Material, float]:
+		""":return: How much more of each material would be needed than the exchange has, empty if it can be built"""
+		return self._missing(self._buildingIndex(building), self.table.environmentClassIndices[self._planetIndex(planet)], self.exchangeCodes[self._exchangeIndex(exchange)])
+
+	def getInfeasible(self, building: Union[Building, str] = None) -> list[InfeasibleCost]:
+		"""Every building, planet and exchange that can't be built, and why"""
+		if isinstance(building, str):
+			building = self.fio.getBuilding(building)
+		infeasible = []
+		for b, c, e in np.argwhere(np.isnan(self.classCosts)).tolist():
+			if building is not None and self.buildings[b] != building:
+				continue
+			missing = self._missing(b, c, self.exchangeCodes[e])
+			for p in np.flatnonzero(self.table.environmentClassIndices == c).tolist():
+				infeasible.append(InfeasibleCost(self, self.buildings[b], p, self.exchangeCodes[e], missing))
+		return infeasible
+
+	def cheapest(self, building: Union[Building, str]) -> tuple[np.ndarray, list[Optional[str]]]:
+		"""
+		:return: The cost of the building on each planet from whichever exchange is cheapest (`nan` if none can), and that exchange's ComexCode (`None` if none can)
+		"""
+		costs = self.costs[self._buildingIndex(building)]
+		buildable = ~np.all(np.isnan(costs), axis=1)
+		exchangeIndices = np.argmin(np.where(np.isnan(costs), np.inf, costs), axis=1)
+		cheapest = np.where(buildable, costs[np.arange(len(costs)), exchangeIndices], np.nan)
+		return cheapest, [self.exchangeCodes[e] if ok else None for e, ok in zip(exchangeIndices.tolist(), buildable.tolist())]
@@ -0,0 +1,208 @@
+import math
+import time
+from typing import Iterable
+
+from .Arbitrage import ArbitrageOpportunity
+
+
+GOLDEN_RATIO = (math.sqrt(5) - 1) / 2
+# How many quantities below the most that fits are tried for each material when searching for a better load
+SEARCH_WINDOW = 16
+
+
+class CargoPlan:
+	"""How many of each material to trade, to fill a ship without going over it's volume or weight"""
+
+	def __init__(self, maxVolume: float, maxWeight: float):
+		self.maxVolume = maxVolume
+		self.maxWeight = maxWeight
+		self.quantities: dict[ArbitrageOpportunity, int] = {}
+		self.profit = 0.0
+		self.volume = 0.0
+		self.weight = 0.0
+		# No load can make more than this, the real best load is somewhere between `profit` and this
+		self.upperBound = math.inf
+
+	def __repr__(self):
+		return f"<CargoPlan {len(self.quantities)} materials for {self.profit:.2f}, {self.volume:.2f}/{self.maxVolume} m³ {self.weight:.2f}/{self.maxWeight} t>"
+
+	@property
+	def gap(self):
+		"""How far `profit` could possibly be from the best load"""
+		return self.upperBound - self.profit
+
+	@property
+	def cost(self):
+		return sum(opportunity.costFor(quantity) for opportunity, quantity in self.quantities.items())
+
+
+def _fit(remaining: float, perUnit: float):
+	if perUnit <= 0:
+		return math.inf
+	# A little slack, so float error doesn't leave out an item that exactly fits
+	return math.floor(remaining / perUnit + 1e-9)
+
+
+def _evaluate(segments: list[tuple[float, int, ArbitrageOpportunity]], theta: float, maxVolume: float, maxWeight: float):
+	"""
+	Mixes volume and weight into one capacity (`theta` of it volume, the rest weight), then takes the best profit per capacity first
+	Since any load that fits the ship fits that mixed capacity, the fractional fill of it is an upper bound on the best load
+	The whole items taken along the way, while actually checking volume and weight, is a load that fits
+	"""
+	def capacityPerUnit(opportunity: ArbitrageOpportunity):
+		return theta * opportunity.material.volume / maxVolume + (1 - theta) * opportunity.material.weight / maxWeight
+	capacities = {opportunity: capacityPerUnit(opportunity) for opportunity in set(segment[2] for segment in segments)}
+	# Sorting is stable and a material's segments are already worst last, so they stay in the order they'd be filled
+	ordered = sorted(segments, key=lambda segment: segment[0] / max(capacities[segment[2]], 1e-12), reverse=True)
+	upperBound = 0.0
+	capacityRemaining = 1.0
+	quantities: dict[ArbitrageOpportunity, int] = {}
+	profit, volume, weight = 0.0, 0.0, 0.0
+	for profitPerUnit, itemCount, opportunity in ordered:
+		capacity = capacities[opportunity]
+		if capacityRemaining > 0:
+			if capacity <= 0:
+				upperBound += profitPerUnit * itemCount
+			else:
+				fractionalCount = min(itemCount, capacityRemaining / capacity)
+				upperBound += profitPerUnit * fractionalCount
+				capacityRemaining -= fractionalCount * capacity
+		material = opportunity.material
+		count = min(itemCount, _fit(maxVolume - volume, material.volume), _fit(maxWeight - weight, material.weight))
+		if count > 0:
+			quantities[opportunity] = quantities.get(opportunity, 0) + count
+			profit += profitPerUnit * count
+			volume += material.volume * count
+			weight += material.weight * count
+	return profit, quantities, volume, weight, upperBound
+
+
+def _fillByProfitPerUnit(plan: CargoPlan, opportunities: list[ArbitrageOpportunity]):
+	"""Takes as much of each material as fits, best top of book profit first, like the old greedy `getBestTradeToFrom()` did"""
+	quantities: dict[ArbitrageOpportunity, int] = {}
+	profit, volume, weight = 0.0, 0.0, 0.0
+	for opportunity in sorted(opportunities, key=lambda opportunity: opportunity.profitPerUnit, reverse=True):
+		material = opportunity.material
+		count = min(opportunity.quantity, _fit(plan.maxVolume - volume, material.volume), _fit(plan.maxWeight - weight, material.weight))
+		if count > 0:
+			quantities[opportunity] = count
+			profit += opportunity.profitFor(count)
+			volume += material.volume * count
+			weight += material.weight * count
+	if profit > plan.profit:
+		plan.quantities, plan.profit, plan.volume, plan.weight = quantities, profit, volume, weight
+
+
+class _SearchTimeout(Exception):
+	pass
+
+
+def _search(plan: CargoPlan, segments: list[tuple[float, int, ArbitrageOpportunity]], theta: float, deadline: float):
+	"""
+	Branch and bound over how many of each material to take, using the same mixed capacity bound as `_evaluate()`
+	Near the most that fits every quantity is tried, further down only none is, as that's where rounding to whole items matters
+	"""
+	maxVolume, maxWeight = plan.maxVolume, plan.maxWeight
+	capacities = {}
+	for _, _, opportunity in segments:
+		capacities[opportunity] = theta * opportunity.material.volume / maxVolume + (1 - theta) * opportunity.material.weight / maxWeight
+	ordered = sorted(segments, key=lambda segment: segment[0] / max(capacities[segment[2]], 1e-12), reverse=True)
+	opportunities = list(dict.fromkeys(segment[2] for segment in ordered))
+	depthOf = {opportunity: i for i, opportunity in enumerate(opportunities)}
+	orderedDepths = [(profitPerUnit, itemCount, capacities[opportunity], depthOf[opportunity]) for profitPerUnit, itemCount, opportunity in ordered]
+
+	def bound(depth: int, volumeRemaining: float, weightRemaining: float):
+		capacityRemaining = theta * volumeRemaining / maxVolume + (1 - theta) * weightRemaining / maxWeight
+		value = 0.0
+		for profitPerUnit, itemCount, capacity, segmentDepth in orderedDepths:
+			if segmentDepth < depth:
+				continue
+			if capacity <= 0:
+				value += profitPerUnit * itemCount
+				continue
+			if capacityRemaining <= 0:
+				break
+			fractionalCount = min(itemCount, capacityRemaining / capacity)
+			value += profitPerUnit * fractionalCount
+			capacityRemaining -= fractionalCount * capacity
+		return value
+
+	chosen: dict[ArbitrageOpportunity, int] = {}
+
+	def visit(depth: int, volume: float, weight: float, profit: float):
+		if time.perf_counter() > deadline:
+			raise _SearchTimeout()
+		if profit > plan.profit + 1e-9:
+			plan.quantities = {opportunity: itemCount for opportunity, itemCount in chosen.items() if itemCount > 0}
+			plan.profit, plan.volume, plan.weight = profit, volume, weight
+		if depth >= len(opportunities) or profit + bound(depth, maxVolume - volume, maxWeight - weight) <= plan.profit + 1e-9:
+			return
+		opportunity = opportunities[depth]
+		material = opportunity.material
+		mostItemCount = min(opportunity.quantity, _fit(maxVolume - volume, material.volume), _fit(maxWeight - weight, material.weight))
+		itemCounts = list(range(mostItemCount, max(mostItemCount - SEARCH_WINDOW, 0) - 1, -1))
+		if itemCounts[-1] != 0:
+			itemCounts.append(0)
+		for itemCount in itemCounts:
+			chosen[opportunity] = itemCount
+			visit(depth + 1, volume + material.volume * itemCount, weight + material.weight * itemCount, profit + opportunity.profitFor(itemCount))
+		del chosen[opportunity]
+
+	try:
+		visit(0, 0.0, 0.0, 0.0)
+		# Finished without running out of time, nothing the search could find is better
+		if all(opportunity.quantity <= SEARCH_WINDOW for opportunity in opportunities):
+			plan.upperBound = min(plan.upperBound, plan.profit)
+	except _SearchTimeout:
+		pass
+
+
+def optimizeCargo(opportunities: Iterable[ArbitrageOpportunity], maxVolume: float, maxWeight: float, timeBudget: float = 0.1) -> CargoPlan:
+	"""
+	Picks how much of each opportunity to take, to make the most profit without going over maxVolume or maxWeight
+	Each material's profit is the full depth of it's books, so taking more of something is worth less and less
+	This keeps improving the plan until it's proven to be the best possible, or `timeBudget` seconds have passed
+	The returned plan's `upperBound` is the most any load could make, so `gap` is how far from the best it could be
+	"""
+	plan = CargoPlan(maxVolume, maxWeight)
+	segments = []
+	for opportunity in opportunities:
+		for i in range(1, len(opportunity.quantities)):
+			itemCount = opportunity.quantities[i] - opportunity.quantities[i-1]
+			profit = opportunity.profits[i] - opportunity.profits[i-1]
+			if itemCount > 0 and profit > 0:
+				segments.append((profit / itemCount, itemCount, opportunity))
+	if len(segments) <= 0 or maxVolume <= 0 or maxWeight <= 0:
+		plan.upperBound = 0.0
+		return plan
+
+	deadline = time.perf_counter() + timeBudget
+	# So the plan is never worse than filling up on the best materials one at a time
+	_fillByProfitPerUnit(plan, list(dict.fromkeys(segment[2] for segment in segments)))
+	bounds: dict[float, float] = {}
+
+	def evaluate(theta: float):
+		if theta not in bounds:
+			profit, quantities, volume, weight, upperBound = _evaluate(segments, theta, maxVolume, maxWeight)
+			bounds[theta] = upperBound
+			plan.upperBound = min(plan.upperBound, upperBound)
+			if profit > plan.profit:
+				plan.quantities, plan.profit, plan.volume, plan.weight = quantities, profit, volume, weight
+		return bounds[theta]
+
+	# The bound is unimodal in theta, so a golden section search finds the mix of volume and weight that gives the tightest bound
+	low, high = 0.0, 1.0
+	evaluate(low)
+	evaluate(high)
+	a = high - GOLDEN_RATIO * (high - low)
+	b = low + GOLDEN_RATIO * (high - low)
+	while high - low > 1e-6 and plan.gap > 1e-9 and time.perf_counter() < deadline:
+		if evaluate(a) <= evaluate(b):
+			high, b = b, a
+			a = high - GOLDEN_RATIO * (high - low)
+		else:
+			low, a = a, b
+			b = low + GOLDEN_RATIO * (high - low)
+	if plan.gap > 1e-9 and time.perf_counter() < deadline:
+		_search(plan, segments, min(bounds, key=bounds.get), deadline)
+	return plan
@@ -0,0 +1,114 @@
+import math
+import sys
+from typing import TYPE_CHECKING
+
+from .OrderBook import OrderBook, matchBooks
+
+if TYPE_CHECKING:
+	from .Exchange import MaterialExchangeOrder
+
+
+class DepthFill:
+	"""Some items bought from one order and sold to another"""
+
+	def __init__(self, itemCount: int, askOrder: "MaterialExchangeOrder", bidOrder: "MaterialExchangeOrder"):
+		self.itemCount = itemCount
+		self.askOrder = askOrder
+		self.bidOrder = bidOrder
+
+	def __repr__(self):
+		return f"<DepthFill `{self.itemCount}x` {self.askPrice:.2f} -> {self.bidPrice:.2f}>"
+
+	@property
+	def askPrice(self) -> float:
+		return self.askOrder.itemCost
+
+	@property
+	def bidPrice(self) -> float:
+		return self.bidOrder.itemCost
+
+	@property
+	def cost(self):
+		return self.itemCount * self.askPrice
+
+	@property
+	def income(self):
+		return self.itemCount * self.bidPrice
+
+	@property
+	def profit(self):
+		return self.itemCount * (self.bidPrice - self.askPrice)
+
+
+class DepthMatch:
+	"""
+	Buying through one book's depth and selling through another's, in a single merge pass
+	Used for arbitrage (asks of one exchange against bids of another), but any two books work
+	"""
+
+	def __init__(self, askBook: OrderBook, bidBook: OrderBook, maxQuantity: int = sys.maxsize, stopIfUnprofitable=True):
+		"""
+		:param maxQuantity: The most items to match
+		:param stopIfUnprofitable: Stop at the first item that doesn't make a profit, otherwise keep going until a book runs out
+		"""
+		self.askBook = askBook
+		self.bidBook = bidBook
+		self.maxQuantity = maxQuantity
+		self.stopIfUnprofitable = stopIfUnprofitable
+		self.fills: list[DepthFill] = []
+		# Running totals after each fill
+		self.cumulativeQuantities: list[int] = []
+		self.cumulativeProfits: list[float] = []
+		self.quantity = 0
+		self.cost = 0.0
+		self.income = 0.0
+		for itemCount, askPrice, bidPrice, askOrder, bidOrder in matchBooks(askBook, bidBook, maxQuantity, stopIfUnprofitable):
+			self.fills.append(DepthFill(itemCount, askOrder, bidOrder))
+			self.quantity += itemCount
+			self.cost += itemCount * askPrice
+			self.income += itemCount * bidPrice
+			self.cumulativeQuantities.append(self.quantity)
+			self.cumulativeProfits.append(self.income - self.cost)
+
+	def __repr__(self):
+		return f"<DepthMatch `{self.quantity}x` in {len(self.fills)} fills for {self.profit:.2f}>"
+
+	@property
+	def profit(self):
+		return self.income - self.cost
+
+	@property
+	def askOrdersUsed(self) -> list["MaterialExchangeOrder"]:
+		return list(dict.fromkeys(fill.askOrder for fill in self.fills))
+
+	@property
+	def bidOrdersUsed(self) -> list["MaterialExchangeOrder"]:
+		return list(dict.fromkeys(fill.bidOrder for fill in self.fills))
+
+	@property
+	def mostProfitableQuantity(self) -> int:
+		"""The amount of items where the profit peaks, past this each item loses money"""
+		quantity, profit = 0, 0.0
+		for i, fill in enumerate(self.fills):
+			if self.cumulativeProfits[i] > profit:
+				quantity, profit = self.cumulativeQuantities[i], self.cumulativeProfits[i]
+		return quantity
+
+	@property
+	def breakEvenQuantity(self) -> int:
+		"""
+		The most items (up to `maxQuantity`) that can be matched without making a loss overall
+		With `stopIfUnprofitable` the match stops before the first loss making item, so the books are matched again without stopping, as the profit up to there can pay for some
+		"""
+		if self.stopIfUnprofitable:
+			fills = ((itemCount, askPrice, bidPrice) for itemCount, askPrice, bidPrice, _, _ in matchBooks(self.askBook, self.bidBook, self.maxQuantity, False))
+		else:
+			fills = ((fill.itemCount, fill.askPrice, fill.bidPrice) for fill in self.fills)
+		quantity, profit = 0, 0.0
+		for itemCount, askPrice, bidPrice in fills:
+			fillProfit = itemCount * (bidPrice - askPrice)
+			if profit + fillProfit < 0:
+				return quantity + math.floor(profit / (askPrice - bidPrice))
+			quantity += itemCount
+			profit += fillProfit
+		return quantity
@@ -1,18 +1,24 @@
 import math
 import sys
 from datetime import datetime
-from dateutil.parser import isoparse
 from functools import total_ordering
 from typing import TYPE_CHECKING, Optional
 
 from .Material import Material
 from .Location import Location
-from ..utils import formatTimedelta
+from .OrderBook import OrderBook
+from .DepthMatch import DepthMatch
+from ..utils import formatTimedelta, isoparse
 
 if TYPE_CHECKING:
 	from .FIO import FIO
 
 
+def _hasOrders(json: dict):
+	"""Only the full json (from `exchange()` or `exchangefull()`) has the orders, anything else is missing fields"""
+	return "BuyingOrders" in json and "SellingOrders" in json
+
+
 @total_ordering
 class MaterialExchangeOrder:
 	def __init__(self, json: dict, materialExchange: "MaterialExchange", fio: "FIO"):
@@ -46,6 +52,7 @@ class MaterialExchangeOrder:
 class MaterialExchange:
 	def __init__(self, json: dict, fio: "FIO"):
 		self.fio = fio
+		self._lock = fio.newLock()
 
 		self.material = fio.getMaterial(json["MaterialTicker"])
 		self.exchangeCode: str = json["ExchangeCode"]
@@ -60,6 +67,8 @@ class MaterialExchange:
 		self.demand: int = json["Demand"]
 		self._buyingOrders: Optional[list[MaterialExchangeOrder]] = None
 		self._sellingOrders: Optional[list[MaterialExchangeOrder]] = None
+		self._askBook: Optional[OrderBook] = None
+		self._bidBook: Optional[OrderBook] = None
 		self._cxDataModelId: Optional[str] = None
 		self._exchangeName: Optional[str] = None
 		self._currency: Optional[str] = None
@@ -79,6 +88,7 @@ class MaterialExchange:
 		self._userNameSubmitted: Optional[str] = None
 		self._timestamp: Optional[str] = None
 		self._update(json)
+		self._loaded = _hasOrders(json)
 
 	def __repr__(self):
 		return f"<MaterialExchange `{self.material.ticker}` @ `{self.exchangeCode}`>"
@@ -89,18 +99,56 @@ class MaterialExchange:
 	def __hash__(self):
 		return hash((self.__class__, self.cxDataModelId))
 
+	def _updateOrders(self, ordersJson: list[dict], previousOrders: Optional[list[MaterialExchangeOrder]]):
+		"""
+		Orders that haven't changed since `previousOrders` are reused, rather than created again
+		:return: `previousOrders` itself if nothing changed
+		"""
+		previousById = {} if previousOrders is None else {order.orderId: order for order in previousOrders}
+		changed = previousOrders is None or len(ordersJson) != len(previousOrders)
+		orders = []
+		for orderJson in ordersJson:
+			order = previousById.get(orderJson["OrderId"], None)
+			itemCount = sys.maxsize if orderJson["ItemCount"] is None else orderJson["ItemCount"]
+			if order is None or order.itemCount != itemCount or order.itemCost != orderJson["ItemCost"]:
+				order = MaterialExchangeOrder(orderJson, self, self.fio)
+				changed = True
+			orders.append(order)
+		if not changed:
+			return previousOrders
+		orders.sort(reverse=True)
+		return orders
+
 	def _update(self, json: dict):
+		# The order lists are only assigned once they're complete, other threads may be reading the old ones
 		if "BuyingOrders" in json:
-			self._buyingOrders = []
-			for order in json["BuyingOrders"]:
-				self._buyingOrders.append(MaterialExchangeOrder(order, self, self.fio))
-			self._buyingOrders.sort(reverse=True)
+			buyingOrders = self._updateOrders(json["BuyingOrders"], self._buyingOrders)
+			if buyingOrders is not self._buyingOrders:
+				self._buyingOrders = buyingOrders
+				self._bidBook = None
 		if "SellingOrders" in json:
-			self._sellingOrders = json["SellingOrders"]
-			self._sellingOrders = []
-			for order in json["SellingOrders"]:
-				self._sellingOrders.append(MaterialExchangeOrder(order, self, self.fio))
-			self._sellingOrders.sort(reverse=True)
+			sellingOrders = self._updateOrders(json["SellingOrders"], self._sellingOrders)
+			if sellingOrders is not self._sellingOrders:
+				self._sellingOrders = sellingOrders
+				self._askBook = None
+		if "MMBuy" in json:
+			self.mmBuy = json["MMBuy"]
+		if "MMSell" in json:
+			self.mmSell = json["MMSell"]
+		if "PriceAverage" in json:
+			self.priceAverage = json["PriceAverage"]
+		if "Ask" in json:
+			self.ask = json["Ask"]
+		if "AskCount" in json:
+			self.askCount = json["AskCount"]
+		if "Supply" in json:
+			self.supply = json["Supply"]
+		if "Bid" in json:
+			self.bid = json["Bid"]
+		if "BidCount" in json:
+			self.bidCount = json["BidCount"]
+		if "Demand" in json:
+			self.demand = json["Demand"]
 		if "CXDataModelId" in json:
 			self._cxDataModelId = json["CXDataModelId"]
 		if "ExchangeName" in json:
@@ -138,124 +186,183 @@ class MaterialExchange:
 		if "Timestamp" in json:
 			self._timestamp = json["Timestamp"]
 
+	def _hydrate(self):
+		"""
+		Loads the fields that weren't in the json this was created from, this is only ever done once
+		Fields that FIO has as null stay `None` after this, without fetching them again
+		A json without the orders doesn't count, so it's tried again next time
+		"""
+		if not self._loaded:
+			with self._lock:
+				if not self._loaded:
+					json = self.fio.api.exchange(self.material.ticker, self.exchangeCode)
+					if _hasOrders(json):
+						self._update(json)
+						self._loaded = True
+
+	def refresh(self, json: dict = None, publishOrderEvents=True):
+		"""
+		Updates this in place, so anything holding on to it sees the new data
+		Nothing is done if the `Timestamp` hasn't changed, otherwise only the orders that changed are created again
+		A json without the orders (like `exchangeall()`'s) is ignored, it would move `Timestamp` on without the orders that go with it
+		:param json: The new data for this, defaults to `FIOApi.exchange()` (which is cached)
+		:param publishOrderEvents: Publish the changes to the orders to `FIO.orderEvents`
+		:return: If anything was updated
+		"""
+		if json is None:
+			json = self.fio.api.exchange(self.material.ticker, self.exchangeCode)
+		if not _hasOrders(json):
+			return False
+		with self._lock:
+			# Once loaded, `_timestamp` is always from a json with the orders
+			if self._loaded and json.get("Timestamp", None) == self._timestamp:
+				return False
+			previousBuyingOrders, previousSellingOrders = self._buyingOrders, self._sellingOrders
+			self._update(json)
+			self._loaded = True
+			buyingOrders, sellingOrders = self._buyingOrders, self._sellingOrders
+		ordersChanged = buyingOrders is not previousBuyingOrders or sellingOrders is not previousSellingOrders
+		if publishOrderEvents and ordersChanged and previousBuyingOrders is not None and previousSellingOrders is not None and self.fio.orderEvents.hasSubscribers:
+			from .OrderBookDiff import OrderBookDiff
+			self.fio.orderEvents.publish(OrderBookDiff(self, previousBuyingOrders, previousSellingOrders, buyingOrders, sellingOrders))
+		return True
+
 	@property
 	def buyingOrders(self):
 		if self._buyingOrders is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._buyingOrders
 
 	@property
 	def sellingOrders(self):
 		if self._sellingOrders is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._sellingOrders
 
+	@property
+	def askBook(self):
+		"""`sellingOrders` as an `OrderBook`, for working out the cost of buying"""
+		askBook = self._askBook
+		if askBook is None:
+			askBook = OrderBook.fromAsks(self.sellingOrders)
+			self._askBook = askBook
+		return askBook
+
+	@property
+	def bidBook(self):
+		"""`buyingOrders` as an `OrderBook`, for working out the income of selling"""
+		bidBook = self._bidBook
+		if bidBook is None:
+			bidBook = OrderBook.fromBids(self.buyingOrders)
+			self._bidBook = bidBook
+		return bidBook
+
 	@property
 	def cxDataModelId(self):
 		if self._cxDataModelId is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._cxDataModelId
 
 	@property
 	def exchangeName(self):
 		if self._exchangeName is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._exchangeName
 
 	@property
 	def currency(self):
 		if self._currency is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._currency
 
 	@property
 	def previous(self):
 		if self._previous is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._previous
 
 	@property
 	def price(self):
 		if self._price is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._price
 
 	@property
 	def priceTimeEpochMs(self):
 		if self._priceTimeEpochMs is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._priceTimeEpochMs
 
 	@property
 	def high(self):
 		if self._high is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._high
 
 	@property
 	def allTimeHigh(self):
 		if self._allTimeHigh is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._allTimeHigh
 
 	@property
 	def low(self):
 		if self._low is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._low
 
 	@property
 	def allTimeLow(self):
 		if self._allTimeLow is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._allTimeLow
 
 	@property
 	def traded(self):
 		if self._traded is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._traded
 
 	@property
 	def volumeAmount(self):
 		if self._volumeAmount is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._volumeAmount
 
 	@property
 	def narrowPriceBandLow(self):
 		if self._narrowPriceBandLow is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._narrowPriceBandLow
 
 	@property
 	def narrowPriceBandHigh(self):
 		if self._narrowPriceBandHigh is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._narrowPriceBandHigh
 
 	@property
 	def widePriceBandLow(self):
 		if self._widePriceBandLow is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._widePriceBandLow
 
 	@property
 	def widePriceBandHigh(self):
 		if self._widePriceBandHigh is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._widePriceBandHigh
 
 	@property
 	def userNameSubmitted(self):
 		if self._userNameSubmitted is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._userNameSubmitted
 
 	@property
 	def timestamp(self):
 		if self._timestamp is None:
-			self._update(self.fio.api.exchange(self.material.ticker, self.exchangeCode))
+			self._hydrate()
 		return self._timestamp
 
 	@property
@@ -282,48 +389,15 @@ class MaterialExchange:
 		"""
 		Compares this materialExchange's most profitable buying order to the others cheapest selling order
 		This will fill either maxVolume or maxWeight (or partially if not enough orders) with this materialExchange
+		:return: buyOrdersUsed, sellOrdersUsed, profit, itemCount, volume, weight, see `DepthMatch` for more detail
 		"""
 		assert self.material == materialExchange.material, "MaterialExchange.compare() must be between the same material"
-		buyOrdersUsed = []
-		sellOrdersUsed = []
-		if len(self.sellingOrders) <= 0 or len(materialExchange.buyingOrders) <= 0:
-			return buyOrdersUsed, sellOrdersUsed, 0, 0, 0, 0
-		volume, weight = 0, 0
-		profit = 0
-		buyOrderIndex = 0  # starts at -1 and gets decremented
-		buyOrder = None
-		buyOrderRemaining = 0
-		sellOrderIndex = -1  # starts at 0 and get incremented
-		sellOrder = None
-		sellOrderRemaining = 0
-		totalItemCount = 0
-		while True:
-			isAvailableBuyAndSellOrder = buyOrderIndex < len(self.buyingOrders) and abs(sellOrderIndex)-1 < len(materialExchange.sellingOrders)
-			if buyOrderRemaining <= 0 and isAvailableBuyAndSellOrder:
-				buyOrderIndex -= 1
-				buyOrder = self.sellingOrders[buyOrderIndex]
-				buyOrdersUsed.append(buyOrder)
-				buyOrderRemaining = buyOrder.itemCount
-			if sellOrderRemaining <= 0 and isAvailableBuyAndSellOrder:
-				sellOrderIndex += 1
-				sellOrder = materialExchange.buyingOrders[sellOrderIndex]
-				sellOrdersUsed.append(sellOrder)
-				sellOrderRemaining = sellOrder.itemCount
-			if sellOrderRemaining <= 0 or buyOrderRemaining <= 0:
-				break
-			profitPerUnit = sellOrder.itemCost - buyOrder.itemCost
-			maxItemCountVolume = math.floor((maxVolume-volume)/self.material.volume)
-			maxItemCountWeight = math.floor((maxWeight-weight)/self.material.weight)
-			itemCount = min(buyOrderRemaining, sellOrderRemaining, maxItemCountVolume, maxItemCountWeight)
-			totalItemCount += itemCount
-			profit += profitPerUnit * itemCount
-			sellOrderRemaining -= itemCount
-			buyOrderRemaining -= itemCount
-			volume += self.material.volume * itemCount
-			weight += self.material.weight * itemCount
-			if volume + self.material.volume >= maxVolume or weight + self.material.weight >= maxWeight:
-				break
-		return buyOrdersUsed, sellOrdersUsed, profit, totalItemCount, volume, weight
+		maxItemCount = min(
+			math.floor(maxVolume/self.material.volume) if self.material.volume > 0 else sys.maxsize,
+			math.floor(maxWeight/self.material.weight) if self.material.weight > 0 else sys.maxsize
+		)
+		match = DepthMatch(self.askBook, materialExchange.bidBook, maxItemCount, stopIfUnprofitable)
+		return match.askOrdersUsed, match.bidOrdersUsed, match.profit, match.quantity, self.material.volume*match.quantity, self.material.weight*match.quantity
 
 
 class Exchange:
@@ -386,17 +460,10 @@ class Exchange:
 		return formatTimedelta(self.timedelta)
 
 	def getMaterialExchange(self, material: Material):
-		return MaterialExchange(self.fio.api.exchange(material.ticker, self.comexCode), self.fio)
+		"""The same object is returned every time, it's refreshed in place when FIO has newer data, see `FIO.getMaterialExchange()`"""
+		return self.fio.getMaterialExchange(material, self.comexCode)
 
 	def getAllMaterialExchanges(self):
 		# There is no way to just get this exchanges materials :cry:
-		# We *may* have just wanted the info from `exchangefull` but this way we catch every use case, what's the harm?
-		if not self.fio.api.allmaterials.isCached():
-			self.fio.api.allmaterials()
-		if not self.fio.api.exchangefull.isCached():
-			self.fio.api.exchangefull()
-		materialExchanges = {}
-		for data in self.fio.api.exchange.speedQuery("ExchangeCode", self.comexCode):
-			materialExchange = self.getMaterialExchange(self.fio.getMaterial(data["material"]))
-			materialExchanges[materialExchange.material] = materialExchange
-		return materialExchanges
+		# So this comes from the snapshot of every exchange, which is built from a single `exchangefull()`
+		return dict(self.fio.getExchangeSnapshot().getAllMaterialExchanges(self.comexCode))
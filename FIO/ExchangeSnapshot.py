@@ -0,0 +1,116 @@
+from datetime import datetime
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Iterator, Mapping, Optional, Union
+
+from .Material import Material
+from .Exchange import Exchange, MaterialExchange
+from ..utils import formatTimedelta, isoparse
+
+if TYPE_CHECKING:
+	from .FIO import FIO
+	from .MarketMatrix import MarketMatrix
+
+
+class ExchangeSnapshot:
+	"""
+	A point in time view of every material on every exchange, built from a single `exchangefull()` payload
+	Nothing in here is fetched again, so everything read from the same snapshot is consistent
+	"""
+
+	def __init__(self, json: list[dict], fio: "FIO"):
+		self.fio = fio
+
+		# `MaterialExchange` loads it's material, make sure that doesn't happen one at a time
+		fio.getAllMaterials()
+		materialExchanges: dict[tuple[Material, str], MaterialExchange] = {}
+		exchanges: dict[str, dict[Material, MaterialExchange]] = {}
+		timestamp = None
+		for exchangeJson in json:
+			materialExchange = MaterialExchange(exchangeJson, fio)
+			materialExchanges[(materialExchange.material, materialExchange.exchangeCode)] = materialExchange
+			exchanges.setdefault(materialExchange.exchangeCode, {})[materialExchange.material] = materialExchange
+			if exchangeJson["Timestamp"] is not None and (timestamp is None or exchangeJson["Timestamp"] > timestamp):
+				timestamp = exchangeJson["Timestamp"]
+		self.timestamp: Optional[str] = timestamp
+		self._materialExchanges = MappingProxyType(materialExchanges)
+		self._exchanges = MappingProxyType({code: MappingProxyType(exchange) for code, exchange in exchanges.items()})
+		self._marketMatrix: Optional["MarketMatrix"] = None
+
+	def __repr__(self):
+		return f"<ExchangeSnapshot `{self.timestamp}` {len(self._materialExchanges)} material exchanges>"
+
+	def __len__(self):
+		return len(self._materialExchanges)
+
+	def __iter__(self) -> Iterator[MaterialExchange]:
+		return iter(self._materialExchanges.values())
+
+	def __contains__(self, key: tuple[Union[Material, str], Union[Exchange, str]]):
+		return self.getMaterialExchange(*key) is not None
+
+	def __getitem__(self, key: tuple[Union[Material, str], Union[Exchange, str]]):
+		materialExchange = self.getMaterialExchange(*key)
+		if materialExchange is None:
+			raise KeyError(key)
+		return materialExchange
+
+	@property
+	def exchangeCodes(self):
+		return list(self._exchanges.keys())
+
+	@property
+	def materials(self):
+		return list(dict.fromkeys(material for material, exchangeCode in self._materialExchanges.keys()))
+
+	@property
+	def marketMatrix(self) -> "MarketMatrix":
+		"""This snapshot as a `MarketMatrix`, requires `numpy`"""
+		if self._marketMatrix is None:
+			from .MarketMatrix import MarketMatrix
+			self._marketMatrix = MarketMatrix.fromSnapshot(self)
+		return self._marketMatrix
+
+	@property
+	def datetime(self):
+		return isoparse(self.timestamp)
+
+	@property
+	def timedelta(self):
+		return datetime.utcnow() - self.datetime
+
+	def formatTimedelta(self):
+		return formatTimedelta(self.timedelta)
+
+	def getMaterialExchange(self, material: Union[Material, str], exchange: Union[Exchange, str]) -> Optional[MaterialExchange]:
+		"""
+		:param material: Material or it's ticker
+		:param exchange: Exchange or it's ComexCode
+		"""
+		if isinstance(material, str):
+			material = self.fio.getMaterial(material)
+		if isinstance(exchange, Exchange):
+			exchange = exchange.comexCode
+		return self._materialExchanges.get((material, exchange), None)
+
+	def getAllMaterialExchanges(self, exchange: Union[Exchange, str]) -> Mapping[Material, MaterialExchange]:
+		"""
+		:param exchange: Exchange or it's ComexCode
+		:return: A read-only mapping of every material on that exchange
+		"""
+		if isinstance(exchange, Exchange):
+			exchange = exchange.comexCode
+		return self._exchanges.get(exchange, MappingProxyType({}))
+
+	def getMaterialExchanges(self, material: Union[Material, str]) -> dict[str, MaterialExchange]:
+		"""
+		:param material: Material or it's ticker
+		:return: That material on every exchange it's on, by ComexCode
+		"""
+		if isinstance(material, str):
+			material = self.fio.getMaterial(material)
+		materialExchanges = {}
+		for exchangeCode, exchange in self._exchanges.items():
+			materialExchange = exchange.get(material, None)
+			if materialExchange is not None:
+				materialExchanges[exchangeCode] = materialExchange
+		return materialExchanges
@@ -1,6 +1,6 @@
-# for some reason `@cache` was nuking typing info :/
-from functools import cache, lru_cache
-from typing import Optional
+from contextlib import nullcontext
+from threading import RLock
+from typing import TYPE_CHECKING, Optional, Union
 
 from .FIOApi import FIOApi
 from .Material import Material
@@ -9,61 +9,126 @@ from .Planet import Planet
 from .Storage import Storage
 from .Recipe import Recipe
 from .Site import Site
-from .Exchange import Exchange
+from .Exchange import Exchange, MaterialExchange
+from .ExchangeSnapshot import ExchangeSnapshot
+from .OrderBookDiff import OrderEventStream, diffSnapshots
+from .TopOfBook import TopOfBookIndex
 from .Ship import Ship
 from .Flight import Flight
 from .System import System
+from .JumpGraph import JumpGraph
+from .RecipeGraph import RecipeGraph
+from .ResourceIndex import ResourceIndex
+from .SystemIndex import SystemIndex
+from .SectorIndex import SectorIndex
 from .WorldSector import WorldSector
+from .locking import lockedcache
+
+if TYPE_CHECKING:
+	from .PlanetTable import PlanetTable
+	from .PriceHistory import PriceHistory
 
 
 class FIO:
 	"""
 	Interface for PrUn data, provided by FIO rest API
 	Uses `FIOApi` class, but provides a more convenient interface
+	When `threadSafe` is set, one instance can be shared between threads,
+	each cached value (and each lazily loaded field on the objects returned) is only created once, by whichever thread gets there first.
 	"""
 
-	def __init__(self, key: str):
+	def __init__(self, key: str, threadSafe=False):
 		self.api = FIOApi(key)
-
-	@lru_cache
+		self.threadSafe = threadSafe
+		# Every planet created so far, by 'PlanetId', 'PlanetNaturalId', 'PlanetName' and whatever else it was asked for by
+		self._planetsMap: dict[str, Planet] = {}
+		self._planetsMapLock = self.newLock()
+		self._exchangeSnapshot: Optional[ExchangeSnapshot] = None
+		self._exchangeSnapshotLock = self.newLock()
+		self.priceHistory: Optional["PriceHistory"] = None
+		# The live `MaterialExchange`s handed out by `getMaterialExchange()`, these are refreshed in place
+		self._materialExchanges: dict[tuple[str, str], MaterialExchange] = {}
+		self._materialExchangesLock = self.newLock()
+		# Gets the changes to every book each time the exchange snapshot is refreshed, see `OrderEventStream.subscribe()`
+		self.orderEvents = OrderEventStream(self.newLock())
+		self._topOfBookIndex: Optional[TopOfBookIndex] = None
+		self._topOfBookIndexLock = self.newLock()
+
+	def newLock(self):
+		"""The lock objects use to guard lazily loading their fields, does nothing unless `threadSafe` is set"""
+		return RLock() if self.threadSafe else nullcontext()
+
+	@lockedcache
 	def getMaterial(self, ticker: str):
 		return Material(self.api.material(ticker.upper()), self)
 
-	@lru_cache
+	@lockedcache
 	def getAllMaterials(self):
 		return list(self.getMaterial(materialJson["Ticker"]) for materialJson in self.api.allmaterials())
 
-	@lru_cache
+	@lockedcache
 	def getBuilding(self, ticker: str):
 		return Building(self.api.building(ticker.upper()), self)
 
-	@lru_cache
+	@lockedcache
 	def getAllBuildings(self):
 		# This is done because `Building` loads materials from the FIO API, which is every material if we load all buildings
 		# This also speeds stuff up a lot
 		self.getAllMaterials()
 		return list(self.getBuilding(buildingJson["Ticker"]) for buildingJson in self.api.allbuildings())
 
-	@lru_cache
+	@lockedcache
 	def getRecipe(self, recipeName: str):
 		return Recipe(self.api.recipes(recipeName), self)
 
-	@lru_cache
+	@lockedcache
 	def getAllRecipes(self):
 		return list(self.getRecipe(recipeJson["RecipeName"]) for recipeJson in self.api.allrecipes())
 
-	@lru_cache
+	@lockedcache
+	def getRecipeGraph(self) -> RecipeGraph:
+		"""Every recipe by the materials it makes and uses, see `RecipeGraph`"""
+		# Every recipe that makes something is on a building, and these already know their building
+		return RecipeGraph(recipe for building in self.getAllBuildings() for recipe in building.recipes.values())
+
+	def _indexPlanet(self, planetJson: dict, *aliases: str):
+		"""Gets the one `Planet` for this json, creating it if it's the first time we've seen it"""
+		with self._planetsMapLock:
+			planet = self._planetsMap.get(planetJson["PlanetId"], None)
+			if planet is None:
+				planet = Planet(planetJson, self)
+				self._planetsMap[planet.planetId] = planet
+				self._planetsMap[planet.planetNaturalId] = planet
+				self._planetsMap[planet.planetName] = planet
+			for alias in aliases:
+				self._planetsMap[alias] = planet
+		return planet
+
 	def getPlanet(self, planet: str):
 		"""
 		:param planet: 'PlanetId', 'PlanetNaturalId' or 'PlanetName'
 		"""
-		return Planet(self.api.planet(planet), self)
+		planetObj = self._planetsMap.get(planet, None)
+		if planetObj is None:
+			planetObj = self._indexPlanet(self.api.planet(planet), planet)
+		return planetObj
 
-	@lru_cache
+	@lockedcache
 	def getAllPlanets(self):
-		return list(self.getPlanet(planetJson["PlanetId"]) for planetJson in self.api.allplanets())
+		return list(self._indexPlanet(planetJson) for planetJson in self.api.allplanets())
+
+	@lockedcache
+	def getPlanetTable(self) -> "PlanetTable":
+		"""Every planet as NumPy columns (requires `numpy`), for filtering and sorting them all at once, see `PlanetTable.query()`"""
+		from .PlanetTable import PlanetTable
+		return PlanetTable(self.api.allplanets(), self)
+
+	@lockedcache
+	def getResourceIndex(self) -> ResourceIndex:
+		"""Every planet that has each material as a resource, best factor first"""
+		return ResourceIndex(self.getAllPlanets(), self)
 
-	@lru_cache
+	@lockedcache
 	def getSite(self, username: Optional[str], planet: str):
 		"""
 		:param username:
@@ -82,7 +147,7 @@ class FIO:
 	def clearSiteCache(self):
 		self.api.site.clearCache()  # Method from dbcache.py
 
-	@lru_cache
+	@lockedcache
 	def getStorage(self, username: Optional[str], storageDescription: str):
 		"""
 		:param username:
@@ -101,13 +166,45 @@ class FIO:
 	def clearStorageCache(self):
 		self.api.storage.clearCache()  # Method from dbcache.py
 
-	@lru_cache
+	@lockedcache
 	def getExchanges(self) -> dict[str, Exchange]:
 		return {exchange["ComexCode"]: Exchange(exchange, self) for exchange in self.api.exchangestation()}
 
-	@lru_cache
-	def getExchange(self, exchange: str):
-		return self.getExchanges().get(exchange, None)
+	@lockedcache
+	def getExchangesMap(self) -> dict[str, Exchange]:
+		exchangesMap = {}
+		for exchange in self.getExchanges().values():
+			exchangesMap[exchange.comexId] = exchange
+			exchangesMap[exchange.naturalId] = exchange
+			exchangesMap[exchange.comexCode] = exchange
+		return exchangesMap
+
+	def getExchange(self, exchange: str) -> Optional[Exchange]:
+		"""
+		:param exchange: ComexCode, ComexId or NaturalId
+		"""
+		return self.getExchangesMap().get(exchange, None)
+
+	def getMaterialExchange(self, material: Union[Material, str], exchange: Union[Exchange, str]) -> MaterialExchange:
+		"""
+		The same object is returned every time for a material and exchange, it's refreshed in place whenever FIO has newer data
+		So it's safe to hold on to, unlike the ones in an `ExchangeSnapshot` which never change
+		:param material: Material or it's ticker
+		:param exchange: Exchange or it's ComexCode
+		"""
+		ticker = material.ticker if isinstance(material, Material) else material.upper()
+		exchangeCode = exchange.comexCode if isinstance(exchange, Exchange) else exchange.upper()
+		json = self.api.exchange(ticker, exchangeCode)
+		materialExchange = self._materialExchanges.get((ticker, exchangeCode), None)
+		if materialExchange is None:
+			with self._materialExchangesLock:
+				materialExchange = self._materialExchanges.get((ticker, exchangeCode), None)
+				if materialExchange is None:
+					materialExchange = MaterialExchange(json, self)
+					self._materialExchanges[(ticker, exchangeCode)] = materialExchange
+					return materialExchange
+		materialExchange.refresh(json)
+		return materialExchange
 
 	def clearExchangeCache(self):
 		"""
@@ -119,93 +216,195 @@ class FIO:
 	def clearMaterialExchangeCache(self):
 		self.api.exchange.clearCache()  # Method from dbcache.py
 
-	@lru_cache
-	def getShips(self, username: Optional[str]):
-		username = self.api.default_name if username is None else username
+	def getExchangeSnapshot(self) -> ExchangeSnapshot:
+		"""
+		The current snapshot of every exchange, the same one is returned until `exchangefull()`'s cache expires
+		Hold on to the returned snapshot to keep working with the same point in time
+		When it's refreshed, the changes to every book are published to `orderEvents`
+		"""
+		with self._exchangeSnapshotLock:
+			if self._exchangeSnapshot is None or not self.api.exchangefull.isCached():
+				previous = self._exchangeSnapshot
+				self._exchangeSnapshot = ExchangeSnapshot(self.api.exchangefull(), self)
+				# Anything holding on to a live `MaterialExchange` sees the new data too
+				# They're refreshed first, so their changes are published from what was last seen of them rather than from the previous snapshot
+				for materialExchange in list(self._materialExchanges.values()):
+					updated = self._exchangeSnapshot.getMaterialExchange(materialExchange.material, materialExchange.exchangeCode)
+					if updated is not None and updated.timestamp != materialExchange.timestamp:
+						materialExchange.refresh(self.api.exchange(materialExchange.material.ticker, materialExchange.exchangeCode))
+				if previous is not None and self.orderEvents.hasSubscribers:
+					# Books already published from a live `MaterialExchange` are skipped by `publish()`
+					for diff in diffSnapshots(previous, self._exchangeSnapshot):
+						self.orderEvents.publish(diff)
+			return self._exchangeSnapshot
+
+	def getTopOfBookIndex(self) -> TopOfBookIndex:
+		"""
+		The best bid and ask of every material across every exchange, filled from `exchangeall()` on first use
+		From then on it's updated by every exchange entry fetched from FIO, rather than being rebuilt
+		"""
+		if self._topOfBookIndex is None:
+			with self._topOfBookIndexLock:
+				if self._topOfBookIndex is None:
+					topOfBookIndex = TopOfBookIndex({exchange.comexCode: exchange.currencyCode for exchange in self.getExchanges().values()}, lock=self.newLock())
+					self.api.addExchangeListener(topOfBookIndex.record)
+					topOfBookIndex.record(self.api.exchangeall())
+					# Entries fetched through `exchange()` or `exchangefull()` since `exchangeall()` was cached are newer, so they replace what it had
+					topOfBookIndex.record(self.api.exchange.cachedValues())  # Method from dbcache.py
+					self._topOfBookIndex = topOfBookIndex
+		return self._topOfBookIndex
+
+	def enablePriceHistory(self, *args, **kwargs) -> "PriceHistory":
+		"""
+		Starts recording every exchange refresh into a `PriceHistory` (requires `numpy`), arguments are passed to `PriceHistory`
+		Only data actually fetched from FIO is recorded, whatever is already cached isn't
+		"""
+		from .PriceHistory import PriceHistory
+		self.disablePriceHistory()
+		kwargs.setdefault("lock", self.newLock())
+		self.priceHistory = PriceHistory(*args, **kwargs)
+		self.api.addExchangeListener(self.priceHistory.record)
+		return self.priceHistory
+
+	def disablePriceHistory(self):
+		if self.priceHistory is not None:
+			self.api.removeExchangeListener(self.priceHistory.record)
+			self.priceHistory.close()
+			self.priceHistory = None
+
+	def getMarketMatrix(self):
+		"""The current exchange snapshot as a `MarketMatrix` (requires `numpy`), see `getExchangeSnapshot()`"""
+		return self.getExchangeSnapshot().marketMatrix
+
+	@lockedcache
+	def getShips(self, username: Optional[str]) -> dict[str, Ship]:
+		if username is None:
+			return self.getShips(self.api.default_name)
 		data = self.api.ships(username)
 		return {ship["ShipId"]: Ship(ship, self, username, data["UserNameSubmitted"], data["Timestamp"]) for ship in data["Ships"]}
 
-	@lru_cache
+	@lockedcache
+	def getShipsMap(self, username: Optional[str]) -> dict[str, Ship]:
+		shipsMap = {}
+		for ship in self.getShips(username).values():
+			shipsMap[ship.shipId] = ship
+			shipsMap[ship.registration] = ship
+		return shipsMap
+
+	@lockedcache
 	def getMyShips(self):
 		return self.getShips(None)
 
-	@lru_cache
 	def getShip(self, username: Optional[str], idOrRegistration: str) -> Optional[Ship]:
-		for ship in self.getShips(username).values():
-			if ship.shipId == idOrRegistration or ship.registration == idOrRegistration:
-				return ship
-		return None
+		return self.getShipsMap(username).get(idOrRegistration, None)
 
 	def getMyShip(self, idOrRegistration: str):
 		return self.getShip(None, idOrRegistration)
 
-	@lru_cache
-	def getShipsFuel(self, username: Optional[str]):
-		username = self.api.default_name if username is None else username
+	@lockedcache
+	def getShipsFuel(self, username: Optional[str]) -> list[Storage]:
+		if username is None:
+			return self.getShipsFuel(self.api.default_name)
 		data = self.api.shipsfuel(username)
 		return [Storage(storage, self, username) for storage in data]
 
+	@lockedcache
+	def getShipsFuelMap(self, username: Optional[str]) -> dict[str, Storage]:
+		shipsFuelMap = {}
+		for storage in self.getShipsFuel(username):
+			shipsFuelMap[storage.name] = storage
+			shipsFuelMap[storage.addressableId] = storage
+		return shipsFuelMap
+
 	def getMyShipsFuel(self):
 		return self.getShipsFuel(None)
 
-	@lru_cache
-	def getShipFuel(self, username: Optional[str], idOrRegistration: str):
-		for storage in self.getShipsFuel(username):
-			if storage.addressableId == idOrRegistration or storage.name == idOrRegistration:
-				return storage
-		return None
+	def getShipFuel(self, username: Optional[str], idOrRegistration: str) -> Optional[Storage]:
+		return self.getShipsFuelMap(username).get(idOrRegistration, None)
 
 	def getMyShipFuel(self, idOrRegistration: str):
 		return self.getShipFuel(None, idOrRegistration)
 
-	@lru_cache
+	@lockedcache
 	def getFlights(self, username: Optional[str]) -> dict[str, Flight]:
-		username = self.api.default_name if username is None else username
+		if username is None:
+			return self.getFlights(self.api.default_name)
 		data = self.api.flights(username)
 		return {flight["FlightId"]: Flight(flight, self, username, data["UserNameSubmitted"], data["Timestamp"]) for flight in data["Flights"]}
 
 	def getMyFlights(self):
 		return self.getFlights(None)
 
-	@lru_cache
-	def getFlight(self, username: Optional[str], idOrShipIdOrShipRegistration: str):
+	@lockedcache
+	def getFlightsMap(self, username: Optional[str]) -> dict[str, Flight]:
+		flightsMap = {}
 		for flight in self.getFlights(username).values():
-			if \
-				flight.flightId == idOrShipIdOrShipRegistration or \
-				flight.ship.shipId == idOrShipIdOrShipRegistration or \
-				flight.ship.registration == idOrShipIdOrShipRegistration:
-				return flight
-		return None
+			flightsMap[flight.shipId] = flight
+			ship = flight.ship
+			if ship is not None:
+				flightsMap[ship.registration] = flight
+			flightsMap[flight.flightId] = flight
+		return flightsMap
+
+	def getFlight(self, username: Optional[str], idOrShipIdOrShipRegistration: str) -> Optional[Flight]:
+		return self.getFlightsMap(username).get(idOrShipIdOrShipRegistration, None)
 
 	def getMyFlight(self, idOrRegistration: str):
 		return self.getFlight(None, idOrRegistration)
 
-	@lru_cache
-	def getSystems(self):
+	@lockedcache
+	def getSystems(self) -> list[System]:
 		return list(System(systemJson, self) for systemJson in self.api.systemstars())
 
-	@lru_cache
-	def getSystemsMap(self):
+	@lockedcache
+	def getSystemsMap(self) -> dict[str, System]:
+		# Built from `getSystems()`, so both share the same `System` objects
 		systemsMap = {}
-		for systemJson in self.api.systemstars():
-			system = System(systemJson, self)
-			systemsMap[system.systemId] = system
+		for system in self.getSystems():
 			systemsMap[system.name] = system
 			systemsMap[system.naturalId] = system
+			systemsMap[system.systemId] = system
 		return systemsMap
 
-	@lru_cache
-	def getSystem(self, systemId: str):
+	def getSystem(self, systemId: str) -> Optional[System]:
 		"""
 		:param systemId: SystemId, SystemName or SystemNaturalId
 		"""
 		return self.getSystemsMap().get(systemId, None)
 
-	@lru_cache
-	def getWorldSectors(self):
+	@lockedcache
+	def getJumpGraph(self) -> JumpGraph:
+		"""
+		The star map for working out routes locally, instead of `api.systemstarjumpcount()` or `api.systemstarjumproute()`
+		Call `precompute()` on it to have every jump count ready (and saved to disk)
+		"""
+		return JumpGraph(self.getSystems(), self)
+
+	@lockedcache
+	def getSystemIndex(self) -> SystemIndex:
+		"""A spatial index over system positions, for radius and nearest system (or planet) queries"""
+		return SystemIndex(self.getSystems(), self)
+
+	@lockedcache
+	def getWorldSectors(self) -> dict[str, WorldSector]:
 		return {worldSectorJson["SectorId"]: WorldSector(worldSectorJson, self) for worldSectorJson in self.api.systemstarsworldsectors()}
 
-	@lru_cache
-	def getWorldSector(self, sectorId: str):
-		return self.getWorldSectors().get(sectorId, None)
+	@lockedcache
+	def getWorldSectorsMap(self) -> dict[str, WorldSector]:
+		worldSectorsMap = {}
+		for worldSector in self.getWorldSectors().values():
+			worldSectorsMap[worldSector.name] = worldSector
+			worldSectorsMap[worldSector.sectorId] = worldSector
+		return worldSectorsMap
+
+	def getWorldSector(self, sectorId: str) -> Optional[WorldSector]:
+		"""
+		:param sectorId: SectorId or Name
+		"""
+		return self.getWorldSectorsMap().get(sectorId, None)
+
+	@lockedcache
+	def getSectorIndex(self) -> SectorIndex:
+		"""Which sector a point or system is in, and which systems are in a sector"""
+		return SectorIndex(list(self.getWorldSectors().values()), self.getSystems(), self)
 
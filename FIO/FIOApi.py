@@ -1,10 +1,11 @@
 from datetime import timedelta
-from typing import Optional
-import requests
+from threading import Lock
+from typing import Callable, Optional
 import logging
 
 from .FIOExceptions import *
 from .dbcache import dbcache, ParamOpts
+from .utils import systemNaturalIdOf
 
 
 logger = logging.getLogger("FIOApi")
@@ -16,8 +17,13 @@ class FIOApi:
 
 	def __init__(self, key: str):
 		self.api_key = key
+		self._auth_lock = Lock()
+		# Called with the list of exchange entries, each time `exchange()`, `exchangeall()` or `exchangefull()` actually fetches from FIO
+		self.exchangeListeners: list[Callable[[list[dict]], None]] = []
 
 	def get(self, endpoint: str, body: Optional[dict] = None, exceptions={}, exceptionArgs=(), ignore401=False):
+		# `requests` is imported here, so importing this package doesn't pay for it until something is actually fetched
+		import requests
 		response = requests.get(
 			self.API_URL + endpoint.lstrip("/"),
 			headers={
@@ -47,10 +53,22 @@ class FIOApi:
 	# 		raise FIONotAuthenticated()
 	# 	return response
 
+	def addExchangeListener(self, listener: Callable[[list[dict]], None]):
+		self.exchangeListeners.append(listener)
+
+	def removeExchangeListener(self, listener: Callable[[list[dict]], None]):
+		self.exchangeListeners.remove(listener)
+
+	def _notifyExchangeListeners(self, data: list[dict]):
+		for listener in list(self.exchangeListeners):
+			listener(data)
+
 	@property
 	def default_name(self):
 		if self._auth_name is None:
-			self.auth()
+			with self._auth_lock:
+				if self._auth_name is None:
+					self.auth()
 		return self._auth_name
 
 	def auth(self):
@@ -84,8 +102,35 @@ class FIOApi:
 		data = self.get("/planet/allplanets/full").json()
 		for planetJson in data:
 			self.planet.cacheValue(planetJson, planetJson["PlanetId"])  # 2nd arg us actually not used because of `variedParams`
+		self._cacheSystemPlanets(data)
 		return data
 
+	@dbcache()
+	def allplanetnames(self):
+		"""Only the names of every planet, much smaller than `allplanets()`"""
+		logger.info("allplanetnames()")
+		data = self.get("/planet/allplanets").json()
+		self._cacheSystemPlanets(data)
+		return data
+
+	def _cacheSystemPlanets(self, planetsJson: list[dict]):
+		systemPlanets = {}
+		for planetJson in planetsJson:
+			systemNaturalId = systemNaturalIdOf(planetJson["PlanetNaturalId"])
+			if systemNaturalId is not None:
+				systemPlanets.setdefault(systemNaturalId.upper(), []).append(planetJson["PlanetNaturalId"])
+		for systemNaturalId, planetNaturalIds in systemPlanets.items():
+			self.systemplanets.cacheValue(planetNaturalIds, systemNaturalId)
+
+	@dbcache(paramOpts=[ParamOpts(upper=True)])
+	def systemplanets(self, systemNaturalId: str):
+		"""
+		The PlanetNaturalIds of every planet in a system, this is kept up to date by `allplanets()` and `allplanetnames()`
+		:param systemNaturalId: SystemNaturalId
+		"""
+		logger.info(f"systemplanets(\"{systemNaturalId}\")")
+		return [planetJson["PlanetNaturalId"] for planetJson in self.allplanetnames() if (systemNaturalIdOf(planetJson["PlanetNaturalId"]) or "").upper() == systemNaturalId]
+
 	@dbcache(speedQueryFields=["SystemId"], variedParams={"planet": ("PlanetId", "PlanetNaturalId", "PlanetName")})
 	def planet(self, planet: str):
 		"""
@@ -169,7 +214,9 @@ class FIOApi:
 	@dbcache(paramOpts=[ParamOpts(upper=True), ParamOpts(upper=True)], invalidateTime=timedelta(minutes=15), speedQueryFields=["ExchangeCode"])
 	def exchange(self, material: str, commodityExchange: str):
 		logger.info(f"exchange(\"{material}\", \"{commodityExchange}\")")
-		return self.get(f"/exchange/{material.upper()}.{commodityExchange.upper()}").json()
+		data = self.get(f"/exchange/{material.upper()}.{commodityExchange.upper()}").json()
+		self._notifyExchangeListeners([data])
+		return data
 
 	@dbcache(paramOpts=[ParamOpts(upper=True)])
 	def exchangestation(self):
@@ -180,8 +227,8 @@ class FIOApi:
 	def exchangeall(self):
 		logger.info(f"exchangeall()")
 		data = self.get(f"/exchange/all").json()
-		for exchangeJson in data:
-			self.exchange.cacheValue(exchangeJson, exchangeJson["MaterialTicker"], exchangeJson["ExchangeCode"])
+		# Unlike `exchangefull()`, these aren't cached as `exchange()`, they don't have the orders
+		self._notifyExchangeListeners(data)
 		return data
 
 	@dbcache(paramOpts=[ParamOpts(upper=True)], invalidateTime=timedelta(minutes=15))
@@ -190,6 +237,7 @@ class FIOApi:
 		data = self.get(f"/exchange/full").json()
 		for exchangeJson in data:
 			self.exchange.cacheValue(exchangeJson, exchangeJson["MaterialTicker"], exchangeJson["ExchangeCode"])
+		self._notifyExchangeListeners(data)
 		return data
 
 	@dbcache(paramOpts=[ParamOpts(upper=True)], invalidateTime=timedelta(hours=6))
@@ -1,9 +1,8 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
-from dateutil.parser import isoparse
 
 from .Location import Location
-from .utils import formatTimedelta
+from .utils import formatTimedelta, isoparse
 
 
 if TYPE_CHECKING:
@@ -62,6 +61,7 @@ class FlightSegment:
 class Flight:
 	def __init__(self, json: dict, fio: "FIO", username: str, userNameSubmitted: str, timestamp: str):
 		self.fio = fio
+		self._lock = fio.newLock()
 		self.username = username
 		self.userNameSubmitted = userNameSubmitted
 		self.timestamp = timestamp
@@ -100,13 +100,17 @@ class Flight:
 	@property
 	def origin(self):
 		if self._originLocation is None:
-			self._originLocation = Location.fromLocationString(self.fio, self.originStr)
+			with self._lock:
+				if self._originLocation is None:
+					self._originLocation = Location.fromLocationString(self.fio, self.originStr)
 		return self._originLocation
 
 	@property
 	def destination(self):
 		if self._destinationLocation is None:
-			self._destinationLocation = Location.fromLocationString(self.fio, self.destinationStr)
+			with self._lock:
+				if self._destinationLocation is None:
+					self._destinationLocation = Location.fromLocationString(self.fio, self.destinationStr)
 		return self._destinationLocation
 
 	@property
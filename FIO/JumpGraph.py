@@ -0,0 +1,206 @@
+import hashlib
+import heapq
+import math
+import os
+from array import array
+from collections import deque
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+from .System import System
+from .Planet import Planet
+
+if TYPE_CHECKING:
+	from .FIO import FIO
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jumpgraph.bin")
+# Stored in the all pairs matrix for systems that can't reach each other
+UNREACHABLE = 0xFFFF
+
+
+def _connectionId(connection: Union[dict, str]) -> str:
+	return connection["Connection"] if isinstance(connection, dict) else connection
+
+
+class JumpGraph:
+	"""
+	The star map as a graph, for working out routes without asking FIO for each one
+	Replaces `FIOApi.systemstarjumpcount()` and `systemstarjumproute()`, everything is worked out from `System.connections`
+	"""
+
+	def __init__(self, systems: list[System], fio: "FIO"):
+		self.fio = fio
+		self.systems = systems
+		self.index: dict[str, int] = {system.systemId: i for i, system in enumerate(systems)}
+		self.neighbours: list[list[int]] = [[] for _ in systems]
+		# Distance of each connection, lines up with `neighbours`
+		self.lengths: list[list[float]] = [[] for _ in systems]
+		for i, system in enumerate(systems):
+			for connection in system.connections:
+				j = self.index.get(_connectionId(connection), None)
+				if j is None or j in self.neighbours[i]:
+					continue
+				self.neighbours[i].append(j)
+				self.lengths[i].append(self._distance(i, j))
+		# Jump counts between every pair of systems, only once `precompute()` has been called
+		self._allPairs: Optional[array] = None
+
+	def __repr__(self):
+		return f"<JumpGraph {len(self.systems)} systems{' (precomputed)' if self._allPairs is not None else ''}>"
+
+	def __len__(self):
+		return len(self.systems)
+
+	@property
+	def fingerprint(self):
+		"""Changes whenever the systems or their connections do, so a saved all pairs matrix isn't used for a different map"""
+		digest = hashlib.sha256()
+		for i, system in enumerate(self.systems):
+			digest.update(system.systemId.encode())
+			digest.update(",".join(self.systems[j].systemId for j in sorted(self.neighbours[i])).encode())
+		return digest.hexdigest()
+
+	def resolve(self, location: Union[System, Planet, str]) -> int:
+		"""
+		The index of the system something is in
+		:param location: System, Planet, or a SystemId, SystemName, SystemNaturalId, PlanetId, PlanetNaturalId or PlanetName
+		"""
+		if isinstance(location, System):
+			systemId = location.systemId
+		elif isinstance(location, Planet):
+			systemId = location.systemId
+		else:
+			system = self.fio.getSystem(location)
+			systemId = system.systemId if system is not None else self.fio.getPlanet(location).systemId
+		i = self.index.get(systemId, None)
+		if i is None:
+			raise KeyError(location)
+		return i
+
+	def _distance(self, i: int, j: int):
+		a, b = self.systems[i], self.systems[j]
+		return math.sqrt((a.positionX - b.positionX)**2 + (a.positionY - b.positionY)**2 + (a.positionZ - b.positionZ)**2)
+
+	def distance(self, source: Union[System, Planet, str], destination: Union[System, Planet, str]) -> float:
+		"""The straight line distance, ignoring connections"""
+		return self._distance(self.resolve(source), self.resolve(destination))
+
+	def _bfs(self, source: int) -> list[int]:
+		jumps = [UNREACHABLE] * len(self.systems)
+		jumps[source] = 0
+		queue = deque([source])
+		while len(queue) > 0:
+			i = queue.popleft()
+			for j in self.neighbours[i]:
+				if jumps[j] == UNREACHABLE:
+					jumps[j] = jumps[i] + 1
+					queue.append(j)
+		return jumps
+
+	def jumpsToNearest(self, sources: Iterable[Union[System, Planet, str]]) -> list[int]:
+		"""
+		The jump count from every system to whichever of `sources` is closest, in one pass
+		:return: Lines up with `systems`, `UNREACHABLE` for systems that can't reach any of them
+		"""
+		jumps = [UNREACHABLE] * len(self.systems)
+		queue = deque()
+		for source in sources:
+			i = self.resolve(source)
+			if jumps[i] != 0:
+				jumps[i] = 0
+				queue.append(i)
+		while len(queue) > 0:
+			i = queue.popleft()
+			for j in self.neighbours[i]:
+				if jumps[j] == UNREACHABLE:
+					jumps[j] = jumps[i] + 1
+					queue.append(j)
+		return jumps
+
+	def _jumpsFrom(self, source: int):
+		if self._allPairs is not None:
+			n = len(self.systems)
+			return self._allPairs[source*n:(source+1)*n]
+		return self._bfs(source)
+
+	def jumpsFrom(self, source: Union[System, Planet, str]) -> dict[System, int]:
+		"""The jump count to every system that can be reached"""
+		jumps = self._jumpsFrom(self.resolve(source))
+		return {self.systems[i]: count for i, count in enumerate(jumps) if count != UNREACHABLE}
+
+	def jumpCount(self, source: Union[System, Planet, str], destination: Union[System, Planet, str]) -> Optional[int]:
+		""":return: `None` if it can't be reached"""
+		i, j = self.resolve(source), self.resolve(destination)
+		if self._allPairs is not None:
+			count = self._allPairs[i*len(self.systems) + j]
+		else:
+			count = self._bfs(i)[j]
+		return None if count == UNREACHABLE else count
+
+	def jumpRoute(self, source: Union[System, Planet, str], destination: Union[System, Planet, str]) -> Optional[list[System]]:
+		"""
+		The systems along a route with the fewest jumps, including both ends
+		:return: `None` if it can't be reached
+		"""
+		i, j = self.resolve(source), self.resolve(destination)
+		# Walking back from the destination, each step goes to a system one jump closer to the source
+		jumps = self._jumpsFrom(i)
+		if jumps[j] == UNREACHABLE:
+			return None
+		route = [j]
+		while route[-1] != i:
+			current = route[-1]
+			route.append(next(k for k in self.neighbours[current] if jumps[k] == jumps[current] - 1))
+		return [self.systems[k] for k in reversed(route)]
+
+	def shortestRoute(self, source: Union[System, Planet, str], destination: Union[System, Planet, str]) -> Optional[tuple[list[System], float]]:
+		"""
+		The route with the shortest total distance (rather than the fewest jumps), using Dijkstra
+		:return: The systems along the route, including both ends, and it's distance, `None` if it can't be reached
+		"""
+		i, j = self.resolve(source), self.resolve(destination)
+		distances = {i: 0.0}
+		previous: dict[int, int] = {}
+		heap = [(0.0, i)]
+		while len(heap) > 0:
+			distance, current = heapq.heappop(heap)
+			if current == j:
+				break
+			if distance > distances[current]:
+				continue
+			for k, length in zip(self.neighbours[current], self.lengths[current]):
+				newDistance = distance + length
+				if newDistance < distances.get(k, math.inf):
+					distances[k] = newDistance
+					previous[k] = current
+					heapq.heappush(heap, (newDistance, k))
+		if j not in distances:
+			return None
+		route = [j]
+		while route[-1] != i:
+			route.append(previous[route[-1]])
+		return [self.systems[k] for k in reversed(route)], distances[j]
+
+	def precompute(self, path: Optional[str] = DEFAULT_PATH):
+		"""
+		Works out the jump count between every pair of systems, so `jumpCount()` and `jumpRoute()` are just lookups
+		:param path: Where the matrix is saved, it's loaded from there instead if it was made for the same map, `None` to not use a file
+		"""
+		import quickle
+		fingerprint = self.fingerprint
+		if path is not None and os.path.exists(path):
+			with open(path, "rb") as f:
+				saved = quickle.loads(f.read())
+			if saved["fingerprint"] == fingerprint:
+				allPairs = array("H")
+				allPairs.frombytes(saved["jumps"])
+				self._allPairs = allPairs
+				return self
+		allPairs = array("H")
+		for i in range(len(self.systems)):
+			allPairs.extend(self._bfs(i))
+		self._allPairs = allPairs
+		if path is not None:
+			with open(path, "wb") as f:
+				f.write(quickle.dumps({"fingerprint": fingerprint, "jumps": allPairs.tobytes()}))
+		return self
@@ -0,0 +1,151 @@
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+import numpy as np
+
+from .Material import Material
+from .Exchange import Exchange
+
+if TYPE_CHECKING:
+	from .Exchange import MaterialExchange
+	from .ExchangeSnapshot import ExchangeSnapshot
+
+
+class MarketMatrix:
+	"""
+	Every material on every exchange as NumPy arrays, rows are materials and columns are exchanges
+	Anything that isn't traded (or a material that isn't on an exchange) is `nan`
+	Requires `numpy`, which is why this isn't imported with the rest of the package, use `FIO.getMarketMatrix()`
+	"""
+	FIELDS = ("bid", "ask", "supply", "demand", "mmBuy", "mmSell", "priceAverage")
+
+	def __init__(self, materialExchanges: Iterable["MaterialExchange"], timestamp: Optional[str] = None):
+		materialExchanges = list(materialExchanges)
+		self.timestamp = timestamp
+		self.materials: list[Material] = sorted(set(materialExchange.material for materialExchange in materialExchanges), key=lambda material: material.ticker)
+		self.exchangeCodes: list[str] = sorted(set(materialExchange.exchangeCode for materialExchange in materialExchanges))
+		self.materialIndex: dict[Material, int] = {material: i for i, material in enumerate(self.materials)}
+		self._tickerIndex: dict[str, int] = {material.ticker: i for i, material in enumerate(self.materials)}
+		self.exchangeIndex: dict[str, int] = {exchangeCode: i for i, exchangeCode in enumerate(self.exchangeCodes)}
+
+		shape = (len(self.materials), len(self.exchangeCodes))
+		self.listed = np.zeros(shape, dtype=bool)
+		self.bid = np.full(shape, np.nan)
+		self.ask = np.full(shape, np.nan)
+		self.supply = np.full(shape, np.nan)
+		self.demand = np.full(shape, np.nan)
+		self.mmBuy = np.full(shape, np.nan)
+		self.mmSell = np.full(shape, np.nan)
+		self.priceAverage = np.full(shape, np.nan)
+		for materialExchange in materialExchanges:
+			cell = self.materialIndex[materialExchange.material], self.exchangeIndex[materialExchange.exchangeCode]
+			self.listed[cell] = True
+			for field in self.FIELDS:
+				value = getattr(materialExchange, field)
+				if value is not None:
+					getattr(self, field)[cell] = value
+		for field in self.FIELDS:
+			getattr(self, field).flags.writeable = False
+		self.listed.flags.writeable = False
+
+	@classmethod
+	def fromSnapshot(cls, snapshot: "ExchangeSnapshot"):
+		return cls(snapshot, snapshot.timestamp)
+
+	def __repr__(self):
+		return f"<MarketMatrix {len(self.materials)} materials x {len(self.exchangeCodes)} exchanges>"
+
+	@property
+	def shape(self):
+		return self.listed.shape
+
+	@property
+	def spread(self):
+		"""`ask - bid` on each exchange"""
+		return self.ask - self.bid
+
+	def getMaterialIndex(self, material: Union[Material, str]) -> Optional[int]:
+		"""
+		:param material: Material or it's ticker
+		"""
+		if isinstance(material, str):
+			return self._tickerIndex.get(material.upper(), None)
+		return self.materialIndex.get(material, None)
+
+	def getExchangeIndex(self, exchange: Union[Exchange, str]) -> Optional[int]:
+		"""
+		:param exchange: Exchange or it's ComexCode
+		"""
+		if isinstance(exchange, Exchange):
+			exchange = exchange.comexCode
+		return self.exchangeIndex.get(exchange.upper(), None)
+
+	def _materialRow(self, material: Union[Material, str]) -> int:
+		# Indexing with `None` would add an axis rather than fail
+		i = self.getMaterialIndex(material)
+		if i is None:
+			raise KeyError(f"`{material}` isn't in the market matrix")
+		return i
+
+	def _exchangeColumn(self, exchange: Union[Exchange, str]) -> int:
+		i = self.getExchangeIndex(exchange)
+		if i is None:
+			raise KeyError(f"`{exchange}` isn't in the market matrix")
+		return i
+
+	def row(self, field: str, material: Union[Material, str]) -> dict[str, float]:
+		"""A field for one material, by ComexCode, raises `KeyError` if the material isn't in the matrix"""
+		values = getattr(self, field)[self._materialRow(material)]
+		return dict(zip(self.exchangeCodes, values.tolist()))
+
+	def column(self, field: str, exchange: Union[Exchange, str]) -> dict[Material, float]:
+		"""A field for every material on one exchange, raises `KeyError` if the exchange isn't in the matrix"""
+		values = getattr(self, field)[:, self._exchangeColumn(exchange)]
+		return dict(zip(self.materials, values.tolist()))
+
+	def subset(self, exchanges: Iterable[Union[Exchange, str]]):
+		"""
+		The column indexes for `exchanges`, to index the arrays with (`matrix.ask[:, matrix.subset(...)]`)
+		Raises `KeyError` if any of them isn't in the matrix
+		"""
+		return np.array([self._exchangeColumn(exchange) for exchange in exchanges], dtype=np.intp)
+
+	def _best(self, values: np.ndarray, highest: bool, exchanges: Optional[Iterable[Union[Exchange, str]]]):
+		columns = np.arange(len(self.exchangeCodes)) if exchanges is None else self.subset(exchanges)
+		values = values[:, columns]
+		missing = np.isnan(values)
+		filled = np.where(missing, -np.inf if highest else np.inf, values)
+		best = filled.argmax(axis=1) if highest else filled.argmin(axis=1)
+		rows = np.arange(len(self.materials))
+		bestValues = np.where(missing.all(axis=1), np.nan, values[rows, best])
+		return bestValues, columns[best]
+
+	def lowestAsk(self, exchanges: Iterable[Union[Exchange, str]] = None):
+		"""
+		:param exchanges: Only look at these exchanges, defaults to all of them
+		:return: The lowest ask of each material (`nan` if there are none) and the column it's in
+		"""
+		return self._best(self.ask, False, exchanges)
+
+	def highestBid(self, exchanges: Iterable[Union[Exchange, str]] = None):
+		"""
+		:param exchanges: Only look at these exchanges, defaults to all of them
+		:return: The highest bid of each material (`nan` if there are none) and the column it's in
+		"""
+		return self._best(self.bid, True, exchanges)
+
+	def crossSpread(self, exchanges: Iterable[Union[Exchange, str]] = None):
+		"""The lowest ask minus the highest bid of each material across exchanges, negative means it can be bought on one and sold on another for a profit"""
+		lowestAsk, _ = self.lowestAsk(exchanges)
+		highestBid, _ = self.highestBid(exchanges)
+		return lowestAsk - highestBid
+
+	def cheapest(self, material: Union[Material, str]) -> tuple[Optional[str], Optional[float]]:
+		"""The exchange with the lowest ask for a material, and that ask, both `None` if it has no asks (or isn't in the matrix)"""
+		i = self.getMaterialIndex(material)
+		if i is None:
+			return None, None
+		asks = self.ask[i]
+		if np.isnan(asks).all():
+			return None, None
+		column = int(np.nanargmin(asks))
+		return self.exchangeCodes[column], float(asks[column])
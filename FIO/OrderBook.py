@@ -0,0 +1,176 @@
+import math
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+	from .Exchange import MaterialExchangeOrder
+
+
+class OrderBook:
+	"""
+	One side of a `MaterialExchange`, as parallel arrays with running totals
+	The orders are in the order they'd be filled in, cheapest first for selling orders (asks) and highest first for buying orders (bids)
+	Unlimited orders (the market maker, `itemCount == sys.maxsize`) are not part of the arrays,
+	since nothing after one can ever be reached, the first one is kept as `unlimitedPrice` instead.
+	"""
+
+	def __init__(self, orders: Iterable["MaterialExchangeOrder"], isBid: bool):
+		self.isBid = isBid
+		self.orders: list["MaterialExchangeOrder"] = []
+		self.unlimitedOrder: Optional["MaterialExchangeOrder"] = None
+		self.prices = array("d")
+		self.quantities = array("q")
+		self.cumulativeQuantities = array("q")
+		self.cumulativeCosts = array("d")
+		self.unlimitedPrice: Optional[float] = None
+		quantity, cost = 0, 0.0
+		for order in orders:
+			if order.itemCount == sys.maxsize:
+				self.unlimitedOrder = order
+				self.unlimitedPrice = order.itemCost
+				break
+			if order.itemCount <= 0:
+				continue
+			quantity += order.itemCount
+			cost += order.itemCount * order.itemCost
+			self.orders.append(order)
+			self.prices.append(order.itemCost)
+			self.quantities.append(order.itemCount)
+			self.cumulativeQuantities.append(quantity)
+			self.cumulativeCosts.append(cost)
+		# Prices that always go up, so `bisect` works for both sides
+		self._sortedPrices = array("d", (-price for price in self.prices) if isBid else self.prices)
+
+	@classmethod
+	def fromAsks(cls, sellingOrders: list["MaterialExchangeOrder"]):
+		""":param sellingOrders: `MaterialExchange.sellingOrders`, which is sorted most expensive first"""
+		return cls(reversed(sellingOrders), isBid=False)
+
+	@classmethod
+	def fromBids(cls, buyingOrders: list["MaterialExchangeOrder"]):
+		""":param buyingOrders: `MaterialExchange.buyingOrders`, which is sorted highest first"""
+		return cls(buyingOrders, isBid=True)
+
+	def __repr__(self):
+		return f"<OrderBook {'bids' if self.isBid else 'asks'} {len(self.prices)} orders, depth {self.formatDepth()}>"
+
+	def __len__(self):
+		return len(self.prices)
+
+	@property
+	def isUnlimited(self):
+		return self.unlimitedPrice is not None
+
+	@property
+	def depth(self):
+		"""The amount of items that can be filled, `sys.maxsize` if there is an unlimited order"""
+		if self.isUnlimited:
+			return sys.maxsize
+		return self.cumulativeQuantities[-1] if len(self.cumulativeQuantities) > 0 else 0
+
+	@property
+	def limitedDepth(self):
+		"""The amount of items in the limited orders"""
+		return self.cumulativeQuantities[-1] if len(self.cumulativeQuantities) > 0 else 0
+
+	@property
+	def bestPrice(self) -> Optional[float]:
+		return self.prices[0] if len(self.prices) > 0 else self.unlimitedPrice
+
+	def formatDepth(self):
+		return "∞" if self.isUnlimited else str(self.depth)
+
+	def costFor(self, quantity: int) -> Optional[float]:
+		"""
+		The total cost (or income for bids) of filling `quantity` items, best orders first
+		:return: `None` if there isn't enough in the book
+		"""
+		if quantity <= 0:
+			return 0.0
+		limitedDepth = self.limitedDepth
+		if quantity > limitedDepth:
+			if self.unlimitedPrice is None:
+				return None
+			limitedCost = self.cumulativeCosts[-1] if limitedDepth > 0 else 0.0
+			return limitedCost + (quantity - limitedDepth) * self.unlimitedPrice
+		i = bisect_left(self.cumulativeQuantities, quantity)
+		previousQuantity = self.cumulativeQuantities[i-1] if i > 0 else 0
+		previousCost = self.cumulativeCosts[i-1] if i > 0 else 0.0
+		return previousCost + (quantity - previousQuantity) * self.prices[i]
+
+	def quantityFor(self, budget: float) -> int:
+		"""The most items that can be filled for `budget`, best orders first"""
+		if budget <= 0:
+			return 0
+		i = bisect_right(self.cumulativeCosts, budget)
+		quantity = self.cumulativeQuantities[i-1] if i > 0 else 0
+		remaining = budget - (self.cumulativeCosts[i-1] if i > 0 else 0.0)
+		if i < len(self.prices):
+			price = self.prices[i]
+			limit = self.quantities[i]
+		elif self.unlimitedPrice is not None:
+			price = self.unlimitedPrice
+			limit = sys.maxsize
+		else:
+			return quantity
+		if price <= 0:
+			return quantity + limit if limit != sys.maxsize else sys.maxsize
+		return quantity + min(limit, math.floor(remaining / price))
+
+	def vwap(self, quantity: int) -> Optional[float]:
+		"""The average price per item of filling `quantity` items, `None` if there isn't enough in the book"""
+		if quantity <= 0:
+			return self.bestPrice
+		cost = self.costFor(quantity)
+		return None if cost is None else cost / quantity
+
+	def ordersFor(self, quantity: int) -> list["MaterialExchangeOrder"]:
+		"""The orders that filling `quantity` items would use, best first, as many as there are if there isn't enough"""
+		if quantity <= 0:
+			return []
+		if quantity > self.limitedDepth:
+			return self.orders + ([] if self.unlimitedOrder is None else [self.unlimitedOrder])
+		return self.orders[:bisect_left(self.cumulativeQuantities, quantity)+1]
+
+	def quantityWithin(self, price: float) -> int:
+		"""The amount of items at `price` or better, `sys.maxsize` if that includes an unlimited order"""
+		if self.unlimitedPrice is not None and (self.unlimitedPrice >= price if self.isBid else self.unlimitedPrice <= price):
+			return sys.maxsize
+		i = bisect_right(self._sortedPrices, -price if self.isBid else price)
+		return self.cumulativeQuantities[i-1] if i > 0 else 0
+
+
+def matchBooks(askBook: OrderBook, bidBook: OrderBook, maxQuantity: int = sys.maxsize, stopIfUnprofitable=True) -> Iterator[tuple[int, float, float, "MaterialExchangeOrder", "MaterialExchangeOrder"]]:
+	"""
+	Walks buying from `askBook` and selling into `bidBook` together in a single merge pass, best orders first
+	:param maxQuantity: Stop after this many items, if both books are unlimited this is where it ends
+	:param stopIfUnprofitable: Stop once the bid is no longer above the ask, otherwise keep going until either book runs out
+	:return: Each stretch where both orders stay the same, as `(itemCount, askPrice, bidPrice, askOrder, bidOrder)`
+	"""
+	askOrders, bidOrders = askBook.orders, bidBook.orders
+	askCount, bidCount = len(askOrders), len(bidOrders)
+	askIndex, bidIndex = 0, 0
+	askRemaining = askBook.quantities[0] if askCount > 0 else sys.maxsize
+	bidRemaining = bidBook.quantities[0] if bidCount > 0 else sys.maxsize
+	quantity = 0
+	while quantity < maxQuantity:
+		askOrder = askOrders[askIndex] if askIndex < askCount else askBook.unlimitedOrder
+		bidOrder = bidOrders[bidIndex] if bidIndex < bidCount else bidBook.unlimitedOrder
+		if askOrder is None or bidOrder is None:
+			break
+		askPrice, bidPrice = askOrder.itemCost, bidOrder.itemCost
+		if stopIfUnprofitable and bidPrice <= askPrice:
+			break
+		itemCount = min(askRemaining, bidRemaining, maxQuantity - quantity)
+		yield itemCount, askPrice, bidPrice, askOrder, bidOrder
+		quantity += itemCount
+		askRemaining -= itemCount
+		bidRemaining -= itemCount
+		if askRemaining <= 0:
+			askIndex += 1
+			askRemaining = askBook.quantities[askIndex] if askIndex < askCount else sys.maxsize
+		if bidRemaining <= 0:
+			bidIndex += 1
+			bidRemaining = bidBook.quantities[bidIndex] if bidIndex < bidCount else sys.maxsize
@@ -0,0 +1,184 @@
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Union
+
+from .Material import Material
+from .Exchange import Exchange, MaterialExchange, MaterialExchangeOrder
+
+if TYPE_CHECKING:
+	from .ExchangeSnapshot import ExchangeSnapshot
+
+
+class OrderEvent:
+	"""An order that was added, removed or changed (filled some or repriced) between two refreshes"""
+	ADDED = "added"
+	REMOVED = "removed"
+	CHANGED = "changed"
+
+	def __init__(self, kind: str, isBid: bool, order: MaterialExchangeOrder, previous: Optional[MaterialExchangeOrder] = None):
+		"""
+		:param kind: `ADDED`, `REMOVED` or `CHANGED`
+		:param isBid: If it's a buying order, otherwise it's a selling order
+		:param order: The order as it is now, or as it was last seen if it was removed
+		:param previous: The order before it changed, only for `CHANGED`
+		"""
+		self.kind = kind
+		self.isBid = isBid
+		self.order = order
+		self.previous = previous
+
+	def __repr__(self):
+		return f"<OrderEvent {self.kind} {'bid' if self.isBid else 'ask'} {self.order}>"
+
+	@property
+	def orderId(self):
+		return self.order.orderId
+
+	@property
+	def itemCountChange(self) -> int:
+		"""Negative when items were taken from the order, or it was removed"""
+		if self.kind == self.ADDED:
+			return self.order.itemCount
+		if self.kind == self.REMOVED:
+			return -self.order.itemCount
+		return self.order.itemCount - self.previous.itemCount
+
+	@property
+	def itemCostChange(self) -> float:
+		if self.kind != self.CHANGED:
+			return 0.0
+		return self.order.itemCost - self.previous.itemCost
+
+	@property
+	def isRepriced(self):
+		return self.kind == self.CHANGED and self.order.itemCost != self.previous.itemCost
+
+
+def _diffOrders(previousOrders: list[MaterialExchangeOrder], orders: list[MaterialExchangeOrder], isBid: bool) -> list[OrderEvent]:
+	previousById = {order.orderId: order for order in previousOrders}
+	events = []
+	for order in orders:
+		previous = previousById.pop(order.orderId, None)
+		if previous is None:
+			events.append(OrderEvent(OrderEvent.ADDED, isBid, order))
+		elif previous.itemCount != order.itemCount or previous.itemCost != order.itemCost:
+			events.append(OrderEvent(OrderEvent.CHANGED, isBid, order, previous))
+	for previous in previousById.values():
+		events.append(OrderEvent(OrderEvent.REMOVED, isBid, previous))
+	return events
+
+
+class OrderBookDiff:
+	"""Everything that changed in one material's books on one exchange, between two refreshes"""
+
+	def __init__(
+			self, materialExchange: MaterialExchange,
+			previousBuyingOrders: list[MaterialExchangeOrder], previousSellingOrders: list[MaterialExchangeOrder],
+			buyingOrders: list[MaterialExchangeOrder], sellingOrders: list[MaterialExchangeOrder]
+	):
+		self.materialExchange = materialExchange
+		self.events: list[OrderEvent] = _diffOrders(previousBuyingOrders, buyingOrders, True) + _diffOrders(previousSellingOrders, sellingOrders, False)
+
+	@classmethod
+	def between(cls, previous: MaterialExchange, current: MaterialExchange):
+		return cls(current, previous.buyingOrders, previous.sellingOrders, current.buyingOrders, current.sellingOrders)
+
+	def __repr__(self):
+		return f"<OrderBookDiff `{self.material.ticker}` @ `{self.exchangeCode}` {len(self.events)} events>"
+
+	def __len__(self):
+		return len(self.events)
+
+	def __iter__(self) -> Iterator[OrderEvent]:
+		return iter(self.events)
+
+	@property
+	def material(self) -> Material:
+		return self.materialExchange.material
+
+	@property
+	def exchangeCode(self) -> str:
+		return self.materialExchange.exchangeCode
+
+	@property
+	def added(self):
+		return [event for event in self.events if event.kind == OrderEvent.ADDED]
+
+	@property
+	def removed(self):
+		return [event for event in self.events if event.kind == OrderEvent.REMOVED]
+
+	@property
+	def changed(self):
+		return [event for event in self.events if event.kind == OrderEvent.CHANGED]
+
+
+def diffSnapshots(previous: "ExchangeSnapshot", current: "ExchangeSnapshot") -> list[OrderBookDiff]:
+	"""
+	The books that changed between two snapshots, entries with the same `Timestamp` in both are skipped without comparing them
+	Materials that are only in `current` have every order added, ones only in `previous` aren't included
+	"""
+	diffs = []
+	for materialExchange in current:
+		previousMaterialExchange = previous.getMaterialExchange(materialExchange.material, materialExchange.exchangeCode)
+		if previousMaterialExchange is None:
+			diff = OrderBookDiff(materialExchange, [], [], materialExchange.buyingOrders, materialExchange.sellingOrders)
+		elif previousMaterialExchange.timestamp == materialExchange.timestamp:
+			continue
+		else:
+			diff = OrderBookDiff.between(previousMaterialExchange, materialExchange)
+		if len(diff) > 0:
+			diffs.append(diff)
+	return diffs
+
+
+class OrderEventStream:
+	"""
+	Passes each `OrderBookDiff` on to whoever subscribed to it
+	A book is only published once for each `Timestamp`, the same change can come from both a live `MaterialExchange` and the exchange snapshot
+	"""
+
+	def __init__(self, lock=None):
+		""":param lock: Guards the published timestamps, see `FIO.newLock()`"""
+		self._subscribers: list[tuple[Callable[[OrderBookDiff], None], Optional[str], Optional[str]]] = []
+		self._lock = nullcontext() if lock is None else lock
+		# (ticker, exchangeCode) to the `Timestamp` last published for it
+		self._publishedTimestamps: dict[tuple[str, str], str] = {}
+
+	def __repr__(self):
+		return f"<OrderEventStream {len(self._subscribers)} subscribers>"
+
+	@property
+	def hasSubscribers(self):
+		return len(self._subscribers) > 0
+
+	def subscribe(self, callback: Callable[[OrderBookDiff], None], material: Union[Material, str] = None, exchange: Union[Exchange, str] = None):
+		"""
+		:param material: Only diffs of this material (or ticker), defaults to all of them
+		:param exchange: Only diffs on this exchange (or ComexCode), defaults to all of them
+		:return: `callback`, to pass to `unsubscribe()` later
+		"""
+		ticker = material.ticker if isinstance(material, Material) else (material.upper() if material is not None else None)
+		exchangeCode = exchange.comexCode if isinstance(exchange, Exchange) else (exchange.upper() if exchange is not None else None)
+		self._subscribers.append((callback, ticker, exchangeCode))
+		return callback
+
+	def unsubscribe(self, callback: Callable[[OrderBookDiff], None]):
+		self._subscribers = [subscriber for subscriber in self._subscribers if subscriber[0] != callback]
+
+	def publish(self, diff: OrderBookDiff):
+		""":return: If it was published, rather than skipped for being no newer than the last one published for that book"""
+		timestamp = diff.materialExchange.timestamp
+		if timestamp is not None:
+			key = diff.material.ticker, diff.exchangeCode
+			with self._lock:
+				publishedTimestamp = self._publishedTimestamps.get(key, None)
+				if publishedTimestamp is not None and timestamp <= publishedTimestamp:
+					return False
+				self._publishedTimestamps[key] = timestamp
+		for callback, ticker, exchangeCode in list(self._subscribers):
+			if ticker is not None and ticker != diff.material.ticker:
+				continue
+			if exchangeCode is not None and exchangeCode != diff.exchangeCode:
+				continue
+			callback(diff)
+		return True
@@ -1,8 +1,8 @@
+import math
 from datetime import datetime
 from typing import TYPE_CHECKING
-from dateutil.parser import isoparse
 
-from ..utils import formatTimedelta
+from ..utils import formatTimedelta, isoparse
 
 if TYPE_CHECKING:
 	from .FIO import FIO
@@ -60,6 +60,47 @@ class PlanetCOGCUpkeep:
 		raise NotImplementedError(str(json))
 
 
+def environmentClass(surface: bool, pressure: float, gravity: float, temperature: float) -> tuple[bool, int, int, int]:
+	"""
+	Everything about a planet's environment that changes what buildings need, planets in the same class need the same extra materials
+	:return: (surface, pressure, gravity, temperature), each of the last three is `-1` for low, `0` for normal and `1` for high
+	"""
+	return (
+		bool(surface),
+		-1 if pressure < 0.25 else 1 if pressure > 2 else 0,
+		-1 if gravity < 0.25 else 1 if gravity > 2.5 else 0,
+		-1 if temperature < -25 else 1 if temperature > 75 else 0,
+	)
+
+
+def additionalBuildMaterials(environment: tuple[bool, int, int, int], area: int) -> dict[str, int]:
+	"""
+	The extra materials a building needs in an environment
+	:param environment: See `environmentClass()`
+	:return: The amount of each material, by ticker
+	"""
+	surface, pressure, gravity, temperature = environment
+	additionalMaterials = {}
+	# https://handbook.apex.prosperousuniverse.com/wiki/building-costs/#costs-calculation
+	if surface:
+		additionalMaterials["MCG"] = area * 4
+	else:
+		additionalMaterials["AEF"] = math.ceil(area / 3)
+	if pressure < 0:
+		additionalMaterials["SEA"] = area * 1
+	elif pressure > 0:
+		additionalMaterials["HSE"] = 1
+	if gravity < 0:
+		additionalMaterials["MGC"] = 1
+	elif gravity > 0:
+		additionalMaterials["BL"] = 1
+	if temperature < 0:
+		additionalMaterials["INS"] = area * 10
+	elif temperature > 0:
+		additionalMaterials["TSH"] = 1
+	return additionalMaterials
+
+
 class Planet:
 	def __init__(self, json: dict, fio: "FIO"):
 		self.fio = fio
@@ -77,9 +118,9 @@ class Planet:
 		self.productionFees = {}
 		for feeJson in json["ProductionFees"]:
 			productionFee = PlanetProductionFee(feeJson, fio)
-			if productionFee.category not in self.buildRequirements:
-				self.buildRequirements[productionFee.category] = {}
-			self.buildRequirements[productionFee.category][productionFee.workforceLevel] = productionFee
+			if productionFee.category not in self.productionFees:
+				self.productionFees[productionFee.category] = {}
+			self.productionFees[productionFee.category][productionFee.workforceLevel] = productionFee
 
 		self.cogcPrograms = []
 		for programJson in json["COGCPrograms"]:
@@ -173,23 +214,9 @@ class Planet:
 	def formatTimedelta(self):
 		return formatTimedelta(self.timedelta)
 
+	@property
+	def environmentClass(self):
+		return environmentClass(self.surface, self.pressure, self.gravity, self.temperature)
+
 	def getAdditionalBuildMaterials(self, area: int):
-		additionalMaterials = {}
-		# https://handbook.apex.prosperousuniverse.com/wiki/building-costs/#costs-calculation
-		if self.surface:
-			additionalMaterials[self.fio.getMaterial("MCG")] = area * 4
-		else:
-			additionalMaterials[self.fio.getMaterial("AEF")] = area / 3
-		if self.pressure < 0.25:
-			additionalMaterials[self.fio.getMaterial("SEA")] = area * 1
-		elif self.pressure > 2:
-			additionalMaterials[self.fio.getMaterial("HSE")] = 1
-		if self.gravity < 0.25:
-			additionalMaterials[self.fio.getMaterial("MGC")] = 1
-		elif self.gravity > 2.5:
-			additionalMaterials[self.fio.getMaterial("BL")] = 1
-		if self.temperature < -25:
-			additionalMaterials[self.fio.getMaterial("INS")] = area * 10
-		elif self.gravity > 75:
-			additionalMaterials[self.fio.getMaterial("TSH")] = 1
-		return additionalMaterials
+		return {self.fio.getMaterial(ticker): amount for ticker, amount in additionalBuildMaterials(self.environmentClass, area).items()}
@@ -0,0 +1,245 @@
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Union
+
+import numpy as np
+
+from .Material import Material
+from .Planet import Planet, environmentClass, additionalBuildMaterials
+from .JumpGraph import UNREACHABLE
+
+if TYPE_CHECKING:
+	from .FIO import FIO
+
+
+class PlanetTable:
+	"""
+	Every planet as NumPy columns, one entry per planet, for filtering and sorting all of them at once
+	Built straight from `allplanets()`, so no `Planet` objects are made until they're asked for
+	Requires `numpy`, which is why this isn't imported with the rest of the package, use `FIO.getPlanetTable()`
+	"""
+	FLOAT_FIELDS = {
+		"gravity": "Gravity", "pressure": "Pressure", "temperature": "Temperature", "fertility": "Fertility",
+		"radiation": "Radiation", "sunlight": "Sunlight", "magneticField": "MagneticField", "massEarth": "MassEarth",
+		"baseLocalMarketFee": "BaseLocalMarketFee", "localMarketFeeFactor": "LocalMarketFeeFactor", "warehouseFee": "WarehouseFee",
+		"planetTier": "PlanetTier",
+	}
+	BOOL_FIELDS = {
+		"surface": "Surface", "hasLocalMarket": "HasLocalMarket", "hasChamberOfCommerce": "HasChamberOfCommerce",
+		"hasWarehouse": "HasWarehouse", "hasAdministrationCenter": "HasAdministrationCenter", "hasShipyard": "HasShipyard",
+	}
+
+	def __init__(self, planetsJson: list[dict], fio: "FIO"):
+		self.fio = fio
+		self.planetIds: list[str] = [planetJson["PlanetId"] for planetJson in planetsJson]
+		self.planetNaturalIds: list[str] = [planetJson["PlanetNaturalId"] for planetJson in planetsJson]
+		self.planetNames: list[str] = [planetJson["PlanetName"] for planetJson in planetsJson]
+		self.systemIds: list[str] = [planetJson["SystemId"] for planetJson in planetsJson]
+		self.planetIndex: dict[str, int] = {}
+		for i in range(len(planetsJson)):
+			self.planetIndex[self.planetNames[i]] = i
+			self.planetIndex[self.planetNaturalIds[i]] = i
+			self.planetIndex[self.planetIds[i]] = i
+
+		self.gravity: np.ndarray
+		self.pressure: np.ndarray
+		self.temperature: np.ndarray
+		self.fertility: np.ndarray
+		self.surface: np.ndarray
+		self.hasLocalMarket: np.ndarray
+		self.hasShipyard: np.ndarray
+		self.hasWarehouse: np.ndarray
+		for field, key in self.FLOAT_FIELDS.items():
+			setattr(self, field, np.array([np.nan if planetJson.get(key, None) is None else planetJson[key] for planetJson in planetsJson], dtype=np.float64))
+		for field, key in self.BOOL_FIELDS.items():
+			setattr(self, field, np.array([bool(planetJson.get(key, False)) for planetJson in planetsJson], dtype=bool))
+
+		# (category, workforce level) -> fee on each planet, `nan` if the planet doesn't have that fee
+		self.productionFees: dict[tuple[str, str], np.ndarray] = {}
+		for i, planetJson in enumerate(planetsJson):
+			for feeJson in planetJson.get("ProductionFees", ()):
+				key = feeJson["Category"], feeJson["WorkforceLevel"]
+				if key not in self.productionFees:
+					self.productionFees[key] = np.full(len(planetsJson), np.nan)
+				self.productionFees[key][i] = feeJson["FeeAmount"]
+
+		# Rows are materials, columns are planets, `0` where a planet doesn't have that resource
+		materialsById = {material.matId: material for material in fio.getAllMaterials()}
+		resources = [
+			(i, materialsById[resourceJson["MaterialId"]], resourceJson["ResourceType"], resourceJson["Factor"])
+			for i, planetJson in enumerate(planetsJson) for resourceJson in planetJson.get("Resources", ())
+			if resourceJson["MaterialId"] in materialsById
+		]
+		self.resourceMaterials: list[Material] = sorted(set(resource[1] for resource in resources), key=lambda material: material.ticker)
+		self.resourceIndex: dict[Material, int] = {material: i for i, material in enumerate(self.resourceMaterials)}
+		self.resourceFactors = np.zeros((len(self.resourceMaterials), len(planetsJson)))
+		self.resourceTypes = np.full((len(self.resourceMaterials), len(planetsJson)), None, dtype=object)
+		for i, material, resourceType, factor in resources:
+			self.resourceFactors[self.resourceIndex[material], i] = factor
+			self.resourceTypes[self.resourceIndex[material], i] = resourceType
+
+		for column in (*self.FLOAT_FIELDS, *self.BOOL_FIELDS):
+			getattr(self, column).flags.writeable = False
+		for fees in self.productionFees.values():
+			fees.flags.writeable = False
+		self.resourceFactors.flags.writeable = False
+
+		# Planets in the same class need the same extra build materials, so those are only worked out once per class
+		classes = [
+			environmentClass(*values)
+			for values in zip(self.surface.tolist(), self.pressure.tolist(), self.gravity.tolist(), self.temperature.tolist())
+		]
+		self.environmentClasses: list[tuple[bool, int, int, int]] = sorted(set(classes))
+		classIndex = {environment: i for i, environment in enumerate(self.environmentClasses)}
+		self.environmentClassIndices = np.array([classIndex[environment] for environment in classes], dtype=np.int64)
+		self.environmentClassIndices.flags.writeable = False
+		self._exchangeJumps: Optional[np.ndarray] = None
+
+	def __repr__(self):
+		return f"<PlanetTable {len(self)} planets>"
+
+	def __len__(self):
+		return len(self.planetIds)
+
+	def column(self, column: str) -> np.ndarray:
+		return getattr(self, column)
+
+	def getPlanetIndex(self, planet: Union[Planet, str]) -> int:
+		""":param planet: Planet, 'PlanetId', 'PlanetNaturalId' or 'PlanetName'"""
+		return self.planetIndex[planet.planetId if isinstance(planet, Planet) else planet]
+
+	def getPlanet(self, i: int) -> Planet:
+		return self.fio.getPlanet(self.planetIds[i])
+
+	def resourceFactor(self, material: Union[Material, str]) -> np.ndarray:
+		"""The factor of a resource on every planet, `0` where it isn't there"""
+		if isinstance(material, str):
+			material = self.fio.getMaterial(material)
+		row = self.resourceIndex.get(material, None)
+		if row is None:
+			return np.zeros(len(self))
+		return self.resourceFactors[row]
+
+	def productionFee(self, category: str, workforceLevel: str) -> np.ndarray:
+		return self.productionFees.get((category, workforceLevel), np.full(len(self), np.nan))
+
+	def additionalBuildMaterials(self, area: int) -> dict[str, np.ndarray]:
+		"""
+		`Planet.getAdditionalBuildMaterials()` for every planet at once
+		:return: The amount of each material (by ticker) needed on each planet, `0` where it isn't needed
+		"""
+		classAmounts: dict[str, np.ndarray] = {}
+		for i, environment in enumerate(self.environmentClasses):
+			for ticker, amount in additionalBuildMaterials(environment, area).items():
+				classAmounts.setdefault(ticker, np.zeros(len(self.environmentClasses)))[i] = amount
+		return {ticker: amounts[self.environmentClassIndices] for ticker, amounts in classAmounts.items()}
+
+	@property
+	def exchangeJumps(self) -> np.ndarray:
+		"""The jump count from each planet to the nearest commodity exchange, `inf` if none can be reached"""
+		if self._exchangeJumps is None:
+			graph = self.fio.getJumpGraph()
+			jumps = graph.jumpsToNearest(exchange.systemId for exchange in self.fio.getExchanges().values())
+			exchangeJumps = np.array([
+				np.inf if systemId not in graph.index or jumps[graph.index[systemId]] == UNREACHABLE else jumps[graph.index[systemId]]
+				for systemId in self.systemIds
+			], dtype=np.float64)
+			exchangeJumps.flags.writeable = False
+			self._exchangeJumps = exchangeJumps
+		return self._exchangeJumps
+
+	def query(self) -> "PlanetQuery":
+		"""Every planet, narrow it down with `PlanetQuery.where()` and friends"""
+		return PlanetQuery(self, np.arange(len(self)))
+
+
+class PlanetQuery:
+	"""
+	Some of the planets in a `PlanetTable`, each method returns a new query so they can be chained
+	```
+	table.query().between("gravity", 0.25, 2.5).where(table.temperature >= -25).resourceAtLeast("LST", 0.2).sortBy("fertility", descending=True).limit(10).planets
+	```
+	"""
+
+	def __init__(self, table: PlanetTable, indices: np.ndarray):
+		self.table = table
+		# Into the table's columns, in the order of this query
+		self.indices = indices
+
+	def __repr__(self):
+		return f"<PlanetQuery {len(self)} planets>"
+
+	def __len__(self):
+		return len(self.indices)
+
+	def __iter__(self) -> Iterator[Planet]:
+		return iter(self.planets)
+
+	def _values(self, values: Union[str, np.ndarray, Callable[[PlanetTable], np.ndarray]]) -> np.ndarray:
+		"""A column name, an array over every planet, or a function of the table that gives one"""
+		if isinstance(values, str):
+			values = self.table.column(values)
+		elif callable(values):
+			values = values(self.table)
+		return np.asarray(values)
+
+	def where(self, mask: Union[str, np.ndarray, Callable[[PlanetTable], np.ndarray]]) -> "PlanetQuery":
+		""":param mask: A boolean column over every planet (or it's name), or a function of the table that gives one"""
+		return PlanetQuery(self.table, self.indices[self._values(mask)[self.indices]])
+
+	def between(self, column: str, low: float = None, high: float = None) -> "PlanetQuery":
+		"""Planets with `column` from `low` to `high` (inclusive), either can be left out"""
+		values = self._values(column)[self.indices]
+		mask = np.ones(len(self.indices), dtype=bool)
+		if low is not None:
+			mask &= values >= low
+		if high is not None:
+			mask &= values <= high
+		return PlanetQuery(self.table, self.indices[mask])
+
+	def withFlags(self, **flags: bool) -> "PlanetQuery":
+		"""e.g. `withFlags(hasShipyard=True, surface=False)`"""
+		query = self
+		for flag, value in flags.items():
+			query = query.where(self.table.column(flag) == value)
+		return query
+
+	def resourceAtLeast(self, material: Union[Material, str], factor: float) -> "PlanetQuery":
+		return self.where(self.table.resourceFactor(material) >= factor)
+
+	def withinExchangeJumps(self, jumps: int) -> "PlanetQuery":
+		"""Planets at most `jumps` jumps from a commodity exchange"""
+		return self.where(self.table.exchangeJumps <= jumps)
+
+	def withoutMaterials(self, *tickers: str, area: int = 1) -> "PlanetQuery":
+		"""Planets that don't need any of these extra build materials, e.g. `withoutMaterials("INS", "SEA")`"""
+		additionalMaterials = self.table.additionalBuildMaterials(area)
+		query = self
+		for ticker in tickers:
+			if ticker in additionalMaterials:
+				query = query.where(additionalMaterials[ticker] <= 0)
+		return query
+
+	def sortBy(self, key: Union[str, np.ndarray, Callable[[PlanetTable], np.ndarray]], descending=False) -> "PlanetQuery":
+		"""Stable, so sorting by one key and then another sorts by the second, then the first"""
+		values = self._values(key)[self.indices]
+		if descending:
+			# Negated rather than reversed, so equal values keep their order, bool (like `hasShipyard`) and unsigned columns can't be negated as they are
+			if values.dtype.kind in "bu":
+				values = values.astype(np.int64)
+			values = -values
+		order = np.argsort(values, kind="stable")
+		return PlanetQuery(self.table, self.indices[order])
+
+	def limit(self, count: int) -> "PlanetQuery":
+		return PlanetQuery(self.table, self.indices[:count])
+
+	def column(self, column: Union[str, np.ndarray, Callable[[PlanetTable], np.ndarray]]) -> np.ndarray:
+		"""The values of a column for just these planets, in order"""
+		return self._values(column)[self.indices]
+
+	@property
+	def planetNaturalIds(self) -> list[str]:
+		return [self.table.planetNaturalIds[i] for i in self.indices]
+
+	@property
+	def planets(self) -> list[Planet]:
+		return [self.table.getPlanet(i) for i in self.indices]
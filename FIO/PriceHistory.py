@@ -0,0 +1,318 @@
+import atexit
+import os
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+from .Material import Material
+from .Exchange import Exchange
+from .utils import isoparse
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricehistory.npz")
+
+
+def _toEpochMs(dt: datetime) -> int:
+	if dt.tzinfo is None:
+		# FIO's timestamps are UTC, so naive datetimes are taken to be too
+		dt = dt.replace(tzinfo=timezone.utc)
+	return int(dt.timestamp() * 1000)
+
+
+def _toKey(material: Union[Material, str], exchange: Union[Exchange, str]):
+	ticker = material.ticker if isinstance(material, Material) else material.upper()
+	exchangeCode = exchange.comexCode if isinstance(exchange, Exchange) else exchange.upper()
+	return ticker, exchangeCode
+
+
+def _rollingSums(values: np.ndarray, window: int):
+	"""The sum and count of the non `nan` values in each window, for every full window"""
+	valid = ~np.isnan(values)
+	sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+	counts = np.concatenate(([0], np.cumsum(valid)))
+	return sums[window:] - sums[:-window], counts[window:] - counts[:-window]
+
+
+class PriceSeries:
+	"""
+	The recorded history of one material on one exchange, as NumPy arrays sorted by time
+	Missing values are `nan`, windows are counted in samples, since refreshes aren't evenly spaced
+	"""
+	COLUMNS = ("price", "bid", "ask", "supply", "demand", "traded")
+
+	def __init__(self, ticker: str, exchangeCode: str, times: np.ndarray, columns: dict[str, np.ndarray]):
+		self.ticker = ticker
+		self.exchangeCode = exchangeCode
+		# Milliseconds since the unix epoch
+		self.times = times
+		self.price: np.ndarray = columns["price"]
+		self.bid: np.ndarray = columns["bid"]
+		self.ask: np.ndarray = columns["ask"]
+		self.supply: np.ndarray = columns["supply"]
+		self.demand: np.ndarray = columns["demand"]
+		# The amount traded in the day before each sample
+		self.traded: np.ndarray = columns["traded"]
+
+	def __repr__(self):
+		return f"<PriceSeries `{self.ticker}` @ `{self.exchangeCode}` {len(self)} samples>"
+
+	def __len__(self):
+		return len(self.times)
+
+	@property
+	def datetimes(self) -> np.ndarray:
+		return self.times.astype("datetime64[ms]")
+
+	def column(self, column: str) -> np.ndarray:
+		return getattr(self, column)
+
+	def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> "PriceSeries":
+		"""The samples from `start` up to (but not including) `end`, either can be left out, naive datetimes are UTC"""
+		startIndex = 0 if start is None else np.searchsorted(self.times, _toEpochMs(start), side="left")
+		endIndex = len(self.times) if end is None else np.searchsorted(self.times, _toEpochMs(end), side="left")
+		return PriceSeries(
+			self.ticker, self.exchangeCode, self.times[startIndex:endIndex],
+			{column: self.column(column)[startIndex:endIndex] for column in self.COLUMNS}
+		)
+
+	def movingAverage(self, window: int, column: str = "price") -> np.ndarray:
+		"""The average of each `window` samples, the result lines up with `times[window-1:]`"""
+		if window <= 0 or window > len(self):
+			return np.empty(0)
+		sums, counts = _rollingSums(self.column(column), window)
+		with np.errstate(invalid="ignore", divide="ignore"):
+			return np.where(counts > 0, sums / counts, np.nan)
+
+	def vwap(self) -> float:
+		"""Price weighted by the amount traded, `nan` if nothing was traded"""
+		valid = ~(np.isnan(self.price) | np.isnan(self.traded))
+		traded = self.traded[valid].sum()
+		if traded <= 0:
+			return np.nan
+		return float((self.price[valid] * self.traded[valid]).sum() / traded)
+
+	def rollingVwap(self, window: int) -> np.ndarray:
+		"""`vwap()` of each `window` samples, the result lines up with `times[window-1:]`"""
+		if window <= 0 or window > len(self):
+			return np.empty(0)
+		valid = ~(np.isnan(self.price) | np.isnan(self.traded))
+		weighted, _ = _rollingSums(np.where(valid, self.price * self.traded, np.nan), window)
+		traded, _ = _rollingSums(np.where(valid, self.traded, np.nan), window)
+		with np.errstate(invalid="ignore", divide="ignore"):
+			return np.where(traded > 0, weighted / traded, np.nan)
+
+	def returns(self) -> np.ndarray:
+		"""Log returns between consecutive samples of price, the result lines up with `times[1:]`"""
+		with np.errstate(invalid="ignore", divide="ignore"):
+			return np.diff(np.log(self.price))
+
+	def volatility(self) -> float:
+		"""The standard deviation of `returns()`"""
+		returns = self.returns()
+		returns = returns[np.isfinite(returns)]
+		if len(returns) < 2:
+			return np.nan
+		return float(returns.std(ddof=1))
+
+	def rollingVolatility(self, window: int) -> np.ndarray:
+		"""`volatility()` of each `window` returns, the result lines up with `times[window:]`"""
+		returns = self.returns()
+		returns[~np.isfinite(returns)] = np.nan
+		if window < 2 or window > len(returns):
+			return np.empty(0)
+		sums, counts = _rollingSums(returns, window)
+		squares, _ = _rollingSums(returns * returns, window)
+		with np.errstate(invalid="ignore", divide="ignore"):
+			variance = (squares - sums * sums / counts) / (counts - 1)
+		return np.where(counts > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+
+class PriceHistory:
+	"""
+	Every `exchange()`, `exchangeall()` and `exchangefull()` refresh, appended to a local `.npz` file
+	Each material on each exchange is a set of columns (see `PriceSeries.COLUMNS`), refreshes with a `Timestamp` that's already recorded are skipped
+	Samples older than `downsampleAfter` are merged into one per `downsampleInterval` when saving, so the file doesn't grow forever
+	Saving rewrites the whole file, so refreshes are only saved every `saveInterval` (and when the program exits), call `save()` to save right away
+	Requires `numpy`, use `FIO.enablePriceHistory()` to start recording
+	"""
+	JSON_KEYS = {"price": "Price", "bid": "Bid", "ask": "Ask", "supply": "Supply", "demand": "Demand", "traded": "Traded"}
+
+	def __init__(
+			self, path: str = DEFAULT_PATH,
+			downsampleAfter: Optional[timedelta] = timedelta(days=7), downsampleInterval: timedelta = timedelta(hours=1),
+			saveInterval: Optional[timedelta] = timedelta(minutes=5), lock=None
+	):
+		"""
+		:param path: Where the history is kept, it's loaded from here if it already exists
+		:param downsampleAfter: How old samples get before they are downsampled, `None` to keep every sample
+		:param saveInterval: The least time between saves when refreshes add something, `None` to only save when `save()` is called
+		:param lock: Guards the series and saving, see `FIO.newLock()`
+		"""
+		self.path = path
+		self.downsampleAfter = downsampleAfter
+		self.downsampleInterval = downsampleInterval
+		self.saveInterval = saveInterval
+		self._lock = nullcontext() if lock is None else lock
+		self._unsaved = False
+		self._lastSave = monotonic()
+		self._times: dict[tuple[str, str], np.ndarray] = {}
+		self._columns: dict[tuple[str, str], dict[str, np.ndarray]] = {}
+		# Rows recorded since the arrays were last rebuilt
+		self._pending: dict[tuple[str, str], list[tuple]] = {}
+		self._pendingTimes: dict[tuple[str, str], set[int]] = {}
+		if os.path.exists(self.path):
+			self.load()
+		if self.saveInterval is not None:
+			atexit.register(self.saveIfUnsaved)
+
+	def __repr__(self):
+		return f"<PriceHistory {len(self)} series `{self.path}`>"
+
+	def __len__(self):
+		return len(set(self._times) | set(self._pending))
+
+	def __iter__(self) -> Iterator[tuple[str, str]]:
+		"""(ticker, exchangeCode) of every series"""
+		return iter(sorted(set(self._times) | set(self._pending)))
+
+	def __contains__(self, key: tuple[Union[Material, str], Union[Exchange, str]]):
+		key = _toKey(*key)
+		return key in self._times or key in self._pending
+
+	def record(self, data: list[dict]) -> int:
+		"""
+		Adds exchange entries (as returned from `FIOApi.exchange()`, `exchangeall()` or `exchangefull()`)
+		:return: The amount of entries that weren't already recorded
+		"""
+		recorded = 0
+		with self._lock:
+			for exchangeJson in data:
+				timestamp = exchangeJson.get("Timestamp", None)
+				if timestamp is None:
+					continue
+				key = exchangeJson["MaterialTicker"], exchangeJson["ExchangeCode"]
+				time = _toEpochMs(isoparse(timestamp))
+				if self._isRecorded(key, time):
+					continue
+				row = (time, *(np.nan if exchangeJson.get(jsonKey, None) is None else float(exchangeJson[jsonKey]) for jsonKey in self.JSON_KEYS.values()))
+				self._pending.setdefault(key, []).append(row)
+				self._pendingTimes.setdefault(key, set()).add(time)
+				recorded += 1
+			if recorded > 0:
+				self._unsaved = True
+				if self.saveInterval is not None and monotonic() - self._lastSave >= self.saveInterval.total_seconds():
+					self.save()
+		return recorded
+
+	def _isRecorded(self, key: tuple[str, str], time: int):
+		if time in self._pendingTimes.get(key, ()):
+			return True
+		times = self._times.get(key, None)
+		if times is None:
+			return False
+		i = np.searchsorted(times, time)
+		return i < len(times) and times[i] == time
+
+	def _flush(self, key: tuple[str, str]):
+		"""Merges the pending rows of a series into it's arrays"""
+		rows = self._pending.pop(key, None)
+		self._pendingTimes.pop(key, None)
+		if rows is None:
+			return
+		pending = np.array(rows, dtype=np.float64)
+		times = np.concatenate((self._times.get(key, np.empty(0, dtype=np.int64)), pending[:, 0].astype(np.int64)))
+		columns = {}
+		for i, column in enumerate(PriceSeries.COLUMNS):
+			columns[column] = np.concatenate((self._columns[key][column] if key in self._columns else np.empty(0), pending[:, i+1]))
+		times, order = np.unique(times, return_index=True)
+		self._times[key] = times
+		self._columns[key] = {column: values[order] for column, values in columns.items()}
+
+	def _flushAll(self):
+		for key in list(self._pending):
+			self._flush(key)
+
+	def getSeries(self, material: Union[Material, str], exchange: Union[Exchange, str], start: Optional[datetime] = None, end: Optional[datetime] = None) -> Optional[PriceSeries]:
+		"""
+		:param start: Only samples from this point, defaults to the first one
+		:param end: Only samples before this point, defaults to the last one
+		:return: `None` if nothing has been recorded for it
+		"""
+		key = _toKey(material, exchange)
+		with self._lock:
+			self._flush(key)
+			if key not in self._times:
+				return None
+			series = PriceSeries(key[0], key[1], self._times[key], self._columns[key])
+		return series.between(start, end)
+
+	def downsample(self, before: Optional[datetime] = None):
+		"""
+		Merges samples before `before` into one per `downsampleInterval`, the latest time in each interval is kept and the values are averaged
+		:param before: Defaults to `downsampleAfter` ago
+		"""
+		if before is None:
+			if self.downsampleAfter is None:
+				return
+			before = datetime.now(timezone.utc) - self.downsampleAfter
+		cutoff = _toEpochMs(before)
+		interval = int(self.downsampleInterval.total_seconds() * 1000)
+		with self._lock:
+			self._flushAll()
+			for key, times in self._times.items():
+				old = np.searchsorted(times, cutoff, side="left")
+				if old <= 1:
+					continue
+				buckets = times[:old] // interval
+				starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+				if len(starts) == old:
+					continue
+				ends = np.concatenate((starts[1:], [old])) - 1
+				self._times[key] = np.concatenate((times[ends], times[old:]))
+				for column, values in self._columns[key].items():
+					valid = ~np.isnan(values[:old])
+					sums = np.add.reduceat(np.where(valid, values[:old], 0.0), starts)
+					counts = np.add.reduceat(valid, starts)
+					with np.errstate(invalid="ignore", divide="ignore"):
+						merged = np.where(counts > 0, sums / counts, np.nan)
+					self._columns[key][column] = np.concatenate((merged, values[old:]))
+
+	def load(self):
+		with self._lock, np.load(self.path, allow_pickle=False) as data:
+			for name in data.files:
+				ticker, exchangeCode, column = name.split(".")
+				if column == "time":
+					self._times[(ticker, exchangeCode)] = data[name]
+				else:
+					self._columns.setdefault((ticker, exchangeCode), {})[column] = data[name]
+
+	def saveIfUnsaved(self):
+		"""Saves if anything has been recorded since the last save"""
+		with self._lock:
+			if self._unsaved:
+				self.save()
+
+	def close(self):
+		"""Saves anything unsaved, and stops it being saved on exit"""
+		self.saveIfUnsaved()
+		atexit.unregister(self.saveIfUnsaved)
+
+	def save(self):
+		with self._lock:
+			self._flushAll()
+			self.downsample()
+			arrays = {}
+			for (ticker, exchangeCode), times in self._times.items():
+				arrays[f"{ticker}.{exchangeCode}.time"] = times
+				for column, values in self._columns[(ticker, exchangeCode)].items():
+					arrays[f"{ticker}.{exchangeCode}.{column}"] = values
+			# Written to a temporary file first, so a crash while saving doesn't lose the existing history
+			temporaryPath = f"{self.path}.tmp"
+			with open(temporaryPath, "wb") as f:
+				np.savez_compressed(f, **arrays)
+			os.replace(temporaryPath, self.path)
+			self._unsaved = False
+			self._lastSave = monotonic()
@@ -0,0 +1,149 @@
+import heapq
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+from .Material import Material
+from .Exchange import Exchange, MaterialExchangeOrder
+from .Storage import Storage
+
+if TYPE_CHECKING:
+	from .ExchangeSnapshot import ExchangeSnapshot
+
+
+class ProcurementFill:
+	"""Some items bought from one selling order"""
+
+	def __init__(self, exchangeCode: str, order: MaterialExchangeOrder, itemCount: int):
+		self.exchangeCode = exchangeCode
+		self.order = order
+		self.itemCount = itemCount
+
+	def __repr__(self):
+		return f"<ProcurementFill `{self.itemCount}x{self.order.materialExchange.material.ticker}` {self.order.itemCost:.2f} @ `{self.exchangeCode}`>"
+
+	@property
+	def cost(self):
+		"""In the currency of the exchange it's bought on"""
+		return self.itemCount * self.order.itemCost
+
+
+class MaterialProcurement:
+	"""How one material on a shopping list gets bought"""
+
+	def __init__(self, material: Material, required: int, inStorage: int):
+		self.material = material
+		self.required = required
+		self.inStorage = inStorage
+		self.fills: list[ProcurementFill] = []
+		self.bought = 0
+		# Comparable across exchanges, see `planProcurement()`'s `exchangeRates`
+		self.cost = 0.0
+
+	def __repr__(self):
+		return f"<MaterialProcurement `{self.bought}/{self.toBuy}x{self.material.ticker}` for {self.cost:.2f}>"
+
+	@property
+	def toBuy(self):
+		return max(self.required - self.inStorage, 0)
+
+	@property
+	def shortfall(self):
+		"""The amount that couldn't be bought, as there wasn't enough on the exchanges"""
+		return self.toBuy - self.bought
+
+	@property
+	def exchangeCosts(self) -> dict[str, float]:
+		"""The cost on each exchange used, in that exchange's currency"""
+		exchangeCosts = {}
+		for fill in self.fills:
+			exchangeCosts[fill.exchangeCode] = exchangeCosts.get(fill.exchangeCode, 0.0) + fill.cost
+		return exchangeCosts
+
+
+class ProcurementPlan:
+	"""The cheapest way to buy everything on a shopping list, split across exchanges"""
+
+	def __init__(self, exchangeRates: dict[str, float]):
+		self.exchangeRates = exchangeRates
+		self.materials: dict[Material, MaterialProcurement] = {}
+
+	def __repr__(self):
+		return f"<ProcurementPlan {len(self.materials)} materials for {self.totalCost:.2f}{'' if self.isComplete else ' (incomplete)'}>"
+
+	@property
+	def totalCost(self):
+		"""The cost of everything, comparable across exchanges, see `planProcurement()`'s `exchangeRates`"""
+		return sum(materialProcurement.cost for materialProcurement in self.materials.values())
+
+	@property
+	def isComplete(self):
+		return all(materialProcurement.shortfall <= 0 for materialProcurement in self.materials.values())
+
+	@property
+	def shortfalls(self) -> dict[Material, int]:
+		return {material: materialProcurement.shortfall for material, materialProcurement in self.materials.items() if materialProcurement.shortfall > 0}
+
+	@property
+	def exchangeCosts(self) -> dict[str, float]:
+		"""The total to spend on each exchange, in that exchange's currency"""
+		exchangeCosts = {}
+		for materialProcurement in self.materials.values():
+			for exchangeCode, cost in materialProcurement.exchangeCosts.items():
+				exchangeCosts[exchangeCode] = exchangeCosts.get(exchangeCode, 0.0) + cost
+		return exchangeCosts
+
+	@property
+	def fills(self) -> list[ProcurementFill]:
+		return [fill for materialProcurement in self.materials.values() for fill in materialProcurement.fills]
+
+
+def planProcurement(
+		snapshot: "ExchangeSnapshot", materials: dict[Material, int],
+		exchanges: Iterable[Union[Exchange, str]] = None, storage: Optional[Storage] = None, exchangeRates: dict[str, float] = None
+) -> ProcurementPlan:
+	"""
+	The cheapest way to buy `materials`, taking the cheapest selling orders across all of `exchanges` first
+	:param materials: The amount needed of each material
+	:param exchanges: The exchanges to buy from, defaults to all of them
+	:param storage: If supplied, what's already in it doesn't need to be bought
+	:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+	"""
+	exchangeRates = {} if exchangeRates is None else exchangeRates
+	if exchanges is None:
+		exchangeCodes = snapshot.exchangeCodes
+	else:
+		exchangeCodes = [exchange.comexCode if isinstance(exchange, Exchange) else exchange for exchange in exchanges]
+	plan = ProcurementPlan(exchangeRates)
+	for material, amount in materials.items():
+		inStorage = storage.getItemAmount(material) if storage is not None else 0
+		materialProcurement = MaterialProcurement(material, amount, inStorage)
+		plan.materials[material] = materialProcurement
+		remaining = materialProcurement.toBuy
+		if remaining <= 0:
+			continue
+		# Merges the selling orders of every exchange, cheapest first
+		heap = []
+		books = []
+		for exchangeCode in exchangeCodes:
+			materialExchange = snapshot.getMaterialExchange(material, exchangeCode)
+			if materialExchange is None:
+				continue
+			book = materialExchange.askBook
+			orders = book.orders + ([] if book.unlimitedOrder is None else [book.unlimitedOrder])
+			if len(orders) <= 0:
+				continue
+			rate = exchangeRates.get(materialExchange.currency, 1)
+			books.append((exchangeCode, orders, rate))
+			heap.append((orders[0].itemCost * rate, len(books)-1, 0))
+		heapq.heapify(heap)
+		while remaining > 0 and len(heap) > 0:
+			price, bookIndex, orderIndex = heapq.heappop(heap)
+			exchangeCode, orders, rate = books[bookIndex]
+			order = orders[orderIndex]
+			itemCount = min(remaining, order.itemCount)
+			materialProcurement.fills.append(ProcurementFill(exchangeCode, order, itemCount))
+			materialProcurement.bought += itemCount
+			materialProcurement.cost += itemCount * price
+			remaining -= itemCount
+			if orderIndex + 1 < len(orders):
+				heapq.heappush(heap, (orders[orderIndex+1].itemCost * rate, bookIndex, orderIndex+1))
+	return plan
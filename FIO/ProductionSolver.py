@@ -0,0 +1,127 @@
+from typing import Optional
+
+from .Material import Material
+from .Building import Building
+from .Recipe import Recipe
+from .RecipeGraph import RecipeGraph
+
+# Past this many crafts production is treated as unbounded
+MAX_CRAFTS = 2**62
+
+
+def _ceilDivide(a: int, b: int):
+	return -(-a // b)
+
+
+def _chain(recipe: Recipe, requirementsRecipes: dict[Material, Recipe]) -> Optional[list[Recipe]]:
+	"""
+	The recipe and every recipe it can call on for inputs, each before the recipes that make it's inputs
+	:return: `None` if crafts can't be counted a material at a time, when there's a cycle or a recipe makes something another recipe is used for
+	"""
+	# Post order, so recipes making inputs come before the recipes using them
+	postOrder: list[Recipe] = []
+	visited: set[Recipe] = set()
+	work = [(recipe, iter(recipe.inputs))]
+	visited.add(recipe)
+	while len(work) > 0:
+		current, inputs = work[-1]
+		material = next(inputs, None)
+		if material is None:
+			work.pop()
+			postOrder.append(current)
+			continue
+		producer = requirementsRecipes.get(material, None)
+		if producer is not None and producer not in visited:
+			visited.add(producer)
+			work.append((producer, iter(producer.inputs)))
+
+	graph = RecipeGraph(postOrder)
+	if graph.hasCycles:
+		return None
+	for chainRecipe in postOrder:
+		for material in chainRecipe.outputs:
+			if len(graph.getConsumers(material)) > 0 and requirementsRecipes.get(material, None) != chainRecipe:
+				return None
+	return postOrder[::-1]
+
+
+def _crafts(chain: list[Recipe], count: int, resourcesAvailable: dict[Material, int], requirementsRecipes: dict[Material, Recipe]) -> tuple[dict[Recipe, int], dict[Material, int]]:
+	"""
+	How many times each recipe is used making `count` of the first recipe, each is only used as much as it's outputs are short
+	:return: The crafts of each recipe, and the total amount used of each material
+	"""
+	crafts = {chain[0]: count}
+	demand: dict[Material, int] = {}
+	for recipe in chain:
+		if recipe not in crafts:
+			crafts[recipe] = max((
+				_ceilDivide(demand[material] - resourcesAvailable.get(material, 0), output.amount)
+				for material, output in recipe.outputs.items()
+				if material in demand and requirementsRecipes.get(material, None) == recipe
+			), default=0)
+			crafts[recipe] = max(crafts[recipe], 0)
+		for material, recipeInput in recipe.inputs.items():
+			demand[material] = demand.get(material, 0) + recipeInput.amount * crafts[recipe]
+	return crafts, demand
+
+
+def _isFeasible(
+		chain: list[Recipe], count: int, resourcesAvailable: dict[Material, int], requirementsRecipes: dict[Material, Recipe],
+		buildingCaps: dict[Building, Optional[int]]
+):
+	crafts, demand = _crafts(chain, count, resourcesAvailable, requirementsRecipes)
+	for material, amount in demand.items():
+		if material not in requirementsRecipes and amount > resourcesAvailable.get(material, 0):
+			return False
+	buildingCrafts: dict[Building, int] = {}
+	for recipe, recipeCrafts in crafts.items():
+		buildingCrafts[recipe.building] = buildingCrafts.get(recipe.building, 0) + recipeCrafts
+	for building, buildingCount in buildingCrafts.items():
+		cap = buildingCaps[building]
+		if cap is not None and buildingCount > cap:
+			return False
+	return True
+
+
+def solveProduction(
+		recipe: Recipe, resourcesAvailable: dict[Material, int], requirementsRecipes: dict[Material, Recipe],
+		buildingUseLimits: dict[Building, int], buildingsUsed: dict[Building, int]
+) -> Optional[dict[Recipe, int]]:
+	"""
+	The most times `recipe` can be used in full, working out whole batches rather than one craft at a time
+	Matches `PrUnStuff.sim_produceRecipe()`, each input is only made as much as it's short, and buildings follow `buildingUseLimits`
+	The count is found by binary search, each check is one pass over the recipes involved
+	:param requirementsRecipes: The recipe used to make each material when it's short
+	:param buildingsUsed: What's been used already, left unchanged
+	:return: How many times each recipe is used, `None` if this can't be worked out in batches (cycles, byproducts used as inputs, or unlimited production)
+	"""
+	chain = _chain(recipe, requirementsRecipes)
+	if chain is None:
+		return None
+
+	# The most more times each building can be used, see `sim_produceRecipe()`, the first use of a building is always allowed
+	buildingCaps: dict[Building, Optional[int]] = {}
+	for chainRecipe in chain:
+		building = chainRecipe.building
+		limit = buildingUseLimits.get(building, None)
+		if limit is None:
+			buildingCaps[building] = None
+		elif building in buildingsUsed:
+			buildingCaps[building] = max(limit - buildingsUsed[building], 0)
+		else:
+			buildingCaps[building] = max(limit, 1)
+
+	low, high = 0, 1
+	while _isFeasible(chain, high, resourcesAvailable, requirementsRecipes, buildingCaps):
+		low, high = high, high * 2
+		if high > MAX_CRAFTS:
+			return None
+	while high - low > 1:
+		middle = (low + high) // 2
+		if _isFeasible(chain, middle, resourcesAvailable, requirementsRecipes, buildingCaps):
+			low = middle
+		else:
+			high = middle
+	crafts, demand = _crafts(chain, low, resourcesAvailable, requirementsRecipes)
+	# In the order `sim_produceRecipe()` would first use them
+	return {chainRecipe: crafts[chainRecipe] for chainRecipe in reversed(chain) if crafts[chainRecipe] > 0}
@@ -59,13 +59,13 @@ class Recipe:
 		return hash((self.__class__, self.recipeName))
 
 	def isMaterialInput(self, material: Material):
-		return any(material == recipeInput.material for recipeInput in self.inputs.values())
+		return material in self.inputs
 
 	def isMaterialOutput(self, material: Material):
-		return any(material == recipeOutput.material for recipeOutput in self.outputs.values())
+		return material in self.outputs
 
 	@property
 	def building(self):
 		if self._building is None:
-			self.fio.getBuilding(self.buildingTicker)
+			self._building = self.fio.getBuilding(self.buildingTicker)
 		return self._building
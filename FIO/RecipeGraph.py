@@ -0,0 +1,171 @@
+from collections import deque
+from typing import Iterable, Optional, Union
+
+from .Material import Material
+from .Recipe import Recipe
+from .Building import Building
+
+
+class RecipeGraph:
+	"""
+	Which recipes make and use each material, so following a production chain doesn't scan every recipe
+	Use `FIO.getRecipeGraph()` for every recipe, or make one from just the recipes being looked at (e.g. the ones a site can run)
+	"""
+
+	def __init__(self, recipes: Iterable[Recipe]):
+		self.recipes: list[Recipe] = []
+		self._recipesByName: dict[str, Recipe] = {}
+		for recipe in recipes:
+			# Recipes with the same name are the same recipe, only the first is kept
+			if recipe.recipeName not in self._recipesByName:
+				self._recipesByName[recipe.recipeName] = recipe
+				self.recipes.append(recipe)
+		self._producers: dict[Material, list[Recipe]] = {}
+		self._consumers: dict[Material, list[Recipe]] = {}
+		self._recipesByBuilding: dict[str, list[Recipe]] = {}
+		for recipe in self.recipes:
+			for material in recipe.outputs:
+				self._producers.setdefault(material, []).append(recipe)
+			for material in recipe.inputs:
+				self._consumers.setdefault(material, []).append(recipe)
+			self._recipesByBuilding.setdefault(recipe.buildingTicker, []).append(recipe)
+		# Material -> everything needed to make it, filled in as they're asked for
+		self._requiredMaterials: dict[Material, tuple[Material, ...]] = {}
+		self._cycles: Optional[list[list[Material]]] = None
+
+	def __repr__(self):
+		return f"<RecipeGraph {len(self.recipes)} recipes>"
+
+	def __len__(self):
+		return len(self.recipes)
+
+	def __contains__(self, recipe: Recipe):
+		return recipe.recipeName in self._recipesByName
+
+	@property
+	def materials(self) -> list[Material]:
+		"""Every material made or used by a recipe"""
+		return list(dict.fromkeys([*self._producers, *self._consumers]))
+
+	def getRecipe(self, recipeName: str) -> Optional[Recipe]:
+		return self._recipesByName.get(recipeName, None)
+
+	def getProducers(self, material: Material) -> list[Recipe]:
+		"""Every recipe that outputs the material"""
+		return list(self._producers.get(material, ()))
+
+	def getConsumers(self, material: Material) -> list[Recipe]:
+		"""Every recipe that takes the material as an input"""
+		return list(self._consumers.get(material, ()))
+
+	def getRecipesInBuilding(self, building: Union[Building, str]) -> list[Recipe]:
+		""":param building: Building or it's ticker"""
+		return list(self._recipesByBuilding.get(building.ticker if isinstance(building, Building) else building, ()))
+
+	def getRequiredMaterials(self, target: Union[Material, Recipe]) -> list[Material]:
+		"""
+		Everything that goes into making something, the inputs of the recipes that make it, and the inputs of the recipes that make those, and so on
+		Each material is only followed once, so cycles (and materials used in many places) don't repeat anything
+		:param target: A material, or a recipe to just follow it's inputs
+		"""
+		if isinstance(target, Material):
+			required = self._requiredMaterials.get(target, None)
+			if required is None:
+				required = tuple(self._walkInputs([material for recipe in self._producers.get(target, ()) for material in recipe.inputs]))
+				self._requiredMaterials[target] = required
+			return list(required)
+		return self._walkInputs(list(target.inputs))
+
+	def _walkInputs(self, inputs: list[Material]) -> list[Material]:
+		found: dict[Material, None] = {}
+		queue = deque(inputs)
+		while len(queue) > 0:
+			material = queue.popleft()
+			if material in found:
+				continue
+			found[material] = None
+			for recipe in self._producers.get(material, ()):
+				queue.extend(recipe.inputs)
+		return list(found)
+
+	def findCycles(self) -> list[list[Material]]:
+		"""
+		Groups of materials that can each be made (eventually) from the others, e.g. a recipe that needs some of what it makes
+		:return: Each cycle's materials, empty if there are none
+		"""
+		if self._cycles is None:
+			self._cycles = self._stronglyConnected()
+		return [list(cycle) for cycle in self._cycles]
+
+	@property
+	def hasCycles(self):
+		return len(self.findCycles()) > 0
+
+	def _stronglyConnected(self) -> list[list[Material]]:
+		"""Tarjan's algorithm over materials, an edge goes from each input of a recipe to each of it's outputs, without recursion"""
+		index: dict[Material, int] = {}
+		lowLink: dict[Material, int] = {}
+		onStack: set[Material] = set()
+		stack: list[Material] = []
+		cycles = []
+
+		def successors(material: Material):
+			return [output for recipe in self._consumers.get(material, ()) for output in recipe.outputs]
+
+		for root in self.materials:
+			if root in index:
+				continue
+			work = [(root, iter(successors(root)))]
+			index[root] = lowLink[root] = len(index)
+			stack.append(root)
+			onStack.add(root)
+			while len(work) > 0:
+				material, children = work[-1]
+				child = next(children, None)
+				if child is not None:
+					if child not in index:
+						index[child] = lowLink[child] = len(index)
+						stack.append(child)
+						onStack.add(child)
+						work.append((child, iter(successors(child))))
+					elif child in onStack:
+						lowLink[material] = min(lowLink[material], index[child])
+					continue
+				work.pop()
+				if len(work) > 0:
+					parent = work[-1][0]
+					lowLink[parent] = min(lowLink[parent], lowLink[material])
+				if lowLink[material] == index[material]:
+					component = []
+					while True:
+						member = stack.pop()
+						onStack.discard(member)
+						component.append(member)
+						if member == material:
+							break
+					if len(component) > 1 or material in successors(material):
+						cycles.append(component[::-1])
+		return cycles
+
+	def topologicalOrder(self) -> list[Recipe]:
+		"""
+		Every recipe, with the recipes making a material before the recipes using it
+		:raises Exception: If the recipes have a cycle, see `findCycles()`
+		"""
+		# A recipe waits on every other recipe that makes one of it's inputs
+		waitingOn: dict[Recipe, int] = {}
+		for recipe in self.recipes:
+			waitingOn[recipe] = len({producer for material in recipe.inputs for producer in self._producers.get(material, ()) if producer != recipe})
+		queue = deque(recipe for recipe in self.recipes if waitingOn[recipe] <= 0)
+		order = []
+		while len(queue) > 0:
+			recipe = queue.popleft()
+			order.append(recipe)
+			consumers = dict.fromkeys(consumer for material in recipe.outputs for consumer in self._consumers.get(material, ()) if consumer != recipe)
+			for consumer in consumers:
+				waitingOn[consumer] -= 1
+				if waitingOn[consumer] <= 0:
+					queue.append(consumer)
+		if len(order) < len(self.recipes):
+			raise Exception(f"Recipes have a cycle through {', '.join(material.ticker for material in self.findCycles()[0])}")
+		return order
@@ -0,0 +1,118 @@
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from .Material import Material
+from .Planet import Planet
+
+if TYPE_CHECKING:
+	from .FIO import FIO
+
+
+# The building that extracts each resource type
+EXTRACTORS = {"MINERAL": "EXT", "LIQUID": "RIG", "GASEOUS": "COL"}
+# Units a day from a factor of 1, before efficiency (experts, COGC programs, workforce satisfaction)
+EXTRACTION_RATES = {"EXT": 70, "RIG": 70, "COL": 60}
+
+
+class ResourceDeposit:
+	"""A resource on one planet"""
+
+	def __init__(self, planet: Planet, material: Material, resourceType: str, factor: float):
+		self.planet = planet
+		self.material = material
+		self.resourceType = resourceType
+		self.factor = factor
+
+	def __repr__(self):
+		return f"<ResourceDeposit `{self.material.ticker}` {self.factor:.4f} ({self.resourceType}) @ `{self.planet.planetNaturalId}`>"
+
+	@property
+	def extractorTicker(self) -> Optional[str]:
+		"""The ticker of the building that extracts this, `None` for an unknown resource type"""
+		return EXTRACTORS.get(self.resourceType, None)
+
+	def dailyOutput(self, efficiency: float = 1) -> float:
+		"""The amount one extractor gets a day, `0` for an unknown resource type"""
+		return self.factor * EXTRACTION_RATES.get(self.extractorTicker, 0) * efficiency
+
+
+class ResourceIndex:
+	"""
+	Every planet that has each material as a resource, best factor first
+	Use `FIO.getResourceIndex()`, which builds it once from every planet
+	"""
+
+	def __init__(self, planets: list[Planet], fio: "FIO"):
+		self.fio = fio
+		materialsById = {material.matId: material for material in fio.getAllMaterials()}
+		self._deposits: dict[Material, list[ResourceDeposit]] = {}
+		for planet in planets:
+			for resource in planet.resources.values():
+				material = materialsById.get(resource.materialId, None)
+				if material is None:
+					continue
+				self._deposits.setdefault(material, []).append(ResourceDeposit(planet, material, resource.resourceType, resource.factor))
+		# Negated factors, lines up with `_deposits`, for bisecting
+		self._negatedFactors: dict[Material, list[float]] = {}
+		for material, deposits in self._deposits.items():
+			deposits.sort(key=lambda deposit: (-deposit.factor, deposit.planet.planetNaturalId))
+			self._negatedFactors[material] = [-deposit.factor for deposit in deposits]
+		# (PlanetId, Material) -> deposit
+		self._byPlanet: dict[tuple[str, Material], ResourceDeposit] = {
+			(deposit.planet.planetId, material): deposit for material, deposits in self._deposits.items() for deposit in deposits
+		}
+
+	def __repr__(self):
+		return f"<ResourceIndex {len(self._deposits)} materials>"
+
+	def __len__(self):
+		return len(self._deposits)
+
+	@property
+	def materials(self) -> list[Material]:
+		"""Every material that's a resource somewhere"""
+		return list(self._deposits)
+
+	def _material(self, material: Union[Material, str]) -> Material:
+		return material if isinstance(material, Material) else self.fio.getMaterial(material)
+
+	def getDeposits(self, material: Union[Material, str], minFactor: float = None, resourceType: str = None) -> list[ResourceDeposit]:
+		"""
+		:param material: Material or it's ticker
+		:param minFactor: Only deposits with at least this factor
+		:param resourceType: Only deposits of this type, e.g. 'GASEOUS'
+		:return: Best factor first
+		"""
+		material = self._material(material)
+		deposits = self._deposits.get(material, [])
+		if minFactor is not None:
+			deposits = deposits[:bisect_right(self._negatedFactors.get(material, []), -minFactor)]
+		if resourceType is not None:
+			return [deposit for deposit in deposits if deposit.resourceType == resourceType]
+		return list(deposits)
+
+	def top(self, material: Union[Material, str], k: int = 1, predicate: Callable[[ResourceDeposit], bool] = None) -> list[ResourceDeposit]:
+		"""
+		:param predicate: Only deposits this returns `True` for are included, e.g. `lambda deposit: deposit.planet.surface`
+		:return: The `k` deposits with the best factor
+		"""
+		found = []
+		for deposit in self._deposits.get(self._material(material), ()):
+			if len(found) >= k:
+				break
+			if predicate is None or predicate(deposit):
+				found.append(deposit)
+		return found
+
+	def getDeposit(self, planet: Union[Planet, str], material: Union[Material, str]) -> Optional[ResourceDeposit]:
+		"""
+		:param planet: Planet, 'PlanetId', 'PlanetNaturalId' or 'PlanetName'
+		:return: `None` if the planet doesn't have the resource
+		"""
+		planetId = planet.planetId if isinstance(planet, Planet) else self.fio.getPlanet(planet).planetId
+		return self._byPlanet.get((planetId, self._material(material)), None)
+
+	def dailyOutput(self, planet: Union[Planet, str], material: Union[Material, str], efficiency: float = 1) -> float:
+		"""The amount one extractor on the planet gets a day, `0` if it doesn't have the resource"""
+		deposit = self.getDeposit(planet, material)
+		return 0 if deposit is None else deposit.dailyOutput(efficiency)
@@ -0,0 +1,149 @@
+import math
+from typing import TYPE_CHECKING, Optional, Sequence, Union
+
+from .System import System
+from .Planet import Planet
+from .WorldSector import WorldSector, SubSector
+
+if TYPE_CHECKING:
+	import numpy as np
+	from .FIO import FIO
+
+
+def _containsPoint(vertices: list[tuple[float, float]], x: float, y: float):
+	"""Ray casting, the polygon is looked at from above (X and Y)"""
+	inside = False
+	j = len(vertices) - 1
+	for i in range(len(vertices)):
+		xi, yi = vertices[i]
+		xj, yj = vertices[j]
+		if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+			inside = not inside
+		j = i
+	return inside
+
+
+class SectorIndex:
+	"""
+	Which sub sector (and so which world sector) a point is in, and which systems are in a sector
+	Sub sectors are looked at from above (X and Y of their vertices), a grid over them means only a few polygons are checked per point
+	Use `FIO.getSectorIndex()`, which builds it once
+	"""
+
+	def __init__(self, worldSectors: list[WorldSector], systems: list[System], fio: "FIO"):
+		self.fio = fio
+		self.worldSectors = worldSectors
+		self.subSectors: list[SubSector] = []
+		# Lines up with `subSectors`
+		self.subSectorWorldSectors: list[WorldSector] = []
+		self._polygons: list[list[tuple[float, float]]] = []
+		for worldSector in worldSectors:
+			for subSector in worldSector.subSectors:
+				self.subSectors.append(subSector)
+				self.subSectorWorldSectors.append(worldSector)
+				self._polygons.append([(x, y) for x, y, z in subSector.vertices])
+		self.subSectorIndex: dict[str, int] = {subSector.ssId: i for i, subSector in enumerate(self.subSectors)}
+
+		self._systemsBySector: dict[str, list[System]] = {}
+		self._systemsBySubSector: dict[str, list[System]] = {}
+		for system in systems:
+			self._systemsBySector.setdefault(system.sectorId, []).append(system)
+			self._systemsBySubSector.setdefault(system.subSectorId, []).append(system)
+
+		# Each grid cell lists the sub sectors whose bounding box overlaps it
+		xs = [x for polygon in self._polygons for x, y in polygon]
+		ys = [y for polygon in self._polygons for x, y in polygon]
+		self._minX, self._minY = (min(xs), min(ys)) if len(xs) > 0 else (0.0, 0.0)
+		width, height = (max(xs) - self._minX, max(ys) - self._minY) if len(xs) > 0 else (0.0, 0.0)
+		# About one sub sector per cell
+		self.cellSize = max(math.sqrt(width * height / max(len(self._polygons), 1)), 1e-9)
+		self._grid: dict[tuple[int, int], list[int]] = {}
+		for i, polygon in enumerate(self._polygons):
+			if len(polygon) < 3:
+				continue
+			lowX, lowY = self._cell(min(x for x, y in polygon), min(y for x, y in polygon))
+			highX, highY = self._cell(max(x for x, y in polygon), max(y for x, y in polygon))
+			for cellX in range(lowX, highX + 1):
+				for cellY in range(lowY, highY + 1):
+					self._grid.setdefault((cellX, cellY), []).append(i)
+
+	def __repr__(self):
+		return f"<SectorIndex {len(self.worldSectors)} sectors {len(self.subSectors)} sub sectors>"
+
+	def _cell(self, x: float, y: float):
+		return math.floor((x - self._minX) / self.cellSize), math.floor((y - self._minY) / self.cellSize)
+
+	def _toPoint(self, location: Union[System, Planet, str, tuple[float, float]]):
+		if isinstance(location, tuple):
+			return location[0], location[1]
+		if isinstance(location, Planet):
+			location = location.system
+		elif isinstance(location, str):
+			system = self.fio.getSystem(location)
+			location = system if system is not None else self.fio.getPlanet(location).system
+		return location.positionX, location.positionY
+
+	def _find(self, x: float, y: float) -> int:
+		for i in self._grid.get(self._cell(x, y), ()):
+			if _containsPoint(self._polygons[i], x, y):
+				return i
+		return -1
+
+	def getSubSector(self, location: Union[System, Planet, str, tuple[float, float]]) -> Optional[SubSector]:
+		"""
+		:param location: A position (only X and Y are used), System, Planet, or a SystemId, SystemName, SystemNaturalId, PlanetId, PlanetNaturalId or PlanetName
+		:return: `None` if it's outside every sub sector
+		"""
+		i = self._find(*self._toPoint(location))
+		return self.subSectors[i] if i >= 0 else None
+
+	def getWorldSector(self, location: Union[System, Planet, str, tuple[float, float]]) -> Optional[WorldSector]:
+		""":return: `None` if it's outside every sector"""
+		i = self._find(*self._toPoint(location))
+		return self.subSectorWorldSectors[i] if i >= 0 else None
+
+	def getSystemsInSector(self, worldSector: Union[WorldSector, str]) -> list[System]:
+		""":param worldSector: WorldSector or it's SectorId"""
+		sectorId = worldSector.sectorId if isinstance(worldSector, WorldSector) else worldSector
+		return list(self._systemsBySector.get(sectorId, ()))
+
+	def getSystemsInSubSector(self, subSector: Union[SubSector, str]) -> list[System]:
+		""":param subSector: SubSector or it's SSId"""
+		ssId = subSector.ssId if isinstance(subSector, SubSector) else subSector
+		return list(self._systemsBySubSector.get(ssId, ()))
+
+	def classifyPoints(self, xs: Sequence[float], ys: Sequence[float]) -> "np.ndarray":
+		"""
+		`getSubSector()` for many points at once (e.g. every pixel of a map), requires `numpy`
+		:return: The index into `subSectors` of each point, `-1` for points outside every sub sector
+		"""
+		import numpy as np
+		xs = np.asarray(xs, dtype=np.float64).ravel()
+		ys = np.asarray(ys, dtype=np.float64).ravel()
+		result = np.full(len(xs), -1, dtype=np.int64)
+		if len(xs) <= 0:
+			return result
+		# Points are grouped by grid cell, so each sub sector only tests the points in the cells it overlaps
+		cellXs = np.floor((xs - self._minX) / self.cellSize).astype(np.int64)
+		cellYs = np.floor((ys - self._minY) / self.cellSize).astype(np.int64)
+		cells, cellOfPoint = np.unique(np.stack((cellXs, cellYs), axis=1), axis=0, return_inverse=True)
+		order = np.argsort(cellOfPoint.ravel(), kind="stable")
+		starts = np.searchsorted(cellOfPoint.ravel()[order], np.arange(len(cells) + 1))
+		for c, (cellX, cellY) in enumerate(cells.tolist()):
+			candidates = self._grid.get((cellX, cellY), ())
+			inCell = order[starts[c]:starts[c+1]]
+			for i in candidates:
+				if len(inCell) <= 0:
+					break
+				polygon = np.asarray(self._polygons[i])
+				px, py = xs[inCell], ys[inCell]
+				inside = np.zeros(len(inCell), dtype=bool)
+				xj, yj = polygon[-1]
+				for xi, yi in polygon:
+					with np.errstate(divide="ignore", invalid="ignore"):
+						crosses = ((yi > py) != (yj > py)) & (px < (xj - xi) * (py - yi) / (yj - yi) + xi)
+					inside ^= crosses
+					xj, yj = xi, yi
+				result[inCell[inside]] = i
+				inCell = inCell[~inside]
+		return result
@@ -1,9 +1,8 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
-from dateutil.parser import isoparse
 
 from .Location import Location
-from .utils import formatTimedelta
+from .utils import formatTimedelta, isoparse
 
 if TYPE_CHECKING:
 	from .FIO import FIO
@@ -12,6 +11,7 @@ if TYPE_CHECKING:
 class Ship:
 	def __init__(self, json: dict, fio: "FIO", username: str, userNameSubmitted: str, timestamp: str):
 		self.fio = fio
+		self._lock = fio.newLock()
 		self.username = username
 		self.userNameSubmitted = userNameSubmitted
 		self.timestamp = timestamp
@@ -80,8 +80,11 @@ class Ship:
 	@property
 	def location(self):
 		if self._location is None:
-			self._location = Location.fromLocationString(self.fio, self.locationStr)
-			self._location.inFlight = self.flightId is not None
+			with self._lock:
+				if self._location is None:
+					location = Location.fromLocationString(self.fio, self.locationStr)
+					location.inFlight = self.flightId is not None
+					self._location = location
 		return self._location
 
 	@property
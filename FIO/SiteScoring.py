@@ -0,0 +1,181 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+import numpy as np
+
+from .Material import Material
+from .Building import Building
+from .Exchange import Exchange
+from .Planet import Planet
+from .ResourceIndex import EXTRACTORS, EXTRACTION_RATES
+from .BuildingCosts import curveCost, askCurve
+
+if TYPE_CHECKING:
+	from .ExchangeSnapshot import ExchangeSnapshot
+	from .PlanetTable import PlanetTable
+
+
+class SiteScoringData:
+	"""
+	Everything scoring needs, as plain arrays so it can be sent to other processes
+	Made once in the main process from a `PlanetTable` and an `ExchangeSnapshot`, and never changed after
+	"""
+
+	def __init__(
+			self, table: "PlanetTable", snapshot: "ExchangeSnapshot", buildings: dict[Building, int], production: dict[Material, int],
+			exchanges: list[Exchange], exchangeRates: dict[str, float]
+	):
+		self.planetIds = table.planetIds
+		self.exchangeJumps = np.array(table.exchangeJumps)
+		self.exchangeCodes = [exchange.comexCode for exchange in exchanges]
+		self.rates = np.array([exchangeRates.get(exchange.currencyCode, 1) for exchange in exchanges], dtype=np.float64)
+
+		# Amount of each material (by ticker) on each planet, the building costs themselves are the same everywhere
+		self.amounts: dict[str, Union[float, np.ndarray]] = {}
+		for building, count in buildings.items():
+			for material, amount in building.buildingCosts.items():
+				self.amounts[material.ticker] = self.amounts.get(material.ticker, 0) + amount * count
+			for ticker, amounts in table.additionalBuildMaterials(building.areaCost).items():
+				self.amounts[ticker] = self.amounts.get(ticker, 0) + amounts * count
+		self.curves: dict[tuple[str, str], tuple[np.ndarray, np.ndarray, float]] = {}
+		for ticker in self.amounts:
+			for exchangeCode in self.exchangeCodes:
+				materialExchange = snapshot.getMaterialExchange(ticker, exchangeCode)
+				if materialExchange is not None:
+					self.curves[(ticker, exchangeCode)] = askCurve(materialExchange.askBook)
+
+		# Daily output of each produced material on each planet, `0` where it isn't a resource
+		self.outputs: dict[str, np.ndarray] = {}
+		self.values: dict[str, float] = {}
+		for material, extractorCount in production.items():
+			factors = table.resourceFactor(material)
+			row = table.resourceIndex.get(material, None)
+			resourceTypes = table.resourceTypes[row] if row is not None else [None] * len(table)
+			rates = np.array([EXTRACTION_RATES.get(EXTRACTORS.get(resourceType, None), 0) for resourceType in resourceTypes], dtype=np.float64)
+			self.outputs[material.ticker] = factors * rates * extractorCount
+			# What it could be sold for, the best bid across the exchanges
+			bids = [
+				materialExchange.bidBook.bestPrice * exchangeRates.get(materialExchange.currency, 1)
+				for materialExchange in snapshot.getMaterialExchanges(material).values()
+				if materialExchange.exchangeCode in self.exchangeCodes and materialExchange.bidBook.bestPrice is not None
+			]
+			self.values[material.ticker] = max(bids, default=0.0)
+
+	def score(self, start: int, stop: int, days: float, costPerJump: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+		"""
+		Scores planets `start` to `stop`
+		:return: Score, construction cost, the index of the exchange used, and the value of a day's output, for each planet
+		"""
+		count = stop - start
+		costs = np.zeros((len(self.exchangeCodes), count))
+		for e, exchangeCode in enumerate(self.exchangeCodes):
+			for ticker, amounts in self.amounts.items():
+				amounts = np.broadcast_to(amounts, (len(self.planetIds),))[start:stop]
+				curve = self.curves.get((ticker, exchangeCode), None)
+				if curve is None:
+					materialCosts = np.where(amounts > 0, np.nan, 0.0)
+				else:
+					materialCosts = np.where(amounts > 0, curveCost(curve, amounts), 0.0)
+				costs[e] += materialCosts
+			costs[e] *= self.rates[e]
+		# Nowhere to buy everything is infinitely expensive
+		costs = np.where(np.isnan(costs), np.inf, costs)
+		exchangeIndices = np.argmin(costs, axis=0) if len(self.exchangeCodes) > 0 else np.zeros(count, dtype=np.int64)
+		constructionCosts = costs[exchangeIndices, np.arange(count)] if len(self.exchangeCodes) > 0 else np.full(count, np.inf)
+
+		dailyValues = np.zeros(count)
+		for ticker, outputs in self.outputs.items():
+			dailyValues += outputs[start:stop] * self.values[ticker]
+		jumps = self.exchangeJumps[start:stop]
+		scores = dailyValues * days - constructionCosts - np.where(np.isinf(jumps), 0, jumps) * costPerJump
+		scores = np.where(np.isinf(constructionCosts) | np.isinf(jumps), -np.inf, scores)
+		return scores, constructionCosts, exchangeIndices, dailyValues
+
+
+# Planets x exchanges x materials before scoring is worth a process pool
+# Scoring takes ~16ns a cell in one process, ~3ms for 5,000 planets, 2 exchanges and 10 materials, while a forked pool takes 17-35ms to start (spawned ones, the default on Windows and macOS, take far longer)
+# Below this the pool's overhead was more than it saved even with 4 processes, 4M cells took ~65ms in one process
+POOL_MIN_CELLS = 4_000_000
+
+# Set in each worker process by `_initWorker()`, so the data is only sent once per process rather than once per chunk
+_workerData: Optional[SiteScoringData] = None
+
+
+def _initWorker(data: SiteScoringData):
+	global _workerData
+	_workerData = data
+
+
+def _scoreChunk(start: int, stop: int, days: float, costPerJump: float):
+	return _workerData.score(start, stop, days, costPerJump)
+
+
+class SiteScore:
+	"""How good one planet is for a base"""
+
+	def __init__(self, planet: Planet, score: float, constructionCost: float, exchangeCode: Optional[str], dailyValue: float, exchangeJumps: float):
+		self.planet = planet
+		self.score = score
+		# In the currency the exchange rates are relative to
+		self.constructionCost = constructionCost
+		# Where it's cheapest to buy everything, `None` if it can't all be bought anywhere
+		self.exchangeCode = exchangeCode
+		self.dailyValue = dailyValue
+		self.exchangeJumps = exchangeJumps
+
+	def __repr__(self):
+		return f"<SiteScore `{self.planet.planetNaturalId}` {self.score:.2f}>"
+
+	@property
+	def isFeasible(self):
+		"""Whether everything can be bought and brought to the planet"""
+		return not math.isinf(self.score)
+
+
+def scoreSites(
+		table: "PlanetTable", snapshot: "ExchangeSnapshot", buildings: dict[Building, int], production: dict[Union[Material, str], int] = None,
+		exchanges: Iterable[Exchange] = None, exchangeRates: dict[str, float] = None, days: float = 30, costPerJump: float = 0,
+		workers: Optional[int] = None, chunkSize: int = 512
+) -> list[SiteScore]:
+	"""
+	Scores every planet for a base, `score = dailyValue * days - constructionCost - exchangeJumps * costPerJump`
+	Scored in this process, unless there's enough to be worth splitting it into chunks across a process pool (see `POOL_MIN_CELLS`)
+	The whole galaxy (~5,000 planets) is scored in a few milliseconds, so the pool is only for much bigger tables or a lot of materials and exchanges
+	:param buildings: The amount of each building to build
+	:param production: The amount of extractors for each resource material, their output is valued at the best bid
+	:param exchanges: Where materials can be bought, defaults to every exchange in the snapshot
+	:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+	:param days: How many days of output to count
+	:param costPerJump: What each jump to the nearest commodity exchange costs
+	:param workers: The amount of processes, `1` scores everything in this process, defaults to `1` below `POOL_MIN_CELLS` and one per CPU above it
+	:return: Best first, planets where the buildings can't be bought (or brought) have a score of `-inf`
+	"""
+	fio = table.fio
+	production = {} if production is None else {fio.getMaterial(material) if isinstance(material, str) else material: count for material, count in production.items()}
+	exchanges = list(exchanges) if exchanges is not None else [fio.getExchange(exchangeCode) for exchangeCode in snapshot.exchangeCodes]
+	data = SiteScoringData(table, snapshot, buildings, production, exchanges, {} if exchangeRates is None else exchangeRates)
+	chunks = [(start, min(start + chunkSize, len(table))) for start in range(0, len(table), chunkSize)]
+	if workers is None:
+		cells = len(table) * len(data.exchangeCodes) * max(len(data.amounts), 1)
+		workers = (os.cpu_count() or 1) if cells >= POOL_MIN_CELLS else 1
+	if workers <= 1 or len(chunks) <= 1:
+		results = [data.score(start, stop, days, costPerJump) for start, stop in chunks]
+	else:
+		with ProcessPoolExecutor(min(workers, len(chunks)), initializer=_initWorker, initargs=(data,)) as pool:
+			futures = [pool.submit(_scoreChunk, start, stop, days, costPerJump) for start, stop in chunks]
+			results = [future.result() for future in futures]
+	if len(results) <= 0:
+		return []
+	scores, constructionCosts, exchangeIndices, dailyValues = (np.concatenate(columns) for columns in zip(*results))
+	# Loads every planet at once, rather than one at a time below
+	fio.getAllPlanets()
+	siteScores = []
+	for i in np.argsort(-scores, kind="stable"):
+		feasible = not np.isinf(constructionCosts[i])
+		siteScores.append(SiteScore(
+			table.getPlanet(i), float(scores[i]), float(constructionCosts[i]),
+			data.exchangeCodes[exchangeIndices[i]] if feasible else None, float(dailyValues[i]), float(data.exchangeJumps[i])
+		))
+	return siteScores
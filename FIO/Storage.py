@@ -1,10 +1,8 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from dateutil.parser import isoparse
-
 from .Material import Material
-from ..utils import formatTimedelta
+from ..utils import formatTimedelta, isoparse
 
 if TYPE_CHECKING:
 	from .FIO import FIO
@@ -1,8 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
-from dateutil.parser import isoparse
 
-from ..utils import formatTimedelta
+from ..utils import formatTimedelta, isoparse
 
 if TYPE_CHECKING:
 	from .FIO import FIO
@@ -11,6 +10,7 @@ if TYPE_CHECKING:
 class System:
 	def __init__(self, json: dict, fio: "FIO"):
 		self.fio = fio
+		self._lock = fio.newLock()
 		self._planets = None
 
 		self.connections = json["Connections"]
@@ -50,19 +50,25 @@ class System:
 	@property
 	def luminosity(self):
 		if self._luminosity is None:
-			self._update(self.fio.api.systemstarsstar(self.systemId))
+			with self._lock:
+				if self._luminosity is None:
+					self._update(self.fio.api.systemstarsstar(self.systemId))
 		return self._luminosity
 
 	@property
 	def mass(self):
 		if self._mass is None:
-			self._update(self.fio.api.systemstarsstar(self.systemId))
+			with self._lock:
+				if self._mass is None:
+					self._update(self.fio.api.systemstarsstar(self.systemId))
 		return self._mass
 
 	@property
 	def massSol(self):
 		if self._massSol is None:
-			self._update(self.fio.api.systemstarsstar(self.systemId))
+			with self._lock:
+				if self._massSol is None:
+					self._update(self.fio.api.systemstarsstar(self.systemId))
 		return self._massSol
 
 	@property
@@ -79,15 +85,14 @@ class System:
 	@property
 	def planets(self):
 		if self._planets is None:
-			self._planets = {}
-			if not self.fio.api.allplanets.isCached():
-				for planet in self.fio.getAllPlanets():
-					if planet.systemId == self.systemId:
-						self._planets[planet.planetId] = planet
-			else:
-				for result in self.fio.api.planet.speedQuery("SystemId", self.systemId):
-					planet = self.fio.getPlanet(result["planet"])
-					self._planets[planet.planetId] = planet
+			with self._lock:
+				if self._planets is None:
+					# Only this system's planets are loaded, rather than every planet
+					planets = {}
+					for planetNaturalId in self.fio.api.systemplanets(self.naturalId):
+						planet = self.fio.getPlanet(planetNaturalId)
+						planets[planet.planetId] = planet
+					self._planets = planets
 		return self._planets
 
 	@property
@@ -0,0 +1,199 @@
+import heapq
+import math
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from .System import System
+from .Planet import Planet
+
+if TYPE_CHECKING:
+	from .FIO import FIO
+	from .Exchange import Exchange
+
+
+Point = tuple[float, float, float]
+# (system index, split axis, left, right)
+_Node = Optional[tuple[int, int, "_Node", "_Node"]]
+
+
+class SystemIndex:
+	"""
+	A KD-tree over system positions, for finding systems near somewhere without looking at every system
+	Planet attributes (like `hasShipyard`) can be used to filter, see `nearestPlanets()`
+	Use `FIO.getSystemIndex()`, which builds it once
+	"""
+
+	def __init__(self, systems: list[System], fio: "FIO"):
+		self.fio = fio
+		self.systems = systems
+		self._points: list[Point] = [(system.positionX, system.positionY, system.positionZ) for system in systems]
+		self._root: _Node = self._build(list(range(len(systems))), 0)
+		self._planetsBySystem: Optional[dict[str, list[Planet]]] = None
+		# Trees over only the systems that match a filter, see `_filteredRoot()`
+		self._filteredRoots: dict[tuple, _Node] = {}
+		self._lock = fio.newLock()
+
+	def __repr__(self):
+		return f"<SystemIndex {len(self.systems)} systems>"
+
+	def __len__(self):
+		return len(self.systems)
+
+	def _build(self, indices: list[int], depth: int) -> _Node:
+		if len(indices) <= 0:
+			return None
+		axis = depth % 3
+		indices.sort(key=lambda i: self._points[i][axis])
+		middle = len(indices) // 2
+		return indices[middle], axis, self._build(indices[:middle], depth + 1), self._build(indices[middle+1:], depth + 1)
+
+	def _filteredRoot(self, key: tuple, matches: Callable[[System], bool]) -> _Node:
+		"""
+		A tree over just the systems `matches` returns `True` for, built the first time `key` is asked for
+		Searching the whole tree with a rare filter looks at nearly every system, since only matches can rule out the rest
+		"""
+		root = self._filteredRoots.get(key, None)
+		if root is None and key not in self._filteredRoots:
+			with self._lock:
+				if key not in self._filteredRoots:
+					self._filteredRoots[key] = self._build([i for i, system in enumerate(self.systems) if matches(system)], 0)
+			root = self._filteredRoots[key]
+		return root
+
+	def toPoint(self, location: Union[System, Planet, str, Point]) -> Point:
+		"""
+		:param location: A position, System, Planet, or a SystemId, SystemName, SystemNaturalId, PlanetId, PlanetNaturalId or PlanetName
+		"""
+		if isinstance(location, tuple):
+			return location
+		if isinstance(location, Planet):
+			location = location.system
+		elif isinstance(location, str):
+			system = self.fio.getSystem(location)
+			location = system if system is not None else self.fio.getPlanet(location).system
+		return location.positionX, location.positionY, location.positionZ
+
+	@staticmethod
+	def _distanceSquared(a: Point, b: Point):
+		return (a[0] - b[0])**2 + (a[1] - b[1])**2 + (a[2] - b[2])**2
+
+	def withinRadius(self, location: Union[System, Planet, str, Point], radius: float) -> list[tuple[System, float]]:
+		""":return: Every system within `radius`, with it's distance, closest first"""
+		center = self.toPoint(location)
+		radiusSquared = radius * radius
+		found = []
+		stack = [self._root]
+		while len(stack) > 0:
+			node = stack.pop()
+			if node is None:
+				continue
+			i, axis, left, right = node
+			distanceSquared = self._distanceSquared(center, self._points[i])
+			if distanceSquared <= radiusSquared:
+				found.append((distanceSquared, i))
+			difference = center[axis] - self._points[i][axis]
+			if difference <= radius:
+				stack.append(left)
+			if difference >= -radius:
+				stack.append(right)
+		found.sort()
+		return [(self.systems[i], math.sqrt(distanceSquared)) for distanceSquared, i in found]
+
+	def inBox(self, low: Point, high: Point) -> list[System]:
+		""":return: Every system with a position between `low` and `high` on every axis"""
+		found = []
+		stack = [self._root]
+		while len(stack) > 0:
+			node = stack.pop()
+			if node is None:
+				continue
+			i, axis, left, right = node
+			point = self._points[i]
+			if all(low[a] <= point[a] <= high[a] for a in range(3)):
+				found.append(i)
+			if low[axis] <= point[axis]:
+				stack.append(left)
+			if point[axis] <= high[axis]:
+				stack.append(right)
+		return [self.systems[i] for i in sorted(found)]
+
+	def nearest(self, location: Union[System, Planet, str, Point], k: int = 1, predicate: Callable[[System], bool] = None) -> list[tuple[System, float]]:
+		"""
+		:param k: The amount of systems to find
+		:param predicate: Only systems this returns `True` for are included, when few do, searching `where(predicate)` is much faster
+		:return: The `k` closest systems, with their distance, closest first
+		"""
+		return self._nearest(self._root, self.toPoint(location), k, predicate)
+
+	def where(self, predicate: Callable[[System], bool]) -> "SystemIndex":
+		"""An index of just the systems `predicate` returns `True` for, hold on to it to search with the same filter many times"""
+		return SystemIndex([system for system in self.systems if predicate(system)], self.fio)
+
+	def _nearest(self, root: _Node, center: Point, k: int, predicate: Optional[Callable[[System], bool]]) -> list[tuple[System, float]]:
+		# Max heap (by negated distance) of the best found so far
+		best: list[tuple[float, int]] = []
+
+		def visit(node: _Node):
+			if node is None:
+				return
+			i, axis, left, right = node
+			if predicate is None or predicate(self.systems[i]):
+				distanceSquared = self._distanceSquared(center, self._points[i])
+				if len(best) < k:
+					heapq.heappush(best, (-distanceSquared, i))
+				elif distanceSquared < -best[0][0]:
+					heapq.heapreplace(best, (-distanceSquared, i))
+			difference = center[axis] - self._points[i][axis]
+			near, far = (left, right) if difference < 0 else (right, left)
+			visit(near)
+			if len(best) < k or difference * difference < -best[0][0]:
+				visit(far)
+
+		if k > 0:
+			visit(root)
+		return [(self.systems[i], math.sqrt(-negativeDistanceSquared)) for negativeDistanceSquared, i in sorted(best, reverse=True)]
+
+	@property
+	def planetsBySystem(self) -> dict[str, list[Planet]]:
+		"""Every planet, by SystemId"""
+		if self._planetsBySystem is None:
+			with self._lock:
+				if self._planetsBySystem is None:
+					planetsBySystem = {}
+					for planet in self.fio.getAllPlanets():
+						planetsBySystem.setdefault(planet.systemId, []).append(planet)
+					self._planetsBySystem = planetsBySystem
+		return self._planetsBySystem
+
+	def nearestPlanets(self, location: Union[System, Planet, str, Point], k: int = 1, predicate: Callable[[Planet], bool] = None, **flags: bool) -> list[tuple[Planet, float]]:
+		"""
+		The closest planets that match, planets in the same system are the same distance away
+		:param predicate: Only planets this returns `True` for are included
+		:param flags: Planet attributes that must match, e.g. `hasShipyard=True`
+		:return: The `k` closest planets, with the distance to their system, closest first
+		"""
+		planetsBySystem = self.planetsBySystem
+
+		def matchesFlags(planet: Planet):
+			return all(getattr(planet, flag) == value for flag, value in flags.items())
+
+		def matches(planet: Planet):
+			return matchesFlags(planet) and (predicate is None or predicate(planet))
+
+		# Systems with a planet matching the flags get their own tree, so the search only looks at those
+		root = self._root if len(flags) <= 0 else self._filteredRoot(
+			("planets", tuple(sorted(flags.items()))), lambda system: any(matchesFlags(planet) for planet in planetsBySystem.get(system.systemId, ()))
+		)
+		systemPredicate = None if predicate is None else lambda system: any(matches(planet) for planet in planetsBySystem.get(system.systemId, ()))
+		# The `k` nearest systems with a match always hold the `k` nearest planets
+		found = []
+		for system, distance in self._nearest(root, self.toPoint(location), k, systemPredicate):
+			for planet in planetsBySystem[system.systemId]:
+				if matches(planet):
+					found.append((planet, distance))
+		return found[:k]
+
+	def nearestExchanges(self, location: Union[System, Planet, str, Point], k: int = 1) -> list[tuple["Exchange", float]]:
+		""":return: The `k` closest commodity exchanges, with their distance, closest first"""
+		exchanges = {exchange.systemId: exchange for exchange in self.fio.getExchanges().values()}
+		root = self._filteredRoot(("exchanges",), lambda system: system.systemId in exchanges)
+		return [(exchanges[system.systemId], distance) for system, distance in self._nearest(root, self.toPoint(location), k, None)]
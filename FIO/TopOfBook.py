@@ -0,0 +1,104 @@
+from contextlib import nullcontext
+from typing import Iterator, Optional, Union
+
+from .Material import Material
+
+
+class Quote:
+	"""The best bid or ask of a material on one exchange"""
+
+	def __init__(self, ticker: str, exchangeCode: str, price: float, currency: Optional[str], timestamp: Optional[str]):
+		self.ticker = ticker
+		self.exchangeCode = exchangeCode
+		self.price = price
+		self.currency = currency
+		self.timestamp = timestamp
+
+	def __repr__(self):
+		return f"<Quote `{self.ticker}` {self.price:.2f} {self.currency} @ `{self.exchangeCode}`>"
+
+
+class TopOfBookIndex:
+	"""
+	The best bid and ask of every material across every exchange, kept up to date from exchange refreshes
+	Each refreshed entry only updates it's own material, so keeping this up to date is cheap
+	Use `FIO.getTopOfBookIndex()`, which fills it from `exchangeall()` and keeps it updated from then on
+	"""
+
+	def __init__(self, currencies: dict[str, str] = None, exchangeRates: dict[str, float] = None, lock=None):
+		"""
+		:param currencies: The currency code of each exchange, by ComexCode
+		:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+		:param lock: Guards the quotes, see `FIO.newLock()`
+		"""
+		self.currencies = {} if currencies is None else currencies
+		self.exchangeRates = {} if exchangeRates is None else exchangeRates
+		self._lock = nullcontext() if lock is None else lock
+		# ticker -> exchangeCode -> (bid, ask)
+		self._quotes: dict[str, dict[str, tuple[Optional[Quote], Optional[Quote]]]] = {}
+		self._bestBids: dict[str, Quote] = {}
+		self._bestAsks: dict[str, Quote] = {}
+		self._timestamps: dict[tuple[str, str], Optional[str]] = {}
+
+	def __repr__(self):
+		return f"<TopOfBookIndex {len(self._quotes)} materials>"
+
+	def __len__(self):
+		return len(self._quotes)
+
+	def __iter__(self) -> Iterator[str]:
+		"""Every ticker in the index"""
+		return iter(list(self._quotes))
+
+	def _value(self, quote: Quote):
+		return quote.price * self.exchangeRates.get(quote.currency, 1)
+
+	def _updateBest(self, ticker: str):
+		bestBid, bestAsk = None, None
+		for bid, ask in self._quotes[ticker].values():
+			if bid is not None and (bestBid is None or self._value(bid) > self._value(bestBid)):
+				bestBid = bid
+			if ask is not None and (bestAsk is None or self._value(ask) < self._value(bestAsk)):
+				bestAsk = ask
+		for best, bests in ((bestBid, self._bestBids), (bestAsk, self._bestAsks)):
+			if best is None:
+				bests.pop(ticker, None)
+			else:
+				bests[ticker] = best
+
+	def update(self, exchangeJson: dict):
+		"""Updates the index with one exchange entry, ignoring it if the index already has newer data"""
+		key = exchangeJson["MaterialTicker"], exchangeJson["ExchangeCode"]
+		timestamp = exchangeJson.get("Timestamp", None)
+		with self._lock:
+			previousTimestamp = self._timestamps.get(key, None)
+			if timestamp is not None and previousTimestamp is not None and timestamp < previousTimestamp:
+				return
+			self._timestamps[key] = timestamp
+			ticker, exchangeCode = key
+			currency = self.currencies.get(exchangeCode, None)
+			bid = None if exchangeJson.get("Bid", None) is None else Quote(ticker, exchangeCode, exchangeJson["Bid"], currency, timestamp)
+			ask = None if exchangeJson.get("Ask", None) is None else Quote(ticker, exchangeCode, exchangeJson["Ask"], currency, timestamp)
+			self._quotes.setdefault(ticker, {})[exchangeCode] = (bid, ask)
+			self._updateBest(ticker)
+
+	def record(self, data: list[dict]):
+		"""Updates the index with exchange entries, this is what's registered with `FIOApi.addExchangeListener()`"""
+		for exchangeJson in data:
+			self.update(exchangeJson)
+
+	@staticmethod
+	def _ticker(material: Union[Material, str]):
+		return material.ticker if isinstance(material, Material) else material.upper()
+
+	def bestBid(self, material: Union[Material, str]) -> Optional[Quote]:
+		"""The highest buying order across every exchange, which is the best place to sell"""
+		return self._bestBids.get(self._ticker(material), None)
+
+	def bestAsk(self, material: Union[Material, str]) -> Optional[Quote]:
+		"""The cheapest selling order across every exchange, which is the best place to buy"""
+		return self._bestAsks.get(self._ticker(material), None)
+
+	def getQuotes(self, material: Union[Material, str]) -> dict[str, tuple[Optional[Quote], Optional[Quote]]]:
+		""":return: (bid, ask) of the material on each exchange, by ComexCode"""
+		return dict(self._quotes.get(self._ticker(material), {}))
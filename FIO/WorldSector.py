@@ -1,8 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
-from dateutil.parser import isoparse
 
-from ..utils import formatTimedelta
+from ..utils import formatTimedelta, isoparse
 
 if TYPE_CHECKING:
 	from .FIO import FIO
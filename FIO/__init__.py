@@ -9,6 +9,14 @@ from .Recipe import Recipe, RecipeMaterial
 from .Storage import Storage, StorageItem
 from .Site import Site, SiteBuilding
 from .Exchange import Exchange, MaterialExchange, MaterialExchangeOrder
+from .ExchangeSnapshot import ExchangeSnapshot
+from .OrderBook import OrderBook
+from .DepthMatch import DepthMatch, DepthFill
+from .Arbitrage import ArbitrageOpportunity
+from .CargoOptimizer import CargoPlan
+from .Procurement import ProcurementPlan, MaterialProcurement, ProcurementFill
+from .OrderBookDiff import OrderBookDiff, OrderEvent, OrderEventStream
+from .TopOfBook import TopOfBookIndex, Quote
 from .Ship import Ship
 from .Flight import Flight, FlightSegment, FlightLine
 from .System import System
@@ -1,13 +1,15 @@
 import functools
 import inspect
 import os
+import threading
 import typing
 from datetime import datetime, timedelta
 
-import peewee
-from peewee import *
-from peewee import Metadata
-import quickle
+from .locking import KeyedLock
+
+# `peewee` and `quickle` are imported on first use of a cache, so importing this package stays cheap
+if typing.TYPE_CHECKING:
+	import peewee
 
 
 class ParamOpts:
@@ -27,8 +29,10 @@ class DBCache:
 	DATETIME_KEY = "cached_datetime"
 	VALUE_KEY = "cached_value"
 	dbs = {}
+	# All caches share a single sqlite file, writes are done one at a time so threads don't fight over the database lock
+	_dbsLock = threading.Lock()
+	_writeLock = threading.RLock()
 
-	# noinspection PyProtectedMember
 	def __init__(
 			self, f: callable,
 			paramOpts: list[ParamOpts] = None,
@@ -52,53 +56,85 @@ class DBCache:
 		self.variedParams = variedParams if variedParams is not None else []
 
 		self.db_file_path = f"{os.path.dirname(os.path.abspath(inspect.getfile(f)))}/cache.db"
-		self.db = self.dbs.get(self.db_file_path, None)
-		if self.db is None:
-			self.db = SqliteDatabase(self.db_file_path)
-			self.db.connect()
+		self.paramNames = []
+		for param in inspect.signature(f).parameters.values():
+			if param.name != "self" and param.kind == inspect.Parameter.POSITIONAL_OR_KEYWORD:
+				self.paramNames.append(param.name)
+		self._model: typing.Optional[typing.Type["peewee.Model"]] = None
+		self._modelLock = threading.Lock()
+		self._callLocks = KeyedLock()
+
+	@classmethod
+	def getDatabase(cls, db_file_path: str) -> "peewee.SqliteDatabase":
+		"""Gets the shared connection for a cache file, connecting on first use"""
+		db = cls.dbs.get(db_file_path, None)
+		if db is None:
+			with cls._dbsLock:
+				db = cls.dbs.get(db_file_path, None)
+				if db is None:
+					import peewee
+					db = peewee.SqliteDatabase(db_file_path)
+					db.connect()
+					cls.dbs[db_file_path] = db
+		return db
 
-		class CacheModel(Model):
-			_meta: Metadata
-			_modified = DateTimeField(default=datetime.now)
-			id = AutoField()
+	@property
+	def db(self):
+		return self.getDatabase(self.db_file_path)
+
+	@property
+	def model(self):
+		"""The table for this cache, it's only created once the cache is first used"""
+		if self._model is None:
+			with self._modelLock:
+				if self._model is None:
+					self._model = self.createModel()
+		return self._model
+
+	# noinspection PyProtectedMember
+	def createModel(self):
+		import peewee
+
+		class CacheModel(peewee.Model):
+			_meta: peewee.Metadata
+			_modified = peewee.DateTimeField(default=datetime.now)
+			id = peewee.AutoField()
 
 			def save(self, *args, **kwargs):
 				self._modified = datetime.now()
 				return super(CacheModel, self).save(*args, **kwargs)
-		self.paramNames = []
-		for param in inspect.signature(f).parameters.values():
-			if param.name != "self" and param.kind == inspect.Parameter.POSITIONAL_OR_KEYWORD:
-				if param.name in self.variedParams:
-					for variedParam in self.variedParams[param.name]:
-						CacheModel._meta.add_field(f"{param.name}_{variedParam}", TextField())
-				else:
-					CacheModel._meta.add_field(param.name, TextField())
-				self.paramNames.append(param.name)
-		CacheModel._meta.add_field("_data", BlobField())
+		for paramName in self.paramNames:
+			if paramName in self.variedParams:
+				for variedParam in self.variedParams[paramName]:
+					CacheModel._meta.add_field(f"{paramName}_{variedParam}", peewee.TextField())
+			else:
+				CacheModel._meta.add_field(paramName, peewee.TextField())
+		CacheModel._meta.add_field("_data", peewee.BlobField())
 		for fieldName in self.speedQueryFields:
-			CacheModel._meta.add_field(f"_sq_{fieldName}", TextField())
-		CacheModel._meta.set_table_name(f.__name__)
+			CacheModel._meta.add_field(f"_sq_{fieldName}", peewee.TextField())
+		CacheModel._meta.set_table_name(self.f.__name__)
 		CacheModel.bind(self.db)
-		self.model = CacheModel
-		self.db.create_tables([CacheModel])
+		with self._writeLock:
+			self.db.create_tables([CacheModel])
+		return CacheModel
 
 	def getQueryExpression(self, args: typing.Union[list[str], tuple[str]]):
 		if len(args) == 0:
 			return self.model.id == 1
-		query: typing.Optional[peewee.Expression] = None
+		query: typing.Optional["peewee.Expression"] = None
 		for i in range(len(args)):
-			expr: typing.Optional[peewee.Expression] = None
+			expr: typing.Optional["peewee.Expression"] = None
 			paramName = self.paramNames[i]
 			if paramName in self.variedParams:
 				for variedParam in self.variedParams[paramName]:
-					field: peewee.Field = getattr(self.model, f"{paramName}_{variedParam}")
+					field: "peewee.Field" = getattr(self.model, f"{paramName}_{variedParam}")
 					subExpr = field == args[i]
 					if expr is None:
 						expr = subExpr
 					else:
 						expr = expr | subExpr
 			else:
-				field: peewee.Field = getattr(self.model, paramName)
+				field: "peewee.Field" = getattr(self.model, paramName)
 				expr = field == args[i]
 			if query is None:
 				query = expr
@@ -107,6 +143,7 @@ class DBCache:
 		return query
 	
 	def getModelFieldValues(self, args: typing.Union[list[str], tuple[str]], value: any):
+		import quickle
 		fields = {
 			"_data": quickle.dumps(value)
 		}
@@ -121,17 +158,18 @@ class DBCache:
 			fields[f"_sq_{fieldName}"] = value[fieldName]
 		return fields
 
-	def getValueFromParamName(self, data: Model, paramName: str):
+	def getValueFromParamName(self, data: "peewee.Model", paramName: str):
 		if paramName in self.variedParams:
 			return getattr(data, f"{paramName}_{self.variedParams[paramName][0]}")
 		else:
 			return getattr(data, paramName)
 
-	def isCacheInvalid(self, cache: "Model"):
+	def isCacheInvalid(self, cache: "peewee.Model"):
 		invalid = self.invalidateTime is not None and datetime.now() > datetime.fromisoformat(str(cache._modified)) + self.invalidateTime
 		return invalid
 
 	def __call__(self, *rawArgs):
+		import quickle
 		startIndex = 1 if self.hasSelf else 0
 		args = [
 			(self.paramOpts[i-startIndex].convert(rawArgs[i]) if (len(self.paramOpts) > i-startIndex and self.paramOpts[i-startIndex] is not None) else rawArgs[i])
@@ -140,26 +178,37 @@ class DBCache:
 		cache = self.model.get_or_none(self.getQueryExpression(args))
 		if cache is not None and not self.isCacheInvalid(cache):
 			return quickle.loads(cache._data)
-		if self.hasSelf:
-			callResult = self.f(rawArgs[0], *args)
-		else:
-			callResult = self.f(*args)
-		dbFields = self.getModelFieldValues(args, callResult)
-		if cache is not None:
-			for field, value in dbFields.items():
-				setattr(cache, field, value)
-			cache.save()
-		else:
-			self.model.create(**dbFields)
+		# Only one thread fetches a missing value, the others wait and then read what it cached
+		with self._callLocks.get(tuple(args)):
+			cache = self.model.get_or_none(self.getQueryExpression(args))
+			if cache is not None and not self.isCacheInvalid(cache):
+				return quickle.loads(cache._data)
+			if self.hasSelf:
+				callResult = self.f(rawArgs[0], *args)
+			else:
+				callResult = self.f(*args)
+			dbFields = self.getModelFieldValues(args, callResult)
+			with self._writeLock:
+				# `f` may have cached this same value itself (like `systemplanets()` through `allplanetnames()`)
+				if cache is None:
+					cache = self.model.get_or_none(self.getQueryExpression(args))
+				if cache is not None:
+					for field, value in dbFields.items():
+						setattr(cache, field, value)
+					cache.save()
+				else:
+					self.model.create(**dbFields)
 		return callResult
 
 	def cacheValue(self, value, *args: str):
-		dbCache = self.model.get_or_none(self.getQueryExpression(args))
-		if dbCache is None:
-			self.model.create(**self.getModelFieldValues(args, value))
-		else:
-			dbCache._data = quickle.dumps(value)
-			dbCache.save()
+		import quickle
+		with self._writeLock:
+			dbCache = self.model.get_or_none(self.getQueryExpression(args))
+			if dbCache is None:
+				self.model.create(**self.getModelFieldValues(args, value))
+			else:
+				dbCache._data = quickle.dumps(value)
+				dbCache.save()
 
 	def isCached(self, *args: str):
 		cache = self.model.get_or_none(self.getQueryExpression(args))
@@ -167,6 +216,11 @@ class DBCache:
 			return False
 		return not self.isCacheInvalid(cache)
 
+	def cachedValues(self):
+		"""Every value in the cache that hasn't expired"""
+		import quickle
+		return [quickle.loads(cache._data) for cache in self.model.select().execute() if not self.isCacheInvalid(cache)]
+
 	def speedQuery(self, speedQueryField: str, value: typing.Union[str, int]):
 		fieldName = f"_sq_{speedQueryField}"
 		values = []
@@ -175,13 +229,15 @@ class DBCache:
 		return values
 
 	def clearCache(self):
-		self.model.delete().execute()
+		with self._writeLock:
+			self.model.delete().execute()
 
 	def addMethods(self, wrapper: callable):
 		"""This is used for a very hacky solution..."""
 		setattr(wrapper, "cacheValue", self.cacheValue)
 		setattr(wrapper, "clearCache", self.clearCache)
 		setattr(wrapper, "isCached", self.isCached)
+		setattr(wrapper, "cachedValues", self.cachedValues)
 		setattr(wrapper, "speedQuery", self.speedQuery)
 
 
@@ -0,0 +1,45 @@
+import functools
+import threading
+import typing
+
+
+class KeyedLock:
+	"""Hands out a lock per key, so work on different keys never waits on each other"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._locks: dict[typing.Hashable, threading.RLock] = {}
+
+	def get(self, key: typing.Hashable):
+		lock = self._locks.get(key, None)
+		if lock is None:
+			with self._lock:
+				lock = self._locks.get(key, None)
+				if lock is None:
+					lock = threading.RLock()
+					self._locks[key] = lock
+		return lock
+
+
+T = typing.TypeVar("T", bound=typing.Callable)
+
+
+def lockedcache(f: T) -> T:
+	"""
+	Same as `cache`, but for `FIO` methods
+	It's never evicted from, as objects are shared it's important the same value is always returned
+	When `FIO.threadSafe` is set, a call holds the lock for it's arguments while the value is created,
+	so other threads asking for the same thing wait for that value instead of creating their own copy.
+	"""
+	cached = functools.lru_cache(maxsize=None)(f)
+	locks = KeyedLock()
+
+	@functools.wraps(f)
+	def wrap(self, *args):
+		if not self.threadSafe:
+			return cached(self, *args)
+		with locks.get((self, args)):
+			return cached(self, *args)
+	setattr(wrap, "cache_clear", cached.cache_clear)
+	setattr(wrap, "cache_info", cached.cache_info)
+	return wrap
@@ -3,6 +3,19 @@ from datetime import timedelta
 
 
 LOCATION_REGEX = re.compile(r"(\w+) \(([\w-]+)\) - (?:(\w+) \(([\w-]+)\))?(STATION)?")
+# A planet's natural id is it's system's natural id followed by a letter, e.g. `VH-331a` is in `VH-331`
+PLANET_NATURAL_ID_REGEX = re.compile(r"^(.+?)([a-z]+)$")
+
+
+def isoparse(timestamp: str):
+	# `dateutil` is imported on first use, it's only needed once a timestamp is actually looked at
+	from dateutil.parser import isoparse
+	return isoparse(timestamp)
+
+
+def systemNaturalIdOf(planetNaturalId: str):
+	match = PLANET_NATURAL_ID_REGEX.match(planetNaturalId)
+	return match.group(1) if match is not None else None
 
 
 def formatTimedelta(timeDelta: timedelta, alwaysIncludeSeconds=False):
@@ -1,25 +1,28 @@
 import math
 import sys
 from datetime import timedelta
+from typing import Iterable, Optional
 
 from .FIO import *
+from .FIO.Arbitrage import findArbitrage
+from .FIO.CargoOptimizer import optimizeCargo
+from .FIO.Procurement import planProcurement
+from .FIO.RecipeGraph import RecipeGraph
+from .FIO.ProductionSolver import solveProduction
 
 
 class PrUnStuff:
-	def __init__(self, fio_key: str):
-		self.fio = FIO(fio_key)
+	def __init__(self, fio_key: str, threadSafe=False):
+		self.fio = FIO(fio_key, threadSafe)
 
 	def getAvailableResourcesForRecipe(self, planet: Planet, recipe: Recipe, resourcesAvailable: dict[Material, int] = None):
 		"""Gets the amount of resources available for a recipe, recursively, to all possible recipe paths that could aid in making this item"""
 		storage = self.fio.getMyStorage(planet.planetId)
 		site = self.fio.getMySite(planet.planetId)
 		resourcesAvailable = resourcesAvailable if resourcesAvailable is not None else {}
-		for requirement in recipe.inputs.values():
-			resourcesAvailable[requirement.material] = storage.getItemAmount(requirement.material)
-			for siteBuilding in site.buildings:
-				for recipe in siteBuilding.building.recipes.values():
-					if recipe.isMaterialOutput(requirement.material):
-						self.getAvailableResourcesForRecipe(planet, recipe, resourcesAvailable)
+		siteRecipes = RecipeGraph(recipe for siteBuilding in site.buildings for recipe in siteBuilding.building.recipes.values())
+		for material in siteRecipes.getRequiredMaterials(recipe):
+			resourcesAvailable[material] = storage.getItemAmount(material)
 		return resourcesAvailable
 
 	def sim_produceRecipe(
@@ -36,6 +39,18 @@ class PrUnStuff:
 		if buildingsUsed is None:
 			buildingsUsed = {}
 		producedAnything = False
+		if produceAll:
+			# Every craft that can be made in full is worked out in batches, the loop below then only has to find where it stops
+			crafts = solveProduction(recipe, resourcesAvailable, requirementsRecipes, buildingUseLimits, buildingsUsed)
+			if crafts is not None:
+				for craftedRecipe, count in crafts.items():
+					buildingsUsed[craftedRecipe.building] = buildingsUsed.get(craftedRecipe.building, 0) + count
+					recipesUsed[craftedRecipe] = recipesUsed.get(craftedRecipe, 0) + count
+					for recipeMaterial in craftedRecipe.inputs.values():
+						resourcesAvailable[recipeMaterial.material] = resourcesAvailable.get(recipeMaterial.material, 0) - recipeMaterial.amount * count
+					for recipeMaterial in craftedRecipe.outputs.values():
+						resourcesAvailable[recipeMaterial.material] = resourcesAvailable.get(recipeMaterial.material, 0) + recipeMaterial.amount * count
+				producedAnything = recipe in crafts
 		while True:
 			hasRequirements = True
 			for inputMaterial in recipe.inputs.values():
@@ -93,16 +108,15 @@ class PrUnStuff:
 		:param recipes:
 		:param buildingUseLimits: A dict with keys being a building ticker and values of the max amount of times that recipes can be used in that building
 		"""
-		recipesForTarget = []
+		recipeGraph = RecipeGraph(recipes)
+		recipesForTarget = recipeGraph.getProducers(material)
 		requirementsRecipes = {}
-		for recipe in recipes:
-			if recipe.isMaterialOutput(material):
-				recipesForTarget.append(recipe)
-			for outputMaterial in recipe.outputs.values():
-				if outputMaterial.material in requirementsRecipes:
-					print(f"WARNING: Found duplicate recipe for resource `{outputMaterial.material.ticker}`, using first one that was found ({requirementsRecipes[outputMaterial.material.ticker]}). Please avoid duplicate recipes!")
-				else:
-					requirementsRecipes[outputMaterial.material] = recipe
+		for producedMaterial in recipeGraph.materials:
+			producers = recipeGraph.getProducers(producedMaterial)
+			if len(producers) > 1:
+				print(f"WARNING: Found duplicate recipe for resource `{producedMaterial.ticker}`, using first one that was found ({producers[0]}). Please avoid duplicate recipes!")
+			if len(producers) > 0:
+				requirementsRecipes[producedMaterial] = producers[0]
 		if len(recipesForTarget) > 1:
 			raise Exception("Found multiple recipes for target material, please ensure there is only one recipe for the target material.")
 		elif len(recipesForTarget) <= 0:
@@ -163,28 +177,79 @@ class PrUnStuff:
 		cost = 0
 		materialCosts = {}
 		inStorage = {}
-		requiredMaterials = building.buildingCosts.copy()
-		for material, amount in planet.getAdditionalBuildMaterials(building.areaCost).items():
-			requiredMaterials[material] = requiredMaterials.get(material, 0) + amount
+		requiredMaterials = self.getBuildMaterials({building: 1}, planet)
 		for material, amount in requiredMaterials.items():
 			if storage is not None:
 				amount -= storage.getItemAmount(material)
 				inStorage[material] = storage.getItemAmount(material)
-			matEx = exchange.getMaterialExchange(material)
-			i = len(matEx.sellingOrders)-1
-			orderedCost = 0
-			while amount > 0:
-				if i < 0:
-					return -1, {}, exchange.currencyCode
-				order = matEx.sellingOrders[i]
-				itemCount = min(amount, order.itemCount if order.itemCount is not None else sys.maxsize)
-				orderedCost += itemCount * order.itemCost
-				amount -= itemCount
-				i -= 1
+			orderedCost = exchange.getMaterialExchange(material).askBook.costFor(amount)
+			if orderedCost is None:
+				return -1, {}, exchange.currencyCode
 			materialCosts[material] = orderedCost
 			cost += orderedCost
 		return cost, materialCosts, exchange.currencyCode, requiredMaterials, inStorage
 
+	def getBuildMaterials(self, buildings: dict[Building, int], planet: Planet) -> dict[Material, int]:
+		"""
+		Everything needed to build some buildings on a planet, including the extra materials the planet needs
+		:param buildings: The amount of each building to build
+		"""
+		requiredMaterials = {}
+		for building, count in buildings.items():
+			for material, amount in building.buildingCosts.items():
+				requiredMaterials[material] = requiredMaterials.get(material, 0) + amount * count
+			for material, amount in planet.getAdditionalBuildMaterials(building.areaCost).items():
+				requiredMaterials[material] = requiredMaterials.get(material, 0) + amount * count
+		return requiredMaterials
+
+	def getBuildingCosts(self, buildings: Iterable[Building] = None, exchanges: Iterable[Exchange] = None, exchangeRates: dict[str, float] = None):
+		"""
+		`estimateBuildingCost()` for every building on every planet from every exchange at once, requires `numpy`
+		Anything that can't be bought in full is `nan` in the tensor, `getInfeasible()` says what's missing
+		:param buildings: Defaults to every building
+		:param exchanges: Defaults to every exchange
+		:param exchangeRates: The value of each currency (by currency code), so costs can be compared across exchanges, any missing currency is worth `1`
+		:return: BuildingCostTensor
+		"""
+		from .FIO.BuildingCosts import BuildingCostTensor
+		return BuildingCostTensor(
+			self.fio.getPlanetTable(), self.fio.getExchangeSnapshot(),
+			self.fio.getAllBuildings() if buildings is None else buildings,
+			self.fio.getExchanges().values() if exchanges is None else exchanges,
+			exchangeRates
+		)
+
+	def scoreBaseSites(
+			self, buildings: dict[Building, int], production: dict[Material, int] = None, exchanges: Iterable[Exchange] = None,
+			exchangeRates: dict[str, float] = None, days: float = 30, costPerJump: float = 0, workers: int = None
+	):
+		"""
+		`estimateBuildingCost()` for a whole base on every planet at once, together with what the planet's resources are worth and how far it is from a commodity exchange
+		Requires `numpy`, everything comes from the planet table and exchange snapshot so nothing is fetched per planet, see `scoreSites()`
+		:param buildings: The amount of each building to build
+		:param production: The amount of extractors for each resource material
+		:param workers: The amount of processes to score with, by default only large tables are scored across a process pool
+		:return: list[SiteScore], best first
+		"""
+		from .FIO.SiteScoring import scoreSites
+		return scoreSites(
+			self.fio.getPlanetTable(), self.fio.getExchangeSnapshot(), buildings, production, exchanges, exchangeRates,
+			days=days, costPerJump=costPerJump, workers=workers
+		)
+
+	def getProcurementPlan(
+			self, materials: dict[Material, int], exchanges: Iterable[Exchange] = None, storage: Storage = None, exchangeRates: dict[str, float] = None
+	) -> ProcurementPlan:
+		"""
+		The cheapest way to buy a shopping list, splitting it across exchanges and through the depth of their books
+		Unlike `estimateBuildingCost()`, materials that can't all be bought are in the plan's `shortfalls` rather than failing the whole thing
+		:param materials: The amount needed of each material, see `getBuildMaterials()` for buildings
+		:param exchanges: The exchanges to buy from, defaults to all of them
+		:param storage: If supplied, it will take into account the storage
+		:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+		"""
+		return planProcurement(self.fio.getExchangeSnapshot(), materials, exchanges, storage, exchangeRates)
+
 	def getBestMaterialToFrom(self, buyingExchange: Exchange, sellingExchange: Exchange) -> list[tuple[MaterialExchangeOrder, MaterialExchangeOrder, float]]:
 		buyingMaterials = buyingExchange.getAllMaterialExchanges()
 		sellingMaterials = sellingExchange.getAllMaterialExchanges()
@@ -197,24 +262,50 @@ class PrUnStuff:
 		materialExchanges.sort(key=lambda t: t[2], reverse=True)
 		return materialExchanges
 
-	def getBestTradeToFrom(self, buyingExchange: Exchange, sellingExchange: Exchange, maxVolume: float, maxWeight: float):
+	def getArbitrageOpportunities(
+			self, exchanges: Iterable[Exchange] = None, maxQuantity: Optional[int] = None, exchangeRates: dict[str, float] = None
+	) -> list[ArbitrageOpportunity]:
+		"""
+		Like `getBestMaterialToFrom()`, but for every pair of exchanges at once, and using the full depth of the books
+		:param exchanges: Only look at trades between these exchanges, defaults to all of them
+		:param maxQuantity: The most items of a material to consider trading, by default market maker to market maker trades are left out
+		:param exchangeRates: The value of each currency (by currency code), so prices can be compared across exchanges, any missing currency is worth `1`
+		:return: Sorted by the profit of trading as much as is profitable, most profitable first
+		"""
+		return findArbitrage(self.fio.getExchangeSnapshot(), exchanges, maxQuantity, exchangeRates)
+
+	def getBestTradeToFrom(self, buyingExchange: Exchange, sellingExchange: Exchange, maxVolume: float, maxWeight: float, timeBudget: float = 0.1):
 		"""
-		This will find the material that makes the most profit, filling up to maxVolume/maxWeight
+		This will find the mix of materials that makes the most profit, filling up to maxVolume/maxWeight
 		This will take into account buying multiple orders
+		:param timeBudget: The most seconds to spend improving the mix, see `optimizeCargo()`
 		:return: list[tuple[buyOrdersUsed, sellOrdersUsed, profit, itemCount, volume, weight]], profit, volume, weight
 		"""
-		volume, weight = 0, 0
-		profit = 0
-		bestExchanges = self.getBestMaterialToFrom(buyingExchange, sellingExchange)
+		snapshot = self.fio.getExchangeSnapshot()
+		sellingMaterials = snapshot.getAllMaterialExchanges(sellingExchange)
+		opportunities = []
+		for material, buyExchange in snapshot.getAllMaterialExchanges(buyingExchange).items():
+			sellExchange = sellingMaterials.get(material, None)
+			if sellExchange is None:
+				continue
+			# Nothing past what fits in the ship matters, this also keeps market maker to market maker trades finite
+			maxItemCount = min(
+				math.floor(maxVolume / material.volume) if material.volume > 0 else sys.maxsize,
+				math.floor(maxWeight / material.weight) if material.weight > 0 else sys.maxsize
+			)
+			opportunity = ArbitrageOpportunity(buyExchange, sellExchange, maxItemCount)
+			if opportunity.profit > 0:
+				opportunities.append(opportunity)
+		plan = optimizeCargo(opportunities, maxVolume, maxWeight, timeBudget)
 		materialExchanges = []
-		for buy, sell, profitPerUnit in bestExchanges:
-			if volume + buy.materialExchange.material.volume >= maxVolume or weight + buy.materialExchange.material.weight >= maxWeight:
-				break
-			# TODO: Look into how we got orders but compareAllOrders gives us 0 profit?
-			buyOrdersUsed, sellOrdersUsed, cProfit, itemCount, cVolume, cWeight = buy.materialExchange.compareAllOrders(sell.materialExchange, maxVolume-volume, maxWeight-weight)
-			if cProfit > 0:  # Just to make sure no empty profits are from compareAllOrders()
-				volume += cVolume
-				weight += cWeight
-				profit += cProfit
-				materialExchanges.append((buyOrdersUsed, sellOrdersUsed, cProfit, itemCount, cVolume, cWeight))
-		return materialExchanges, profit, volume, weight
+		for opportunity, itemCount in plan.quantities.items():
+			materialExchanges.append((
+				opportunity.buyExchange.askBook.ordersFor(itemCount),
+				opportunity.sellExchange.bidBook.ordersFor(itemCount),
+				opportunity.profitFor(itemCount),
+				itemCount,
+				opportunity.material.volume * itemCount,
+				opportunity.material.weight * itemCount
+			))
+		materialExchanges.sort(key=lambda t: t[2], reverse=True)
+		return materialExchanges, plan.profit, plan.volume, plan.weight
@@ -0,0 +1,58 @@
+"""
+`findArbitrage()` over every exchange pair at once, against calling `getBestMaterialToFrom()` for each ordered pair
+`getBestMaterialToFrom()` only looks at the top of each book, so it's also timed with `compareAllOrders()` on everything it finds, which is what `findArbitrage()` works out
+"""
+import sys
+from itertools import permutations
+
+from common import PrUnStuff, marketArguments, markets, bestOf, formatSeconds
+
+from PrUnStuff.FIO.Arbitrage import findArbitrage
+
+
+def main():
+	args = marketArguments(__doc__).parse_args()
+	for market in markets(args):
+		print(market)
+		prUnStuff = market.prUnStuff()
+		fio = prUnStuff.fio
+		exchanges = list(fio.getExchanges().values())
+
+		def freshSnapshot():
+			# Both start from a snapshot that hasn't built any order books yet, like after a refresh
+			fio._exchangeSnapshot = None
+			fio.getExchangeSnapshot()
+
+		def looped():
+			return {(buy, sell): prUnStuff.getBestMaterialToFrom(buy, sell) for buy, sell in permutations(exchanges, 2)}
+
+		def loopedWithDepth():
+			return [
+				buy.materialExchange.compareAllOrders(sell.materialExchange, sys.maxsize, sys.maxsize)
+				for results in looped().values() for buy, sell, profitPerUnit in results
+			]
+
+		def allPairs():
+			return findArbitrage(fio.getExchangeSnapshot())
+
+		snapshotTime, _ = bestOf(freshSnapshot, args.repeat)
+		loopedTime, loopedResults = bestOf(looped, args.repeat, freshSnapshot)
+		loopedWithDepthTime, _ = bestOf(loopedWithDepth, args.repeat, freshSnapshot)
+		allPairsTime, opportunities = bestOf(allPairs, args.repeat, freshSnapshot)
+
+		# Both should find the same pairs, only `findArbitrage()` goes on to work out the depth of each
+		loopedPairs = {(buy.materialExchange.material.ticker, buyExchange.comexCode, sellExchange.comexCode) for (buyExchange, sellExchange), results in loopedResults.items() for buy, sell, profit in results}
+		foundPairs = {(opportunity.material.ticker, opportunity.buyExchangeCode, opportunity.sellExchangeCode) for opportunity in opportunities}
+		assert loopedPairs == foundPairs, "findArbitrage() and getBestMaterialToFrom() found different pairs"
+
+		pairs = len(exchanges) * (len(exchanges) - 1)
+		print(f"  snapshot, not included below                      {formatSeconds(snapshotTime)}")
+		print(f"  {pairs}x getBestMaterialToFrom(), top of book only      {formatSeconds(loopedTime)}")
+		print(f"  {pairs}x getBestMaterialToFrom() + compareAllOrders()   {formatSeconds(loopedWithDepthTime)}")
+		print(f"  findArbitrage(), full depth                       {formatSeconds(allPairsTime)}  ({loopedWithDepthTime / allPairsTime:.1f}x, {len(opportunities)} opportunities)")
+		if len(opportunities) > 0:
+			print(f"  best: {opportunities[0]}")
+
+
+if __name__ == "__main__":
+	main()
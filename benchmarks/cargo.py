@@ -0,0 +1,75 @@
+"""
+`getBestTradeToFrom()`'s cargo optimizer against the greedy fill it replaced, for every ordered exchange pair
+The gap is how far the optimizer's load could be from the best possible load
+"""
+import math
+import sys
+from itertools import permutations
+
+from common import PrUnStuff, marketArguments, markets, bestOf, formatSeconds
+
+from PrUnStuff.FIO.Arbitrage import ArbitrageOpportunity
+from PrUnStuff.FIO.CargoOptimizer import optimizeCargo
+
+
+def greedyTradeToFrom(prUnStuff, buyingExchange, sellingExchange, maxVolume: float, maxWeight: float):
+	"""The old `getBestTradeToFrom()`, it takes materials in order of top of book profit until one doesn't fit"""
+	volume, weight, profit = 0, 0, 0
+	for buy, sell, profitPerUnit in prUnStuff.getBestMaterialToFrom(buyingExchange, sellingExchange):
+		material = buy.materialExchange.material
+		if volume + material.volume >= maxVolume or weight + material.weight >= maxWeight:
+			break
+		_, _, cProfit, itemCount, cVolume, cWeight = buy.materialExchange.compareAllOrders(sell.materialExchange, maxVolume - volume, maxWeight - weight)
+		if cProfit > 0:
+			volume += cVolume
+			weight += cWeight
+			profit += cProfit
+	return profit, volume, weight
+
+
+def cargoPlan(snapshot, buyingExchange, sellingExchange, maxVolume: float, maxWeight: float, timeBudget: float):
+	"""The plan `getBestTradeToFrom()` builds it's result from, for it's upper bound"""
+	sellingMaterials = snapshot.getAllMaterialExchanges(sellingExchange)
+	opportunities = []
+	for material, buyExchange in snapshot.getAllMaterialExchanges(buyingExchange).items():
+		sellExchange = sellingMaterials.get(material, None)
+		if sellExchange is not None:
+			maxItemCount = min(
+				math.floor(maxVolume / material.volume) if material.volume > 0 else sys.maxsize,
+				math.floor(maxWeight / material.weight) if material.weight > 0 else sys.maxsize
+			)
+			opportunity = ArbitrageOpportunity(buyExchange, sellExchange, maxItemCount)
+			if opportunity.profit > 0:
+				opportunities.append(opportunity)
+	return optimizeCargo(opportunities, maxVolume, maxWeight, timeBudget)
+
+
+def main():
+	parser = marketArguments(__doc__)
+	parser.add_argument("--volume", type=float, default=500, help="Ship volume in m³")
+	parser.add_argument("--weight", type=float, default=500, help="Ship weight in t")
+	parser.add_argument("--time-budget", type=float, default=0.1, help="Seconds the optimizer may spend on each pair")
+	args = parser.parse_args()
+	for market in markets(args):
+		print(market)
+		prUnStuff = market.prUnStuff()
+		fio = prUnStuff.fio
+		snapshot = fio.getExchangeSnapshot()
+		print(f"  {'pair':<10} {'greedy profit':>15} {'time':>9} {'optimized profit':>17} {'time':>9} {'gap':>8}")
+		greedyTotal, optimizedTotal, greedyTimeTotal, optimizedTimeTotal = 0.0, 0.0, 0.0, 0.0
+		for buy, sell in permutations(fio.getExchanges().values(), 2):
+			greedyTime, (greedyProfit, _, _) = bestOf(lambda: greedyTradeToFrom(prUnStuff, buy, sell, args.volume, args.weight), args.repeat)
+			optimizedTime, (_, optimizedProfit, volume, weight) = bestOf(lambda: prUnStuff.getBestTradeToFrom(buy, sell, args.volume, args.weight, args.time_budget), args.repeat)
+			assert volume <= args.volume + 1e-6 and weight <= args.weight + 1e-6, "The optimized load doesn't fit"
+			plan = cargoPlan(snapshot, buy, sell, args.volume, args.weight, args.time_budget)
+			gap = plan.gap / plan.upperBound if plan.upperBound > 0 else 0.0
+			print(f"  {buy.comexCode}->{sell.comexCode:<5} {greedyProfit:>15,.0f} {formatSeconds(greedyTime):>9} {optimizedProfit:>17,.0f} {formatSeconds(optimizedTime):>9} {gap:>8.2%}")
+			greedyTotal += greedyProfit
+			optimizedTotal += optimizedProfit
+			greedyTimeTotal += greedyTime
+			optimizedTimeTotal += optimizedTime
+		print(f"  {'total':<10} {greedyTotal:>15,.0f} {formatSeconds(greedyTimeTotal):>9} {optimizedTotal:>17,.0f} {formatSeconds(optimizedTimeTotal):>9}")
+
+
+if __name__ == "__main__":
+	main()
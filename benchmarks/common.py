@@ -0,0 +1,143 @@
+"""
+Shared setup for the benchmarks, run each one from the repository root, e.g. `python benchmarks/arbitrage.py`
+Markets are made up unless recorded `exchangefull()` payloads are passed in, see `record.py`
+"""
+import argparse
+import importlib.util
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tests"))
+
+from payloads import materialJson, exchangeJson, exchangeStationJson, randomBook
+
+
+def importPackage():
+	"""Imports this checkout as `PrUnStuff`, whatever it's folder is called"""
+	if "PrUnStuff" not in sys.modules:
+		spec = importlib.util.spec_from_file_location("PrUnStuff", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+		module = importlib.util.module_from_spec(spec)
+		sys.modules["PrUnStuff"] = module
+		spec.loader.exec_module(module)
+	return sys.modules["PrUnStuff"]
+
+
+PrUnStuff = importPackage()
+
+EXCHANGE_CODES = ["AI1", "CI1", "IC1", "NC1"]
+
+
+class OfflineApi:
+	"""Serves the endpoints the benchmarks use from memory, so they don't need an API key, the network or the cache"""
+
+	def __init__(self, materials: list[dict], stations: list[dict], entries: list[dict]):
+		self.materials = {materialJson["Ticker"]: materialJson for materialJson in materials}
+		self.stations = stations
+		self.entries = {(entry["MaterialTicker"], entry["ExchangeCode"]): entry for entry in entries}
+		self.exchangeListeners = []
+		self.exchangefull = lambda: entries
+		# The snapshot is only rebuilt once this says the cache expired
+		self.exchangefull.isCached = lambda: True
+
+	def material(self, ticker: str):
+		return self.materials[ticker]
+
+	def allmaterials(self):
+		return list(self.materials.values())
+
+	def exchangestation(self):
+		return self.stations
+
+	def exchange(self, material: str, commodityExchange: str):
+		return self.entries[(material, commodityExchange)]
+
+	def addExchangeListener(self, listener):
+		self.exchangeListeners.append(listener)
+
+	def removeExchangeListener(self, listener):
+		self.exchangeListeners.remove(listener)
+
+
+class Market:
+	def __init__(self, name: str, materials: list[dict], stations: list[dict], entries: list[dict]):
+		self.name = name
+		self.materials = materials
+		self.stations = stations
+		self.entries = entries
+
+	def __repr__(self):
+		return f"<Market `{self.name}` {len(self.materials)} materials, {len(self.entries)} books, {sum(len(entry['BuyingOrders']) + len(entry['SellingOrders']) for entry in self.entries)} orders>"
+
+	def prUnStuff(self):
+		"""A `PrUnStuff` that reads everything from this market"""
+		prUnStuff = PrUnStuff.PrUnStuff("offline")
+		prUnStuff.fio.api = OfflineApi(self.materials, self.stations, self.entries)
+		return prUnStuff
+
+
+def syntheticMarket(materials=300, orders=40, seed=0) -> Market:
+	"""Every material on every exchange, each exchange priced a little differently so some pairs are worth trading"""
+	rnd = random.Random(seed)
+	materialJsons = [materialJson(f"M{i}", weight=round(rnd.uniform(0.05, 5), 3), volume=round(rnd.uniform(0.05, 5), 3)) for i in range(materials)]
+	entries = []
+	for material in materialJsons:
+		price = rnd.uniform(10, 5000)
+		for exchangeCode in EXCHANGE_CODES:
+			bids, asks = randomBook(rnd, orders, price * rnd.uniform(0.9, 1.1), price * 0.01)
+			entries.append(exchangeJson(material["Ticker"], exchangeCode, bids, asks))
+	return Market(f"synthetic {materials}x{orders}", materialJsons, [exchangeStationJson(exchangeCode) for exchangeCode in EXCHANGE_CODES], entries)
+
+
+def recordedMarket(path: str, materialsPath: str = None) -> Market:
+	"""
+	:param path: A saved `exchangefull()` payload
+	:param materialsPath: A saved `allmaterials()` payload, otherwise every material weighs 1t and is 1m³
+	"""
+	with open(path) as file:
+		entries = json.load(file)
+	if materialsPath is not None:
+		with open(materialsPath) as file:
+			materials = json.load(file)
+	else:
+		materials = [materialJson(ticker) for ticker in dict.fromkeys(entry["MaterialTicker"] for entry in entries)]
+	currencies = {entry["ExchangeCode"]: entry["Currency"] for entry in entries}
+	return Market(Path(path).name, materials, [exchangeStationJson(exchangeCode, currency) for exchangeCode, currency in currencies.items()], entries)
+
+
+def marketArguments(description: str) -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(description=description)
+	parser.add_argument("snapshots", nargs="*", help="Saved exchangefull() payloads to run on, see record.py, defaults to a made up market")
+	parser.add_argument("--materials", help="Saved allmaterials() payload, for the real weight and volume of each material")
+	parser.add_argument("--repeat", type=int, default=5, help="Runs of each, the fastest is reported")
+	return parser
+
+
+def markets(args: argparse.Namespace) -> Iterator[Market]:
+	if len(args.snapshots) <= 0:
+		yield syntheticMarket()
+	for path in args.snapshots:
+		yield recordedMarket(path, args.materials)
+
+
+def bestOf(f: Callable, repeat: int, setup: Callable = None):
+	"""
+	:param setup: Called before each run, without being timed
+	:return: Fastest time in seconds, and what the last run returned
+	"""
+	best, result = float("inf"), None
+	for _ in range(repeat):
+		if setup is not None:
+			setup()
+		start = time.perf_counter()
+		result = f()
+		best = min(best, time.perf_counter() - start)
+	return best, result
+
+
+def formatSeconds(seconds: float):
+	return f"{seconds * 1000:.2f}ms" if seconds < 1 else f"{seconds:.2f}s"
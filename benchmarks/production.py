@@ -0,0 +1,60 @@
+"""
+`sim_produceRecipe(produceAll=True)`, which works out whole batches with `solveProduction()`, against the one craft at a time loop it replaced
+Run on the readme's INC/FRM chain (H2O into HCP, GRN and MAI, into C) with larger and larger stockpiles, both are checked to end up with the same result
+The two are compared on random chains in `tests/test_productionSolver.py`
+"""
+import argparse
+
+from common import PrUnStuff, OfflineApi, bestOf, formatSeconds
+
+from payloads import materialJson, buildingJson, recipeJson
+from test_productionSolver import oneCraftAtATime
+from PrUnStuff.FIO.Building import Building
+
+
+def readmeChain():
+	""":return: A `PrUnStuff` that knows the chain's materials, C's recipe, the recipes for everything C needs and the FRM"""
+	prUnStuff = PrUnStuff.PrUnStuff("offline")
+	fio = prUnStuff.fio
+	fio.api = OfflineApi([materialJson(ticker) for ticker in ("H2O", "HCP", "GRN", "MAI", "C")], [], [])
+	frm = Building(buildingJson("FRM", {}, [
+		recipeJson("2xH2O = 4xHCP", "FRM", {"H2O": 2}, {"HCP": 4}),
+		recipeJson("1xH2O = 4xGRN", "FRM", {"H2O": 1}, {"GRN": 4}),
+		recipeJson("4xH2O = 12xMAI", "FRM", {"H2O": 4}, {"MAI": 12})
+	]), fio)
+	inc = Building(buildingJson("INC", {}, [recipeJson("4xHCP 2xGRN 2xMAI = 4xC", "INC", {"HCP": 4, "GRN": 2, "MAI": 2}, {"C": 4})]), fio)
+	requirementsRecipes = {material: recipe for recipe in frm.recipes.values() for material in recipe.outputs}
+	return prUnStuff, inc.recipes["4xHCP 2xGRN 2xMAI = 4xC"], requirementsRecipes, frm
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--h2o", type=int, nargs="+", default=[1000, 10000, 100000], help="H2O stockpiles to run on")
+	parser.add_argument("--frm-limit", type=int, help="Most crafts the FRM may make, by default it isn't limited")
+	parser.add_argument("--repeat", type=int, default=3, help="Runs of each, the fastest is reported")
+	args = parser.parse_args()
+	prUnStuff, recipe, requirementsRecipes, frm = readmeChain()
+	fio = prUnStuff.fio
+	buildingUseLimits = {} if args.frm_limit is None else {frm: args.frm_limit}
+
+	def run(produce, h2o: int):
+		resources = {fio.getMaterial(ticker): 0 for ticker in ("HCP", "GRN", "MAI", "C")}
+		resources[fio.getMaterial("H2O")] = h2o
+		recipesUsed, buildingsUsed = {}, {}
+		produce(
+			recipe, resources, produceAll=True, buildingUseLimits=buildingUseLimits,
+			requirementsRecipes=requirementsRecipes, recipesUsed=recipesUsed, buildingsUsed=buildingsUsed
+		)
+		return resources, recipesUsed, buildingsUsed
+
+	print(f"{'H2O':>9} {'C made':>9} {'one at a time':>14} {'solver':>10} {'speedup':>9}")
+	for h2o in args.h2o:
+		oldTime, oldResult = bestOf(lambda: run(oneCraftAtATime, h2o), args.repeat)
+		newTime, newResult = bestOf(lambda: run(prUnStuff.sim_produceRecipe, h2o), args.repeat)
+		assert oldResult == newResult, f"Different results for {h2o:,} H2O"
+		made = oldResult[0][fio.getMaterial("C")]
+		print(f"{h2o:>9,} {made:>9,} {formatSeconds(oldTime):>14} {formatSeconds(newTime):>10} {oldTime / newTime:>8.0f}x")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,24 @@
+"""Saves the current `exchangefull()` (and `allmaterials()`) from FIO, for running the benchmarks on real books"""
+import argparse
+import json
+
+from common import PrUnStuff
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("key", help="FIO API key")
+	parser.add_argument("snapshot", help="Where to save the exchangefull() payload")
+	parser.add_argument("--materials", help="Where to save the allmaterials() payload")
+	args = parser.parse_args()
+
+	api = PrUnStuff.FIOApi(args.key)
+	with open(args.snapshot, "w") as file:
+		json.dump(api.exchangefull(), file)
+	if args.materials is not None:
+		with open(args.materials, "w") as file:
+			json.dump(api.allmaterials(), file)
+
+
+if __name__ == "__main__":
+	main()
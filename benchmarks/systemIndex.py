@@ -0,0 +1,104 @@
+"""
+`SystemIndex`'s KD-tree queries against looking at every system, on made up star maps
+Both are checked to find the same systems
+"""
+import argparse
+import heapq
+import math
+import random
+
+from common import PrUnStuff, bestOf, formatSeconds
+
+from payloads import systemJson
+from PrUnStuff.FIO.System import System
+from PrUnStuff.FIO.SystemIndex import SystemIndex
+
+
+def randomSystems(fio, count: int, seed: int) -> list[System]:
+	"""Spread through a flat disc, like the real star map, which is roughly 1,000 systems across ±500 parsecs"""
+	rnd = random.Random(seed)
+	size = 500 * math.sqrt(count / 1000)
+	systems = []
+	for i in range(count):
+		angle, distance = rnd.uniform(0, 2 * math.pi), size * math.sqrt(rnd.random())
+		systems.append(System(systemJson(f"S{i}", (distance * math.cos(angle), distance * math.sin(angle), rnd.gauss(0, size / 20))), fio))
+	return systems
+
+
+def position(system: System):
+	return system.positionX, system.positionY, system.positionZ
+
+
+def bruteWithinRadius(systems: list[System], center, radius: float):
+	found = sorted((math.dist(center, position(system)), i) for i, system in enumerate(systems))
+	return [(systems[i], distance) for distance, i in found if distance <= radius]
+
+
+def bruteNearest(systems: list[System], center, k: int, predicate=None):
+	return [(systems[i], distance) for distance, i in heapq.nsmallest(k, ((math.dist(center, position(system)), i) for i, system in enumerate(systems) if predicate is None or predicate(system)))]
+
+
+def bruteInBox(systems: list[System], low, high):
+	return [system for system in systems if all(low[a] <= point <= high[a] for a, point in enumerate(position(system)))]
+
+
+def sameSystems(a: list, b: list):
+	"""Systems the same distance away may come in either order"""
+	if len(a) != len(b):
+		return False
+	if len(a) > 0 and isinstance(a[0], tuple):
+		return sorted((round(distance, 9), system.systemId) for system, distance in a) == sorted((round(distance, 9), system.systemId) for system, distance in b)
+	return sorted(system.systemId for system in a) == sorted(system.systemId for system in b)
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--systems", type=int, nargs="+", default=[1000, 10000], help="Star map sizes to run on")
+	parser.add_argument("--queries", type=int, default=500, help="Queries of each kind")
+	parser.add_argument("--radius", type=float, default=50, help="Parsecs, for withinRadius() and the size of inBox()")
+	parser.add_argument("--k", type=int, default=5, help="Systems to find with nearest()")
+	parser.add_argument("--repeat", type=int, default=3, help="Runs of each, the fastest is reported")
+	args = parser.parse_args()
+	fio = PrUnStuff.FIO("offline")
+	rnd = random.Random(0)
+	# Roughly how rare commodity exchanges are, for `nearest()` with a predicate
+	hasExchange = lambda system: int(system.systemId[1:]) % 150 == 0
+	for count in args.systems:
+		systems = randomSystems(fio, count, count)
+		buildTime, systemIndex = bestOf(lambda: SystemIndex(systems, fio), args.repeat)
+		exchangeTime, exchangeIndex = bestOf(lambda: systemIndex.where(hasExchange), args.repeat)
+		print(f"{count:,} systems, index built in {formatSeconds(buildTime)}, where() in {formatSeconds(exchangeTime)}")
+		centers = [position(rnd.choice(systems)) for _ in range(args.queries)]
+		boxes = [(tuple(c - args.radius for c in center), tuple(c + args.radius for c in center)) for center in centers]
+		queries = {
+			f"withinRadius({args.radius:g})": (
+				lambda: [systemIndex.withinRadius(center, args.radius) for center in centers],
+				lambda: [bruteWithinRadius(systems, center, args.radius) for center in centers]
+			),
+			f"nearest({args.k})": (
+				lambda: [systemIndex.nearest(center, args.k) for center in centers],
+				lambda: [bruteNearest(systems, center, args.k) for center in centers]
+			),
+			f"nearest({args.k}, predicate)": (
+				lambda: [systemIndex.nearest(center, args.k, hasExchange) for center in centers],
+				lambda: [bruteNearest(systems, center, args.k, hasExchange) for center in centers]
+			),
+			f"where().nearest({args.k})": (
+				lambda: [exchangeIndex.nearest(center, args.k) for center in centers],
+				lambda: [bruteNearest(systems, center, args.k, hasExchange) for center in centers]
+			),
+			"inBox()": (
+				lambda: [systemIndex.inBox(low, high) for low, high in boxes],
+				lambda: [bruteInBox(systems, low, high) for low, high in boxes]
+			)
+		}
+		print(f"  {'query':<24} {'brute force':>12} {'index':>12} {'speedup':>8}   ({args.queries} queries)")
+		for name, (indexed, brute) in queries.items():
+			indexTime, indexResults = bestOf(indexed, args.repeat)
+			bruteTime, bruteResults = bestOf(brute, args.repeat)
+			assert all(sameSystems(a, b) for a, b in zip(indexResults, bruteResults)), f"{name} found different systems"
+			print(f"  {name:<24} {formatSeconds(bruteTime):>12} {formatSeconds(indexTime):>12} {bruteTime / indexTime:>7.1f}x")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,107 @@
+import copy
+import importlib.util
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def importPackage():
+	"""Imports this checkout as `PrUnStuff`, whatever it's folder is called"""
+	if "PrUnStuff" not in sys.modules:
+		spec = importlib.util.spec_from_file_location("PrUnStuff", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)])
+		module = importlib.util.module_from_spec(spec)
+		sys.modules["PrUnStuff"] = module
+		spec.loader.exec_module(module)
+	return sys.modules["PrUnStuff"]
+
+
+importPackage()
+
+from payloads import materialJson
+
+
+class StubResponse:
+	def __init__(self, data):
+		self.status_code = 200
+		self._data = data
+
+	def json(self):
+		return self._data
+
+	@property
+	def content(self):
+		return str(self._data).encode()
+
+
+class StubApi:
+	"""
+	Stands in for FIO's rest API, `FIOApi.get()` answers from `responses` (by endpoint) and counts each endpoint asked for
+	Each answer is a copy, like a real response
+	"""
+
+	def __init__(self):
+		self.responses: dict[str, any] = {}
+		self.calls = Counter()
+		# Seconds each request takes, to give other threads a chance to get in the way
+		self.delay = 0.0
+		self._lock = threading.Lock()
+
+	def get(self, endpoint: str):
+		with self._lock:
+			self.calls[endpoint] += 1
+		if self.delay > 0:
+			time.sleep(self.delay)
+		return StubResponse(copy.deepcopy(self.responses[endpoint]))
+
+
+class MemoryApi:
+	"""Answers `material()` and `exchange()` from memory like the cache would, without one, counting every `exchange()`"""
+
+	def __init__(self, entries: list[dict] = ()):
+		self.entries = {(entry["MaterialTicker"], entry["ExchangeCode"]): entry for entry in entries}
+		self.exchangeCalls = Counter()
+
+	def material(self, ticker: str):
+		return materialJson(ticker)
+
+	def allmaterials(self):
+		return [materialJson(ticker) for ticker in dict.fromkeys(ticker for ticker, exchangeCode in self.entries)]
+
+	def exchange(self, material: str, commodityExchange: str):
+		self.exchangeCalls[(material, commodityExchange)] += 1
+		return self.entries[(material, commodityExchange)]
+
+
+@pytest.fixture(scope="session")
+def cacheDatabase(tmp_path_factory):
+	"""Every `dbcache` uses a throwaway sqlite file for the test session, rather than `FIO/cache.db`"""
+	peewee = pytest.importorskip("peewee")
+	pytest.importorskip("quickle", exc_type=ImportError)
+	from PrUnStuff.FIO.dbcache import DBCache
+	path = f"{ROOT / 'FIO'}/cache.db"
+	assert path not in DBCache.dbs, "The real cache was opened before the tests could replace it"
+	db = peewee.SqliteDatabase(str(tmp_path_factory.mktemp("cache") / "cache.db"))
+	db.connect()
+	DBCache.dbs[path] = db
+	yield db
+	del DBCache.dbs[path]
+	db.close()
+
+
+@pytest.fixture
+def stubApi(cacheDatabase, monkeypatch):
+	"""Stubs `FIOApi.get()`, and empties the cache after the test"""
+	from PrUnStuff.FIO.FIOApi import FIOApi
+	from PrUnStuff.FIO.dbcache import DBCache
+	stub = StubApi()
+	monkeypatch.setattr(FIOApi, "get", lambda api, endpoint, *args, **kwargs: stub.get(endpoint))
+	yield stub
+	with DBCache._writeLock:
+		for table in cacheDatabase.get_tables():
+			cacheDatabase.execute_sql(f'DELETE FROM "{table}"')
@@ -0,0 +1,103 @@
+"""Made up FIO payloads, shaped like what the rest API returns, for the tests and benchmarks"""
+import random
+from typing import Optional
+
+TIMESTAMP = "2024-01-01T00:00:00"
+
+
+def materialJson(ticker: str, weight=1.0, volume=1.0):
+	return {
+		"CategoryName": "test", "CategoryId": "test", "Name": ticker.lower(), "MatId": f"mat-{ticker}", "Ticker": ticker,
+		"Weight": weight, "Volume": volume, "UserNameSubmitted": "test", "Timestamp": TIMESTAMP
+	}
+
+
+def orderJson(orderId: str, itemCost: float, itemCount: Optional[int]):
+	"""`itemCount` of `None` is an order without a limit, like a market maker's"""
+	return {"OrderId": orderId, "CompanyId": "company", "CompanyName": "Company", "CompanyCode": "CO", "ItemCount": itemCount, "ItemCost": itemCost}
+
+
+def exchangeJson(ticker: str, exchangeCode: str, bids: list[tuple[float, Optional[int]]] = (), asks: list[tuple[float, Optional[int]]] = (), timestamp=TIMESTAMP, currency="ICA"):
+	"""
+	A full `exchange()` entry, with it's orders
+	:param bids: (itemCost, itemCount) of each buying order
+	:param asks: (itemCost, itemCount) of each selling order
+	"""
+	return {
+		"MaterialTicker": ticker, "ExchangeCode": exchangeCode, "MMBuy": None, "MMSell": None, "PriceAverage": 1.0,
+		"Ask": min((cost for cost, count in asks), default=None), "AskCount": len(asks), "Supply": sum(count or 0 for cost, count in asks),
+		"Bid": max((cost for cost, count in bids), default=None), "BidCount": len(bids), "Demand": sum(count or 0 for cost, count in bids),
+		"BuyingOrders": [orderJson(f"{ticker}.{exchangeCode}-bid{i}", cost, count) for i, (cost, count) in enumerate(bids)],
+		"SellingOrders": [orderJson(f"{ticker}.{exchangeCode}-ask{i}", cost, count) for i, (cost, count) in enumerate(asks)],
+		"CXDataModelId": f"{ticker}.{exchangeCode}", "ExchangeName": exchangeCode, "Currency": currency,
+		"Previous": None, "Price": 1.0, "PriceTimeEpochMs": 0, "High": 1.0, "AllTimeHigh": 1.0, "Low": 1.0, "AllTimeLow": 1.0,
+		"Traded": 0, "VolumeAmount": 0.0, "NarrowPriceBandLow": 1.0, "NarrowPriceBandHigh": 1.0, "WidePriceBandLow": 1.0, "WidePriceBandHigh": 1.0,
+		"UserNameSubmitted": "test", "Timestamp": timestamp
+	}
+
+
+def exchangeSummaryJson(exchangeJson: dict):
+	"""The same entry as `exchangeall()` has it, without the orders or the fields that come with them"""
+	return {key: value for key, value in exchangeJson.items() if key in (
+		"MaterialTicker", "ExchangeCode", "MMBuy", "MMSell", "PriceAverage", "Ask", "AskCount", "Supply", "Bid", "BidCount", "Demand", "Timestamp"
+	)}
+
+
+def exchangeStationJson(comexCode: str, currencyCode="ICA"):
+	return {
+		"NaturalId": f"{comexCode}-STATION", "Name": f"{comexCode} Station", "SystemId": f"system-{comexCode}", "SystemNaturalId": f"{comexCode}-000",
+		"SystemName": comexCode, "CommisionTimeEpochMs": 0, "ComexId": f"comex-{comexCode}", "ComexName": comexCode, "ComexCode": comexCode,
+		"WarehouseId": f"warehouse-{comexCode}", "CountryCode": "CC", "CountryName": "Country", "CurrencyNumericCode": "1",
+		"CurrencyCode": currencyCode, "CurrencyName": currencyCode, "CurrencyDecimals": 2, "GovernorId": None, "GovernorUserName": None,
+		"GovernorCorporationId": None, "GovernorCorporationName": None, "GovernorCorporationCode": None, "UserNameSubmitted": "test", "Timestamp": TIMESTAMP
+	}
+
+
+def storageJson(storageId: str, items: dict[str, int]):
+	return {
+		"StorageItems": [
+			{
+				"MaterialId": f"mat-{ticker}", "MaterialName": ticker.lower(), "MaterialTicker": ticker, "MaterialAmount": amount,
+				"MaterialValue": 0.0, "MaterialValueCurrency": None, "Type": "INVENTORY", "TotalWeight": float(amount), "TotalVolume": float(amount)
+			}
+			for ticker, amount in items.items()
+		],
+		"StorageId": storageId, "AddressableId": storageId, "Name": None, "WeightLoad": 0.0, "WeightCapacity": 1000.0, "VolumeLoad": 0.0, "VolumeCapacity": 1000.0,
+		"FixedStore": False, "Type": "STORE", "UserNameSubmitted": "test", "Timestamp": TIMESTAMP
+	}
+
+
+def systemJson(systemId: str, position: tuple[float, float, float] = (0.0, 0.0, 0.0), connections: list[str] = ()):
+	return {
+		"Connections": [{"SystemConnectionId": f"{systemId}-{connection}", "Connection": connection} for connection in connections],
+		"SystemId": systemId, "Name": f"System {systemId}", "NaturalId": systemId.upper(), "Type": "G",
+		"PositionX": position[0], "PositionY": position[1], "PositionZ": position[2], "SectorId": "sector", "SubSectorId": "subsector",
+		"UserNameSubmitted": "test", "Timestamp": TIMESTAMP
+	}
+
+
+def buildingJson(ticker: str, buildingCosts: dict[str, int], recipes: list[dict] = ()):
+	return {
+		"BuildingCosts": [{"CommodityTicker": materialTicker, "Amount": amount} for materialTicker, amount in buildingCosts.items()],
+		"Recipes": list(recipes), "Name": ticker.lower(), "Ticker": ticker, "Expertise": None,
+		"Pioneers": 0, "Settlers": 0, "Technicians": 0, "Engineers": 0, "Scientists": 0, "AreaCost": 10,
+		"UserNameSubmitted": "test", "Timestamp": TIMESTAMP
+	}
+
+
+def recipeJson(recipeName: str, buildingTicker: str, inputs: dict[str, int], outputs: dict[str, int], durationMs=3600000):
+	return {
+		"Inputs": [{"CommodityTicker": ticker, "Amount": amount} for ticker, amount in inputs.items()],
+		"Outputs": [{"CommodityTicker": ticker, "Amount": amount} for ticker, amount in outputs.items()],
+		"DurationMs": durationMs, "RecipeName": recipeName, "BuildingTicker": buildingTicker
+	}
+
+
+def randomBook(rnd: random.Random, orders: int, midPrice: float, spread: float):
+	"""
+	Bids below and asks above `midPrice`, each `(itemCost, itemCount)`
+	:return: bids, asks
+	"""
+	bids = [(max(round(midPrice - spread - rnd.expovariate(1 / midPrice) * 0.2, 2), 0.01), rnd.randint(1, 500)) for _ in range(orders)]
+	asks = [(round(midPrice + spread + rnd.expovariate(1 / midPrice) * 0.2, 2), rnd.randint(1, 500)) for _ in range(orders)]
+	return bids, asks
@@ -0,0 +1,63 @@
+import pytest
+
+from PrUnStuff.FIO import FIO
+from PrUnStuff.FIO.Arbitrage import ArbitrageOpportunity, findArbitrage
+from PrUnStuff.FIO.ExchangeSnapshot import ExchangeSnapshot
+from conftest import MemoryApi
+from payloads import exchangeJson
+
+
+def snapshot(entries: list[dict]):
+	fio = FIO("key")
+	fio.api = MemoryApi(entries)
+	return ExchangeSnapshot(entries, fio)
+
+
+def test_profitCurve():
+	market = snapshot([
+		exchangeJson("RAT", "AI1", asks=[(10.0, 5), (12.0, 5), (20.0, 5)], currency="AIC"),
+		exchangeJson("RAT", "IC1", bids=[(15.0, 8), (11.0, 10)], currency="AIC")
+	])
+	opportunity = ArbitrageOpportunity(market.getMaterialExchange("RAT", "AI1"), market.getMaterialExchange("RAT", "IC1"))
+	# 5 at 10 -> 15, 3 at 12 -> 15, then 12 -> 11 isn't worth it
+	assert (opportunity.quantity, opportunity.profit, opportunity.cost) == (8, 5 * 5 + 3 * 3, 5 * 10 + 3 * 12)
+	assert opportunity.profitPerUnit == 5
+	assert opportunity.profitFor(6) == 5 * 5 + 3
+	assert not opportunity.isUnlimited
+
+
+def test_exchangeRates():
+	entries = [
+		exchangeJson("RAT", "AI1", bids=[(9.0, 10)], asks=[(10.0, 10)], currency="AIC"),
+		exchangeJson("RAT", "NC1", bids=[(12.0, 10)], asks=[(13.0, 10)], currency="NCC")
+	]
+	[opportunity] = findArbitrage(snapshot(entries))
+	assert (opportunity.buyExchangeCode, opportunity.sellExchangeCode, opportunity.profit) == ("AI1", "NC1", 20.0)
+	# An NCC is only worth half an AIC, so it's the other way around
+	[opportunity] = findArbitrage(snapshot(entries), exchangeRates={"AIC": 1.0, "NCC": 0.5})
+	assert (opportunity.buyExchangeCode, opportunity.sellExchangeCode) == ("NC1", "AI1")
+	assert opportunity.profit == pytest.approx(10 * (9.0 - 6.5))
+	assert opportunity.cost == pytest.approx(10 * 6.5)
+	# Equal once converted, so there's nothing in it
+	assert findArbitrage(snapshot(entries), exchangeRates={"AIC": 1.2, "NCC": 1.0}) == []
+
+
+def test_marketMakersOnBothSides():
+	entries = [
+		exchangeJson("RAT", "AI1", asks=[(10.0, 5), (12.0, None)]),
+		exchangeJson("RAT", "IC1", bids=[(20.0, 3), (15.0, None)])
+	]
+	market = snapshot(entries)
+	[opportunity] = findArbitrage(market)
+	# Only up to where both sides are market makers, rather than ~1e18 items
+	assert (opportunity.quantity, opportunity.profit) == (5, 3 * 10 + 2 * 5)
+	assert opportunity.isUnlimited
+	[opportunity] = findArbitrage(market, maxQuantity=1000)
+	assert (opportunity.quantity, opportunity.profit) == (1000, 3 * 10 + 2 * 5 + 995 * 3)
+	assert not opportunity.isUnlimited
+
+
+def test_onlyMarketMakers():
+	market = snapshot([exchangeJson("RAT", "AI1", asks=[(10.0, None)]), exchangeJson("RAT", "IC1", bids=[(15.0, None)])])
+	assert findArbitrage(market) == []
+	assert findArbitrage(market, maxQuantity=10)[0].profit == 50
@@ -0,0 +1,148 @@
+import random
+import sys
+import time
+
+import pytest
+
+from PrUnStuff.FIO import FIO, MaterialExchange, MaterialExchangeOrder, OrderBook, DepthMatch
+from conftest import MemoryApi
+from payloads import orderJson, exchangeJson
+
+
+def book(orders: list[tuple[float, int]], isBid: bool) -> OrderBook:
+	""":param orders: (itemCost, itemCount) in the order they'd be filled, `itemCount` of `None` is unlimited"""
+	return OrderBook((MaterialExchangeOrder(orderJson(f"{'bid' if isBid else 'ask'}{i}", cost, count), None, None) for i, (cost, count) in enumerate(orders)), isBid)
+
+
+def randomOrders(rnd: random.Random, orders: int, maxCount: int, low: int, high: int, isBid: bool):
+	"""Whole prices, so the reference's sums are exact"""
+	prices = sorted((float(rnd.randint(low, high)) for _ in range(orders)), reverse=isBid)
+	return [(price, rnd.randint(1, maxCount)) for price in prices]
+
+
+def referenceMatch(asks: list[tuple[float, int]], bids: list[tuple[float, int]], maxQuantity: int, stopIfUnprofitable: bool):
+	"""Matches one item at a time, the obvious way, :return: each item's (askPrice, bidPrice)"""
+	askItems = [price for price, count in asks for _ in range(count)]
+	bidItems = [price for price, count in bids for _ in range(count)]
+	items = []
+	for askPrice, bidPrice in zip(askItems, bidItems):
+		if len(items) >= maxQuantity or (stopIfUnprofitable and bidPrice <= askPrice):
+			break
+		items.append((askPrice, bidPrice))
+	return items
+
+
+def checkAgainstReference(asks, bids, maxQuantity, stopIfUnprofitable):
+	match = DepthMatch(book(asks, False), book(bids, True), maxQuantity, stopIfUnprofitable)
+	items = referenceMatch(asks, bids, maxQuantity, stopIfUnprofitable)
+	profits = [0.0]
+	for askPrice, bidPrice in items:
+		profits.append(profits[-1] + bidPrice - askPrice)
+
+	assert match.quantity == len(items)
+	assert match.cost == sum(askPrice for askPrice, bidPrice in items)
+	assert match.income == sum(bidPrice for askPrice, bidPrice in items)
+	assert match.profit == profits[-1]
+	assert sum(fill.itemCount for fill in match.fills) == match.quantity
+	assert match.mostProfitableQuantity == (profits.index(max(profits)) if max(profits) > 0 else 0)
+	# Without stopping, some loss making items can be paid for by the profit before them
+	untruncatedProfits = [0.0]
+	for askPrice, bidPrice in referenceMatch(asks, bids, maxQuantity, False):
+		untruncatedProfits.append(untruncatedProfits[-1] + bidPrice - askPrice)
+	assert match.breakEvenQuantity == max(quantity for quantity, profit in enumerate(untruncatedProfits) if profit >= 0)
+	# Every fill is one stretch where neither order changes
+	itemIndex = 0
+	for fill in match.fills:
+		assert all(item == (fill.askPrice, fill.bidPrice) for item in items[itemIndex:itemIndex + fill.itemCount])
+		itemIndex += fill.itemCount
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matchesReference(seed):
+	rnd = random.Random(seed)
+	asks = randomOrders(rnd, rnd.randint(0, 15), 30, 80, 120, False)
+	bids = randomOrders(rnd, rnd.randint(0, 15), 30, 80, 120, True)
+	maxQuantity = rnd.choice([sys.maxsize, rnd.randint(0, 200)])
+	checkAgainstReference(asks, bids, maxQuantity, rnd.random() < 0.5)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_deepBooksMatchReference(seed):
+	rnd = random.Random(seed)
+	asks = randomOrders(rnd, 5000, 5, 500, 2000, False)
+	bids = randomOrders(rnd, 5000, 5, 100, 1500, True)
+	checkAgainstReference(asks, bids, sys.maxsize, True)
+	checkAgainstReference(asks, bids, sys.maxsize, False)
+
+
+def test_unlimitedOrders():
+	# Market makers on both sides, only `maxQuantity` stops it
+	asks, bids = [(10.0, 5), (12.0, None)], [(20.0, 3), (15.0, None)]
+	match = DepthMatch(book(asks, False), book(bids, True), 1000)
+	assert match.quantity == 1000
+	assert match.profit == 3 * 10 + 2 * 5 + 995 * 3
+	# Unprofitable from the start
+	assert DepthMatch(book([(12.0, None)], False), book([(11.0, None)], True)).quantity == 0
+
+
+def test_breakEvenPastUnprofitable():
+	asks, bids = [(10.0, 5), (14.0, 20)], [(20.0, 2), (12.0, 30)]
+	match = DepthMatch(book(asks, False), book(bids, True))
+	# 2 items at 10 profit, 3 at 2, then every item loses 2
+	assert match.quantity == 5
+	assert match.profit == 26.0
+	assert match.breakEvenQuantity == 5 + 13
+	assert DepthMatch(book(asks, False), book(bids, True), stopIfUnprofitable=False).breakEvenQuantity == 18
+	assert DepthMatch(book(asks, False), book(bids, True), maxQuantity=10).breakEvenQuantity == 10
+
+
+def test_deepBooksThroughput():
+	rnd = random.Random(0)
+	orders = 50000
+	askBook = book(randomOrders(rnd, orders, 500, 500, 2000, False), False)
+	bidBook = book(randomOrders(rnd, orders, 500, 100, 1500, True), True)
+	start = time.perf_counter()
+	match = DepthMatch(askBook, bidBook, stopIfUnprofitable=False)
+	elapsed = time.perf_counter() - start
+	# A single merge pass, each fill uses up at least one order
+	assert len(match.fills) <= 2 * orders
+	assert match.quantity == min(askBook.cumulativeQuantities[-1], bidBook.cumulativeQuantities[-1])
+	# ~0.2s for ~100k fills here, the bound is only there to catch it going quadratic
+	assert elapsed < 5, f"{len(match.fills)} fills took {elapsed:.2f}s"
+
+
+class TestCompareAllOrders:
+	"""The loop `compareAllOrders()` used to have, checked the wrong book's length and never honoured `stopIfUnprofitable`"""
+
+	@staticmethod
+	def materialExchanges(buyFrom: dict, sellTo: dict):
+		fio = FIO("key")
+		fio.api = MemoryApi([buyFrom, sellTo])
+		return MaterialExchange(buyFrom, fio), MaterialExchange(sellTo, fio)
+
+	def test_buyingExchangeWithoutBids(self):
+		# The old loop only took orders while the buying exchange had bids, so this made nothing
+		buyFrom, sellTo = self.materialExchanges(
+			exchangeJson("RAT", "AI1", bids=[], asks=[(10.0, 5), (11.0, 5), (12.0, 5)]),
+			exchangeJson("RAT", "IC1", bids=[(20.0, 100)], asks=[])
+		)
+		askOrdersUsed, bidOrdersUsed, profit, itemCount, volume, weight = buyFrom.compareAllOrders(sellTo, 1000, 1000)
+		assert (profit, itemCount) == (10 * 5 + 9 * 5 + 8 * 5, 15)
+		assert len(askOrdersUsed) == 3 and len(bidOrdersUsed) == 1
+
+	def test_stopsWhenUnprofitable(self):
+		buyFrom, sellTo = self.materialExchanges(
+			exchangeJson("RAT", "AI1", bids=[(1.0, 1)], asks=[(10.0, 5), (20.0, 5)]),
+			exchangeJson("RAT", "IC1", bids=[(15.0, 10)], asks=[(30.0, 1)])
+		)
+		assert buyFrom.compareAllOrders(sellTo, 1000, 1000)[2:4] == (25.0, 5)
+		# The old loop always did this, giving the profit back
+		assert buyFrom.compareAllOrders(sellTo, 1000, 1000, stopIfUnprofitable=False)[2:4] == (0.0, 10)
+
+	def test_limitedByVolume(self):
+		buyFrom, sellTo = self.materialExchanges(
+			exchangeJson("RAT", "AI1", asks=[(10.0, 50)]),
+			exchangeJson("RAT", "IC1", bids=[(15.0, 50)])
+		)
+		# `materialJson()` is 1t and 1m³ per item
+		assert buyFrom.compareAllOrders(sellTo, 7.5, 1000)[2:] == (35.0, 7, 7.0, 7.0)
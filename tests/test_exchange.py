@@ -0,0 +1,87 @@
+import pytest
+
+from PrUnStuff.FIO import FIO, MaterialExchange
+from conftest import MemoryApi
+from payloads import exchangeJson, exchangeSummaryJson
+
+LAZY_FIELDS = (
+	"cxDataModelId", "exchangeName", "currency", "previous", "price", "priceTimeEpochMs", "high", "allTimeHigh", "low", "allTimeLow",
+	"traded", "volumeAmount", "narrowPriceBandLow", "narrowPriceBandHigh", "widePriceBandLow", "widePriceBandHigh", "userNameSubmitted", "timestamp"
+)
+
+
+@pytest.fixture
+def entry():
+	# `Previous` is null, like it is for a lot of materials
+	return exchangeJson("RAT", "IC1", bids=[(90.0, 100), (85.0, 50)], asks=[(100.0, 40), (110.0, None)])
+
+
+@pytest.fixture
+def api(entry):
+	return MemoryApi([entry])
+
+
+@pytest.fixture
+def fio(api):
+	fio = FIO("key")
+	fio.api = api
+	return fio
+
+
+def test_listFieldsDontHydrate(fio, api, entry):
+	materialExchange = MaterialExchange(exchangeSummaryJson(entry), fio)
+	for _ in range(100):
+		assert materialExchange.material.ticker == "RAT"
+		assert materialExchange.exchangeCode == "IC1"
+		assert (materialExchange.bid, materialExchange.ask) == (90.0, 100.0)
+		assert (materialExchange.supply, materialExchange.demand) == (40, 150)
+		assert (materialExchange.bidCount, materialExchange.askCount) == (2, 2)
+		assert materialExchange.mmBuy is None
+	assert sum(api.exchangeCalls.values()) == 0
+
+
+def test_hydratesOnceOnFirstOrderAccess(fio, api, entry):
+	materialExchange = MaterialExchange(exchangeSummaryJson(entry), fio)
+	assert [order.itemCost for order in materialExchange.sellingOrders] == [110.0, 100.0]
+	assert api.exchangeCalls[("RAT", "IC1")] == 1
+	for _ in range(100):
+		assert len(materialExchange.buyingOrders) == 2
+		for field in LAZY_FIELDS:
+			getattr(materialExchange, field)
+	assert api.exchangeCalls[("RAT", "IC1")] == 1
+
+
+def test_nullFieldsAreCachedAsNull(fio, api, entry):
+	materialExchange = MaterialExchange(exchangeSummaryJson(entry), fio)
+	for _ in range(1000):
+		assert materialExchange.previous is None
+	assert api.exchangeCalls[("RAT", "IC1")] == 1
+
+
+def test_fullPayloadNeverHydrates(fio, api, entry):
+	materialExchange = MaterialExchange(entry, fio)
+	for field in LAZY_FIELDS + ("buyingOrders", "sellingOrders", "askBook", "bidBook"):
+		getattr(materialExchange, field)
+	assert sum(api.exchangeCalls.values()) == 0
+
+
+def test_summaryIsntARefresh(fio, entry):
+	materialExchange = MaterialExchange(entry, fio)
+	orders = materialExchange.sellingOrders
+	newer = exchangeJson("RAT", "IC1", bids=[(95.0, 10)], asks=[(99.0, 10)], timestamp="2024-01-02T00:00:00")
+	assert not materialExchange.refresh(exchangeSummaryJson(newer))
+	assert materialExchange.timestamp == entry["Timestamp"]
+	assert materialExchange.sellingOrders is orders
+	# The book the summary came from still gets through, even though it has the same `Timestamp`
+	assert materialExchange.refresh(newer)
+	assert [order.itemCost for order in materialExchange.sellingOrders] == [99.0]
+	assert materialExchange.timestamp == newer["Timestamp"]
+
+
+def test_summaryDoesntHydrate(fio, api, entry):
+	api.entries[("RAT", "IC1")] = exchangeSummaryJson(entry)
+	materialExchange = MaterialExchange(exchangeSummaryJson(entry), fio)
+	assert materialExchange.sellingOrders is None
+	api.entries[("RAT", "IC1")] = entry
+	assert len(materialExchange.sellingOrders) == 2
+	assert api.exchangeCalls[("RAT", "IC1")] == 2
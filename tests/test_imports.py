@@ -0,0 +1,43 @@
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Only imported once something is fetched (or a numpy feature is used), importing the package must not pull these in
+HEAVY_MODULES = ("requests", "peewee", "quickle", "dateutil", "numpy")
+
+IMPORT_PACKAGE = f"""
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("PrUnStuff", {str(ROOT / "__init__.py")!r}, submodule_search_locations=[{str(ROOT)!r}])
+module = importlib.util.module_from_spec(spec)
+sys.modules["PrUnStuff"] = module
+spec.loader.exec_module(module)
+"""
+
+
+def importTimes() -> dict[str, int]:
+	"""`python -X importtime` of importing the package, cumulative microseconds by module"""
+	result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_PACKAGE], capture_output=True, text=True, check=True)
+	times = {}
+	for line in result.stderr.splitlines():
+		# import time: self [us] | cumulative | imported package
+		if not line.startswith("import time:") or "[us]" in line:
+			continue
+		selfTime, cumulative, name = line[len("import time:"):].split("|")
+		times[name.strip()] = int(cumulative)
+	return times
+
+
+def test_importDoesNotLoadHeavyModules():
+	times = importTimes()
+	assert "PrUnStuff.FIO" in times
+	heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+	assert heavy == []
+
+
+def test_importDoesNotOpenCache():
+	result = subprocess.run(
+		[sys.executable, "-c", IMPORT_PACKAGE + "from PrUnStuff.FIO.dbcache import DBCache\nprint(len(DBCache.dbs))"],
+		capture_output=True, text=True, check=True
+	)
+	assert result.stdout.strip() == "0"
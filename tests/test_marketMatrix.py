@@ -0,0 +1,45 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from PrUnStuff.FIO import FIO, MaterialExchange
+from PrUnStuff.FIO.MarketMatrix import MarketMatrix
+from conftest import MemoryApi
+from payloads import exchangeJson
+
+
+@pytest.fixture
+def matrix():
+	entries = [
+		exchangeJson("RAT", "AI1", bids=[(80.0, 10)], asks=[(95.0, 10)]),
+		exchangeJson("RAT", "IC1", bids=[(90.0, 10)], asks=[(100.0, 10)]),
+		exchangeJson("H2O", "IC1", bids=[(30.0, 10)], asks=[])
+	]
+	fio = FIO("key")
+	fio.api = MemoryApi(entries)
+	return MarketMatrix(MaterialExchange(entry, fio) for entry in entries)
+
+
+def test_lookups(matrix):
+	assert matrix.row("ask", "rat") == {"AI1": 95.0, "IC1": 100.0}
+	column = matrix.column("bid", "ic1")
+	assert {material.ticker: bid for material, bid in column.items()} == {"H2O": 30.0, "RAT": 90.0}
+	assert matrix.subset(["IC1"]).tolist() == [1]
+	assert matrix.cheapest("RAT") == ("AI1", 95.0)
+	assert matrix.cheapest("H2O") == (None, None)
+	asks, columns = matrix.lowestAsk(["IC1"])
+	assert math.isnan(asks[0]) and asks[1] == 100.0
+
+
+def test_unknownKeys(matrix):
+	with pytest.raises(KeyError):
+		matrix.row("ask", "NOPE")
+	with pytest.raises(KeyError):
+		matrix.column("ask", "NOPE")
+	with pytest.raises(KeyError):
+		matrix.subset(["AI1", "NOPE"])
+	with pytest.raises(KeyError):
+		matrix.lowestAsk(["NOPE"])
+	assert matrix.cheapest("NOPE") == (None, None)
@@ -0,0 +1,77 @@
+import pytest
+
+from PrUnStuff.FIO import FIO
+from conftest import MemoryApi
+from payloads import exchangeJson
+
+
+class SnapshotApi(MemoryApi):
+	"""`MemoryApi` with `exchangefull()`, which is cached until `expire()` is called"""
+
+	def __init__(self, entries: list[dict]):
+		super().__init__(entries)
+		self.cached = False
+
+		def exchangefull():
+			self.cached = True
+			return list(self.entries.values())
+
+		exchangefull.isCached = lambda: self.cached
+		self.exchangefull = exchangefull
+
+	def expire(self):
+		self.cached = False
+
+
+def entryAt(day: int, asks: list[tuple[float, int]]):
+	return exchangeJson("RAT", "IC1", bids=[(90.0, 10)], asks=asks, timestamp=f"2024-01-0{day}T00:00:00")
+
+
+@pytest.fixture
+def api():
+	return SnapshotApi([entryAt(1, [(100.0, 10)])])
+
+
+@pytest.fixture
+def fio(api):
+	fio = FIO("key")
+	fio.api = api
+	return fio
+
+
+@pytest.fixture
+def diffs(fio):
+	diffs = []
+	fio.getExchangeSnapshot()
+	fio.getMaterialExchange("RAT", "IC1")
+	fio.orderEvents.subscribe(diffs.append)
+	return diffs
+
+
+def update(api: SnapshotApi, entry: dict):
+	api.entries[("RAT", "IC1")] = entry
+	api.expire()
+
+
+def test_liveRefreshThenSnapshotPublishesOnce(fio, api, diffs):
+	update(api, entryAt(2, [(100.0, 5)]))
+	fio.getMaterialExchange("RAT", "IC1")
+	fio.getExchangeSnapshot()
+	assert len(diffs) == 1
+	assert [event.itemCountChange for event in diffs[0].changed] == [-5]
+
+
+def test_snapshotPublishesFromWhatLiveLastSaw(fio, api, diffs):
+	update(api, entryAt(2, [(100.0, 5)]))
+	fio.getMaterialExchange("RAT", "IC1")
+	update(api, entryAt(3, [(100.0, 2)]))
+	fio.getExchangeSnapshot()
+	# Against the previous snapshot this would have been -8, repeating the -5 already published
+	assert [[event.itemCountChange for event in diff.changed] for diff in diffs] == [[-5], [-3]]
+
+
+def test_snapshotAlonePublishes(fio, api, diffs):
+	update(api, entryAt(2, [(100.0, 5)]))
+	fio.getExchangeSnapshot()
+	fio.getMaterialExchange("RAT", "IC1")
+	assert len(diffs) == 1
@@ -0,0 +1,25 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from PrUnStuff.FIO.PlanetTable import PlanetQuery
+
+
+def query(count: int):
+	return PlanetQuery(None, np.arange(count))
+
+
+@pytest.mark.parametrize("values", [
+	np.array([False, True, False, True, True]),
+	np.array([0, 2, 0, 2, 2], dtype=np.uint8),
+	np.array([0.5, 2.0, 0.5, 2.0, 2.0])
+])
+def test_sortByDescendingIsStable(values):
+	assert query(5).sortBy(values, descending=True).indices.tolist() == [1, 3, 4, 0, 2]
+
+
+def test_sortByThenBy():
+	gravity = np.array([1.0, 2.0, 1.0, 2.0])
+	hasShipyard = np.array([False, False, True, True])
+	# By shipyard first, then gravity
+	assert query(4).sortBy(gravity).sortBy(hasShipyard, descending=True).indices.tolist() == [2, 3, 0, 1]
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("dateutil")
+
+from PrUnStuff.FIO.PriceHistory import PriceHistory
+from payloads import exchangeJson, exchangeSummaryJson
+
+
+def refresh(minute: int):
+	timestamp = (datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=minute)).isoformat()
+	return [exchangeSummaryJson(exchangeJson("RAT", "IC1", bids=[(90.0 + minute, 10)], asks=[(100.0 + minute, 10)], timestamp=timestamp))]
+
+
+@pytest.fixture
+def path(tmp_path):
+	return str(tmp_path / "pricehistory.npz")
+
+
+def countSaves(monkeypatch, history: PriceHistory):
+	saves = []
+	save = history.save
+	monkeypatch.setattr(history, "save", lambda: saves.append(1) or save())
+	return saves
+
+
+def test_refreshesAreBatched(monkeypatch, path):
+	history = PriceHistory(path, downsampleAfter=None)
+	saves = countSaves(monkeypatch, history)
+	for minute in range(500):
+		assert history.record(refresh(minute)) == 1
+	assert saves == []
+	history.close()
+	assert saves == [1]
+	assert len(PriceHistory(path, saveInterval=None).getSeries("RAT", "IC1")) == 500
+
+
+def test_savesOnceIntervalHasPassed(monkeypatch, path):
+	history = PriceHistory(path, downsampleAfter=None, saveInterval=timedelta(0))
+	saves = countSaves(monkeypatch, history)
+	history.record(refresh(0))
+	# Already recorded, nothing to save
+	history.record(refresh(0))
+	assert saves == [1]
+	history.close()
+	assert saves == [1]
+
+
+def test_manualSaving(path):
+	history = PriceHistory(path, saveInterval=None)
+	history.record(refresh(0))
+	history.saveIfUnsaved()
+	assert PriceHistory(path, saveInterval=None).getSeries("RAT", "IC1").times.size == 1
+
+
+def sample(minutes: int, price: Optional[float], traded: Optional[float] = 1.0, ticker="RAT"):
+	timestamp = (datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=minutes)).isoformat()
+	return {
+		"MaterialTicker": ticker, "ExchangeCode": "IC1", "Timestamp": timestamp,
+		"Price": price, "Bid": None if price is None else price - 1, "Ask": None if price is None else price + 1, "Supply": 10, "Demand": 20, "Traded": traded
+	}
+
+
+@pytest.fixture
+def series(path):
+	history = PriceHistory(path, downsampleAfter=None, saveInterval=None)
+	# Out of order, `getSeries()` sorts by time
+	history.record([sample(180, 20.0, 2.0), sample(0, 10.0, 1.0), sample(60, 20.0, 3.0)])
+	history.record([sample(120, 40.0, 0.0)])
+	return history.getSeries("rat", "ic1")
+
+
+def test_series(series):
+	assert series.times.tolist() == [1704067200000 + hour * 3600000 for hour in range(4)]
+	assert series.price.tolist() == [10.0, 20.0, 40.0, 20.0]
+	assert series.bid.tolist() == [9.0, 19.0, 39.0, 19.0]
+	assert series.traded.tolist() == [1.0, 3.0, 0.0, 2.0]
+
+
+def test_between(series):
+	start = datetime(2024, 1, 1, 1)
+	assert series.between(start, datetime(2024, 1, 1, 3)).price.tolist() == [20.0, 40.0]
+	assert series.between(start).price.tolist() == [20.0, 40.0, 20.0]
+	assert series.between(end=start).price.tolist() == [10.0]
+	assert len(series.between(datetime(2025, 1, 1))) == 0
+
+
+def test_movingAverage(series):
+	assert series.movingAverage(2).tolist() == [15.0, 30.0, 30.0]
+	assert series.movingAverage(4).tolist() == [22.5]
+	assert series.movingAverage(5).size == 0
+	assert series.movingAverage(2, "traded").tolist() == [2.0, 1.5, 1.0]
+
+
+def test_vwap(series):
+	assert series.vwap() == pytest.approx((10 * 1 + 20 * 3 + 40 * 0 + 20 * 2) / 6)
+	assert series.rollingVwap(2).tolist() == pytest.approx([(10 + 60) / 4, 60 / 3, 40 / 2])
+	assert np.isnan(series.between(datetime(2024, 1, 1, 2), datetime(2024, 1, 1, 3)).vwap())
+
+
+def test_volatility(series):
+	ln2 = np.log(2)
+	assert series.returns().tolist() == pytest.approx([ln2, ln2, -ln2])
+	# Mean of ln2/3, squared deviations of 4/9, 4/9 and 16/9 ln2², over 2
+	assert series.volatility() == pytest.approx(ln2 * 2 / np.sqrt(3))
+	assert series.rollingVolatility(2).tolist() == pytest.approx([0.0, ln2 * np.sqrt(2)], abs=1e-6)
+	assert series.rollingVolatility(4).size == 0
+
+
+def test_missingValues(path):
+	history = PriceHistory(path, downsampleAfter=None, saveInterval=None)
+	history.record([sample(0, 10.0), sample(60, None, None), sample(120, 30.0)])
+	series = history.getSeries("RAT", "IC1")
+	assert np.isnan(series.price[1])
+	assert series.movingAverage(2).tolist() == [10.0, 30.0]
+	assert series.movingAverage(3).tolist() == [20.0]
+	assert series.vwap() == 20.0
+
+
+def test_recordingTheSameTimestampAgain(path):
+	history = PriceHistory(path, downsampleAfter=None, saveInterval=None)
+	assert history.record([sample(0, 10.0), sample(0, 10.0, ticker="H2O")]) == 2
+	assert history.record([sample(0, 99.0), sample(60, 11.0)]) == 1
+	# Once merged into the arrays, as well as while pending
+	history.getSeries("RAT", "IC1")
+	assert history.record([sample(0, 98.0), sample(60, 97.0)]) == 0
+	assert history.getSeries("RAT", "IC1").price.tolist() == [10.0, 11.0]
+	assert list(history) == [("H2O", "IC1"), ("RAT", "IC1")]
+	assert history.getSeries("RAT", "NC1") is None
+
+
+def test_downsample(path):
+	history = PriceHistory(path, downsampleAfter=None, saveInterval=None)
+	history.record([sample(0, 10.0, 1.0), sample(20, 20.0, None), sample(40, 30.0, 5.0), sample(60, 40.0), sample(70, 50.0), sample(130, 60.0)])
+	history.downsample(datetime(2024, 1, 1, 2))
+	series = history.getSeries("RAT", "IC1")
+	# One sample per hour before 02:00, at the last time in it, averaging what isn't missing
+	assert series.datetimes.astype(str).tolist() == ["2024-01-01T00:40:00.000", "2024-01-01T01:10:00.000", "2024-01-01T02:10:00.000"]
+	assert series.price.tolist() == [20.0, 45.0, 60.0]
+	assert series.traded.tolist() == [3.0, 1.0, 1.0]
+
+
+def test_downsampleAfterOnSave(path):
+	history = PriceHistory(path, downsampleAfter=timedelta(days=7), saveInterval=None)
+	history.record([sample(minutes, float(minutes)) for minutes in range(0, 180, 15)])
+	history.save()
+	# Everything is more than a week old
+	assert PriceHistory(path, saveInterval=None).getSeries("RAT", "IC1").price.tolist() == [22.5, 82.5, 142.5]
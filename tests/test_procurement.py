@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from PrUnStuff.FIO import FIO, Storage
+from PrUnStuff.FIO.ExchangeSnapshot import ExchangeSnapshot
+from PrUnStuff.FIO.Procurement import planProcurement
+from conftest import MemoryApi
+from payloads import exchangeJson, storageJson
+
+
+@pytest.fixture
+def fio():
+	return FIO("key")
+
+
+def snapshot(fio, entries: list[dict]):
+	fio.api = MemoryApi(entries)
+	return ExchangeSnapshot(entries, fio)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_splitIsCheapest(fio, seed):
+	rnd = random.Random(seed)
+	asks = {exchangeCode: [(float(rnd.randint(10, 30)), rnd.randint(1, 10)) for _ in range(rnd.randint(1, 6))] for exchangeCode in ("AI1", "IC1")}
+	market = snapshot(fio, [exchangeJson("RAT", exchangeCode, asks=orders) for exchangeCode, orders in asks.items()])
+	total = sum(count for orders in asks.values() for _, count in orders)
+	required = rnd.randint(1, total)
+	plan = planProcurement(market, {fio.getMaterial("RAT"): required})
+	# Every split between the two exchanges, each bought cheapest first
+	ai1, ic1 = (market.getMaterialExchange("RAT", exchangeCode).askBook for exchangeCode in ("AI1", "IC1"))
+	cheapest = min(
+		ai1.costFor(fromAi1) + ic1.costFor(required - fromAi1)
+		for fromAi1 in range(required + 1)
+		if ai1.costFor(fromAi1) is not None and ic1.costFor(required - fromAi1) is not None
+	)
+	assert plan.isComplete
+	assert plan.totalCost == cheapest
+	assert sum(fill.itemCount for fill in plan.fills) == required
+	assert sum(plan.exchangeCosts.values()) == cheapest
+
+
+def test_storageOffsets(fio):
+	market = snapshot(fio, [exchangeJson("RAT", "AI1", asks=[(10.0, 100)]), exchangeJson("H2O", "AI1", asks=[(2.0, 100)])])
+	storage = Storage(storageJson("store", {"RAT": 30, "H2O": 80}), fio, "user")
+	rat, h2o = fio.getMaterial("RAT"), fio.getMaterial("H2O")
+	plan = planProcurement(market, {rat: 50, h2o: 40}, storage=storage)
+	assert (plan.materials[rat].toBuy, plan.materials[rat].bought, plan.materials[rat].cost) == (20, 20, 200.0)
+	# More in storage than is needed
+	assert (plan.materials[h2o].toBuy, plan.materials[h2o].fills) == (0, [])
+	assert plan.totalCost == 200.0
+
+
+def test_exchangeRates(fio):
+	market = snapshot(fio, [
+		exchangeJson("RAT", "AI1", asks=[(10.0, 100)], currency="AIC"),
+		exchangeJson("RAT", "NC1", asks=[(15.0, 100)], currency="NCC")
+	])
+	rat = fio.getMaterial("RAT")
+	assert planProcurement(market, {rat: 10}).exchangeCosts == {"AI1": 100.0}
+	plan = planProcurement(market, {rat: 10}, exchangeRates={"AIC": 1.0, "NCC": 0.5})
+	# The cost on each exchange is in it's own currency, the total is converted
+	assert (plan.exchangeCosts, plan.totalCost) == ({"NC1": 150.0}, 75.0)
+
+
+def test_marketMakerIsLast(fio):
+	market = snapshot(fio, [
+		exchangeJson("RAT", "AI1", asks=[(20.0, 5), (12.0, None)]),
+		exchangeJson("RAT", "IC1", asks=[(11.0, 5), (13.0, 5)])
+	])
+	plan = planProcurement(market, {fio.getMaterial("RAT"): 20})
+	# Only the orders cheaper than the market maker's are taken before it, it then covers the rest
+	assert [(fill.exchangeCode, fill.order.itemCost, fill.itemCount) for fill in plan.fills] == [("IC1", 11.0, 5), ("AI1", 12.0, 15)]
+	assert plan.totalCost == 5 * 11 + 15 * 12
+
+
+def test_unlimitedIsUsedAfterCheaperOrders(fio):
+	market = snapshot(fio, [exchangeJson("RAT", "AI1", asks=[(10.0, 5), (12.0, None), (11.0, 5)])])
+	plan = planProcurement(market, {fio.getMaterial("RAT"): 1000})
+	assert [(fill.order.itemCost, fill.itemCount) for fill in plan.fills] == [(10.0, 5), (11.0, 5), (12.0, 990)]
+	assert plan.isComplete
+
+
+def test_shortfalls(fio):
+	market = snapshot(fio, [exchangeJson("RAT", "AI1", asks=[(10.0, 5)]), exchangeJson("RAT", "IC1", asks=[(11.0, 3)]), exchangeJson("H2O", "AI1", asks=[(1.0, 50)])])
+	rat, h2o = fio.getMaterial("RAT"), fio.getMaterial("H2O")
+	plan = planProcurement(market, {rat: 10, h2o: 20})
+	assert not plan.isComplete
+	assert plan.shortfalls == {rat: 2}
+	assert (plan.materials[rat].bought, plan.materials[rat].cost) == (8, 5 * 10 + 3 * 11)
+	assert planProcurement(market, {rat: 10}, exchanges=["IC1"]).shortfalls == {rat: 7}
+	assert planProcurement(market, {rat: 8, h2o: 20}).isComplete
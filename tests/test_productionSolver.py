@@ -0,0 +1,151 @@
+import math
+import random
+
+import pytest
+
+import PrUnStuff
+from PrUnStuff.FIO.Building import Building
+from PrUnStuff.FIO.ProductionSolver import solveProduction
+from conftest import MemoryApi
+from payloads import buildingJson, recipeJson
+
+
+def oneCraftAtATime(
+		recipe, resourcesAvailable: dict, produceAll=False, buildingUseLimits: dict = None,
+		requirementsRecipes: dict = None, recipesUsed: dict = None, buildingsUsed: dict = None
+):
+	"""The old `sim_produceRecipe()`, every craft (and every craft of every requirement) is simulated on it's own"""
+	if buildingUseLimits is None:
+		buildingUseLimits = {}
+	if requirementsRecipes is None:
+		requirementsRecipes = {}
+	if recipesUsed is None:
+		recipesUsed = {}
+	if buildingsUsed is None:
+		buildingsUsed = {}
+	producedAnything = False
+	while True:
+		hasRequirements = True
+		for inputMaterial in recipe.inputs.values():
+			missing = inputMaterial.amount - resourcesAvailable[inputMaterial.material]
+			if missing > 0:
+				if inputMaterial.material not in requirementsRecipes:
+					hasRequirements = False
+					break
+				requirementRecipe = requirementsRecipes[inputMaterial.material]
+				requirementProduceCount = math.ceil(missing / requirementRecipe.outputs[inputMaterial.material].amount)
+				if not all([
+					oneCraftAtATime(
+						requirementRecipe, resourcesAvailable, produceAll=False, buildingUseLimits=buildingUseLimits,
+						requirementsRecipes=requirementsRecipes, recipesUsed=recipesUsed, buildingsUsed=buildingsUsed
+					)
+					for i in range(requirementProduceCount)
+				]):
+					hasRequirements = False
+					break
+		if not hasRequirements:
+			break
+		if recipe.building not in buildingsUsed:
+			buildingsUsed[recipe.building] = 1
+		else:
+			maxUse = buildingUseLimits.get(recipe.building, None)
+			if maxUse is not None and buildingsUsed[recipe.building] >= maxUse:
+				break
+			buildingsUsed[recipe.building] += 1
+		if recipe not in recipesUsed:
+			recipesUsed[recipe] = 1
+		else:
+			recipesUsed[recipe] += 1
+		for recipeMaterial in recipe.inputs.values():
+			resourcesAvailable[recipeMaterial.material] -= recipeMaterial.amount
+		for recipeMaterial in recipe.outputs.values():
+			if recipeMaterial.material not in resourcesAvailable:
+				resourcesAvailable[recipeMaterial.material] = 0
+			resourcesAvailable[recipeMaterial.material] += recipeMaterial.amount
+		producedAnything = True
+		if not produceAll:
+			break
+	return producedAnything
+
+
+@pytest.fixture
+def prUnStuff():
+	prUnStuff = PrUnStuff.PrUnStuff("key")
+	prUnStuff.fio.api = MemoryApi()
+	return prUnStuff
+
+
+def buildings(fio, recipes: list[tuple[str, str, dict[str, int], dict[str, int]]]) -> dict[str, Building]:
+	""":param recipes: Each recipe's name, building ticker, inputs and outputs"""
+	byBuilding = {}
+	for name, buildingTicker, inputs, outputs in recipes:
+		byBuilding.setdefault(buildingTicker, []).append(recipeJson(name, buildingTicker, inputs, outputs))
+	return {ticker: Building(buildingJson(ticker, {}, recipeJsons), fio) for ticker, recipeJsons in byBuilding.items()}
+
+
+def produceAll(produce, recipe, resourcesAvailable: dict, buildingUseLimits: dict, requirementsRecipes: dict):
+	resources, recipesUsed, buildingsUsed = dict(resourcesAvailable), {}, {}
+	produced = produce(
+		recipe, resources, produceAll=True, buildingUseLimits=buildingUseLimits,
+		requirementsRecipes=requirementsRecipes, recipesUsed=recipesUsed, buildingsUsed=buildingsUsed
+	)
+	return produced, resources, recipesUsed, buildingsUsed
+
+
+def randomChain(fio, rnd: random.Random):
+	"""
+	Recipes that each take some raw materials and what the ones before made, sometimes with a byproduct, or also making an earlier recipe's output
+	:return: The recipe to make, it's requirements recipes, the stockpile and limits for some of the buildings
+	"""
+	tickers = [f"R{i}" for i in range(4)]
+	recipes = []
+	for i in range(rnd.randint(1, 6)):
+		inputs = {ticker: rnd.randint(1, 5) for ticker in rnd.sample(tickers, rnd.randint(1, 3))}
+		outputs = {f"I{i}": rnd.randint(1, 12)}
+		if rnd.random() < 0.15:
+			outputs[f"X{i}"] = rnd.randint(1, 3)
+		made = [ticker for ticker in tickers if ticker.startswith("I")]
+		if len(made) > 0 and rnd.random() < 0.1:
+			# A second producer, only the first one is asked for it
+			outputs[rnd.choice(made)] = 2
+		recipes.append((f"r{i}", rnd.choice("ABC"), inputs, outputs))
+		tickers.extend(ticker for ticker in outputs if ticker not in tickers)
+	recipes.append(("target", rnd.choice("ABCD"), {ticker: rnd.randint(1, 5) for ticker in rnd.sample(tickers, rnd.randint(1, 3))}, {"T": 1}))
+	built = buildings(fio, recipes)
+	byName = {name: built[buildingTicker].recipes[name] for name, buildingTicker, _, _ in recipes}
+	requirementsRecipes = {}
+	for name, _, _, outputs in recipes[:-1]:
+		for ticker in outputs:
+			requirementsRecipes.setdefault(fio.getMaterial(ticker), byName[name])
+	resourcesAvailable = {fio.getMaterial(ticker): rnd.randint(0, 300) for ticker in tickers}
+	resourcesAvailable[fio.getMaterial("T")] = 0
+	# A limit of 0 still lets the building be used once, like the old loop did
+	buildingUseLimits = {building: rnd.choice([0, 1, rnd.randint(2, 60)]) for building in built.values() if rnd.random() < 0.5}
+	return byName["target"], requirementsRecipes, resourcesAvailable, buildingUseLimits
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_sameAsOneCraftAtATime(prUnStuff, seed):
+	recipe, requirementsRecipes, resourcesAvailable, buildingUseLimits = randomChain(prUnStuff.fio, random.Random(seed))
+	expected = produceAll(oneCraftAtATime, recipe, resourcesAvailable, buildingUseLimits, requirementsRecipes)
+	assert produceAll(prUnStuff.sim_produceRecipe, recipe, resourcesAvailable, buildingUseLimits, requirementsRecipes) == expected
+
+
+def test_solvedInBatches(prUnStuff):
+	fio = prUnStuff.fio
+	built = buildings(fio, [
+		("2xH2O = 4xHCP", "FRM", {"H2O": 2}, {"HCP": 4}),
+		("1xH2O = 4xGRN", "FRM", {"H2O": 1}, {"GRN": 4}),
+		("4xH2O = 12xMAI", "FRM", {"H2O": 4}, {"MAI": 12}),
+		("4xHCP 2xGRN 2xMAI = 4xC", "INC", {"HCP": 4, "GRN": 2, "MAI": 2}, {"C": 4})
+	])
+	recipe = built["INC"].recipes["4xHCP 2xGRN 2xMAI = 4xC"]
+	requirementsRecipes = {material: frmRecipe for frmRecipe in built["FRM"].recipes.values() for material in frmRecipe.outputs}
+	resourcesAvailable = {fio.getMaterial(ticker): 0 for ticker in ("HCP", "GRN", "MAI", "C")}
+	resourcesAvailable[fio.getMaterial("H2O")] = 100000
+	crafts = solveProduction(recipe, resourcesAvailable, requirementsRecipes, {}, {})
+	assert crafts is not None
+	# Each C takes 2xH2O for HCP, 1/2xH2O for GRN and 2/3xH2O for MAI, per 4 C
+	assert crafts[recipe] == 31578
+	expected = produceAll(oneCraftAtATime, recipe, resourcesAvailable, {built["FRM"]: 50000}, requirementsRecipes)
+	assert produceAll(prUnStuff.sim_produceRecipe, recipe, resourcesAvailable, {built["FRM"]: 50000}, requirementsRecipes) == expected
@@ -0,0 +1,141 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import PrUnStuff
+from PrUnStuff.FIO import Storage
+from PrUnStuff.FIO.Building import Building
+from PrUnStuff.FIO.RecipeGraph import RecipeGraph
+from conftest import MemoryApi
+from payloads import buildingJson, recipeJson, storageJson
+
+
+@pytest.fixture
+def prUnStuff():
+	prUnStuff = PrUnStuff.PrUnStuff("key")
+	prUnStuff.fio.api = MemoryApi()
+	return prUnStuff
+
+
+@pytest.fixture
+def fio(prUnStuff):
+	return prUnStuff.fio
+
+
+def building(fio, ticker: str, *recipes: tuple[dict[str, int], dict[str, int]]) -> Building:
+	""":param recipes: Each recipe's inputs and outputs, by ticker"""
+	return Building(buildingJson(ticker, {}, [
+		recipeJson(f"{ticker} {' '.join(inputs)} = {' '.join(outputs)}", ticker, inputs, outputs) for inputs, outputs in recipes
+	]), fio)
+
+
+def graph(*buildings: Building) -> RecipeGraph:
+	return RecipeGraph(recipe for building in buildings for recipe in building.recipes.values())
+
+
+def tickers(materials) -> list[str]:
+	return [material.ticker for material in materials]
+
+
+def test_selfCycle(fio):
+	recipes = graph(building(fio, "FRM", ({"SEED": 1, "H2O": 1}, {"SEED": 2}), ({"SEED": 1}, {"GRN": 4})))
+	assert [tickers(cycle) for cycle in recipes.findCycles()] == [["SEED"]]
+	assert tickers(recipes.getRequiredMaterials(fio.getMaterial("GRN"))) == ["SEED", "H2O"]
+	assert tickers(recipes.getRequiredMaterials(fio.getMaterial("SEED"))) == ["SEED", "H2O"]
+	# A recipe making some of it's own input doesn't have to wait on itself
+	assert [recipe.recipeName for recipe in recipes.topologicalOrder()] == ["FRM SEED H2O = SEED", "FRM SEED = GRN"]
+
+
+def test_cycleThroughManyRecipes(fio):
+	recipes = graph(
+		building(fio, "SME", ({"AAA": 1}, {"BBB": 1}), ({"BBB": 1}, {"CCC": 1})),
+		building(fio, "REF", ({"CCC": 1, "ORE": 1}, {"AAA": 2}), ({"AAA": 1}, {"OUT": 1}))
+	)
+	assert [sorted(tickers(cycle)) for cycle in recipes.findCycles()] == [["AAA", "BBB", "CCC"]]
+	assert recipes.hasCycles
+	assert sorted(tickers(recipes.getRequiredMaterials(fio.getMaterial("OUT")))) == ["AAA", "BBB", "CCC", "ORE"]
+	with pytest.raises(Exception, match="cycle"):
+		recipes.topologicalOrder()
+
+
+def test_diamond(fio):
+	recipes = graph(
+		building(fio, "REF", ({"ORE": 2}, {"XXX": 1}), ({"ORE": 1}, {"YYY": 1})),
+		building(fio, "ASM", ({"XXX": 1, "YYY": 1}, {"ZZZ": 1}))
+	)
+	ore, zzz = fio.getMaterial("ORE"), fio.getMaterial("ZZZ")
+	assert recipes.findCycles() == []
+	assert not recipes.hasCycles
+	# ORE is on both sides, it's only there once
+	assert tickers(recipes.getRequiredMaterials(zzz)) == ["XXX", "YYY", "ORE"]
+	assert recipes.getRequiredMaterials(ore) == []
+	assert [recipe.recipeName for recipe in recipes.getConsumers(ore)] == ["REF ORE = XXX", "REF ORE = YYY"]
+	assert [recipe.recipeName for recipe in recipes.getProducers(zzz)] == ["ASM XXX YYY = ZZZ"]
+	assert [recipe.recipeName for recipe in recipes.topologicalOrder()][-1] == "ASM XXX YYY = ZZZ"
+	assert tickers(recipes.materials) == ["XXX", "YYY", "ZZZ", "ORE"]
+
+
+def test_topologicalOrder(fio):
+	rnd = random.Random(0)
+	tiers = [[f"T{tier}{i}" for i in range(4)] for tier in range(5)]
+	recipes = graph(*[
+		building(fio, f"B{tier}", *[({rnd.choice(tiers[tier - 1]): 1 for _ in range(2)}, {ticker: 1}) for ticker in tiers[tier]])
+		for tier in range(1, len(tiers))
+	])
+	order = recipes.topologicalOrder()
+	assert len(order) == len(recipes)
+	for i, recipe in enumerate(order):
+		for material in recipe.inputs:
+			assert all(order.index(producer) < i for producer in recipes.getProducers(material))
+
+
+def recursiveAvailableResources(site, storage, recipe, resourcesAvailable: dict):
+	"""The old `getAvailableResourcesForRecipe()`, which follows every recipe again each time it's reached, and never stops on a cycle"""
+	for requirement in recipe.inputs.values():
+		resourcesAvailable[requirement.material] = storage.getItemAmount(requirement.material)
+		for siteBuilding in site.buildings:
+			for siteRecipe in siteBuilding.building.recipes.values():
+				if siteRecipe.isMaterialOutput(requirement.material):
+					recursiveAvailableResources(site, storage, siteRecipe, resourcesAvailable)
+	return resourcesAvailable
+
+
+def useSite(prUnStuff, monkeypatch, buildings: list[Building], items: dict[str, int]):
+	site = SimpleNamespace(buildings=[SimpleNamespace(building=siteBuilding) for siteBuilding in buildings])
+	storage = Storage(storageJson("base", items), prUnStuff.fio, "user")
+	monkeypatch.setattr(prUnStuff.fio, "getMySite", lambda planet: site)
+	monkeypatch.setattr(prUnStuff.fio, "getMyStorage", lambda planet: storage)
+	return site, storage
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_availableResourcesForRecipe(prUnStuff, monkeypatch, seed):
+	rnd = random.Random(seed)
+	fio = prUnStuff.fio
+	# Each tier is made from the ones before it, so there are no cycles for the old way to get stuck on
+	tiers = [[f"T{tier}{i}" for i in range(3)] for tier in range(4)]
+	buildings = [
+		building(fio, f"B{tier}", *[
+			({rnd.choice([ticker for earlier in tiers[:tier] for ticker in earlier]): rnd.randint(1, 3) for _ in range(rnd.randint(1, 3))}, {ticker: 1})
+			for ticker in tiers[tier] if rnd.random() < 0.8
+		])
+		for tier in range(1, len(tiers))
+	]
+	site, storage = useSite(prUnStuff, monkeypatch, buildings, {ticker: rnd.randint(0, 50) for tier in tiers for ticker in tier if rnd.random() < 0.7})
+	# The recipe being made doesn't have to be on the site
+	recipe = building(fio, "TOP", ({ticker: 1 for ticker in rnd.sample(tiers[-1] + tiers[-2], 3)}, {"TOP": 1})).recipes.popitem()[1]
+	planet = SimpleNamespace(planetId="planet")
+	assert prUnStuff.getAvailableResourcesForRecipe(planet, recipe) == recursiveAvailableResources(site, storage, recipe, {})
+	resourcesAvailable = {fio.getMaterial("OTHER"): 5}
+	assert prUnStuff.getAvailableResourcesForRecipe(planet, recipe, resourcesAvailable) is resourcesAvailable
+	assert resourcesAvailable[fio.getMaterial("OTHER")] == 5
+
+
+def test_availableResourcesThroughCycle(prUnStuff, monkeypatch):
+	fio = prUnStuff.fio
+	farm = building(fio, "FRM", ({"SEED": 1, "H2O": 1}, {"SEED": 2}), ({"SEED": 1}, {"GRN": 4}))
+	food = building(fio, "FP", ({"GRN": 2}, {"RAT": 1}))
+	useSite(prUnStuff, monkeypatch, [farm, food], {"SEED": 3, "GRN": 7})
+	resources = prUnStuff.getAvailableResourcesForRecipe(SimpleNamespace(planetId="planet"), food.recipes["FP GRN = RAT"])
+	assert {material.ticker: amount for material, amount in resources.items()} == {"GRN": 7, "SEED": 3, "H2O": 0}
@@ -0,0 +1,87 @@
+import heapq
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from PrUnStuff.FIO import FIO, System
+from PrUnStuff.FIO.SystemIndex import SystemIndex
+from payloads import systemJson
+
+
+def position(system: System):
+	return system.positionX, system.positionY, system.positionZ
+
+
+def bruteNearest(systems: list[System], center, k: int, predicate=None):
+	return heapq.nsmallest(k, ((math.dist(center, position(system)), system.systemId) for system in systems if predicate is None or predicate(system)))
+
+
+def distances(found: list[tuple[System, float]]):
+	"""Systems the same distance away may come in either order"""
+	return sorted((round(distance, 9), system.systemId) for system, distance in found)
+
+
+@pytest.fixture
+def fio():
+	return FIO("key")
+
+
+@pytest.fixture
+def systems(fio):
+	rnd = random.Random(0)
+	return [System(systemJson(f"S{i}", (rnd.uniform(-100, 100), rnd.uniform(-100, 100), rnd.uniform(-10, 10))), fio) for i in range(500)]
+
+
+@pytest.fixture
+def systemIndex(fio, systems):
+	return SystemIndex(systems, fio)
+
+
+def hasExchange(system: System):
+	return int(system.systemId[1:]) % 97 == 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matchesBruteForce(systems, systemIndex, seed):
+	rnd = random.Random(seed)
+	center = (rnd.uniform(-120, 120), rnd.uniform(-120, 120), rnd.uniform(-20, 20))
+	radius = rnd.uniform(0, 60)
+	expected = sorted((round(math.dist(center, position(system)), 9), system.systemId) for system in systems if math.dist(center, position(system)) <= radius)
+	assert distances(systemIndex.withinRadius(center, radius)) == expected
+	# Closest first
+	found = [distance for _, distance in systemIndex.withinRadius(center, radius)]
+	assert found == sorted(found)
+
+	k = rnd.randint(0, 12)
+	expected = [(round(distance, 9), systemId) for distance, systemId in bruteNearest(systems, center, k)]
+	assert distances(systemIndex.nearest(center, k)) == sorted(expected)
+	expected = sorted((round(distance, 9), systemId) for distance, systemId in bruteNearest(systems, center, k, hasExchange))
+	assert distances(systemIndex.nearest(center, k, hasExchange)) == expected
+	assert distances(systemIndex.where(hasExchange).nearest(center, k)) == expected
+
+	low = tuple(c - rnd.uniform(0, 50) for c in center)
+	high = tuple(c + rnd.uniform(0, 50) for c in center)
+	expected = sorted(system.systemId for system in systems if all(low[a] <= p <= high[a] for a, p in enumerate(position(system))))
+	assert sorted(system.systemId for system in systemIndex.inBox(low, high)) == expected
+
+
+def test_filteredSearches(monkeypatch, fio, systems, systemIndex):
+	exchanges = {f"X{system.systemId}": SimpleNamespace(comexCode=f"X{system.systemId}", systemId=system.systemId) for system in systems if hasExchange(system)}
+	planets = [SimpleNamespace(planetNaturalId=f"{system.systemId}a", systemId=system.systemId, hasShipyard=int(system.systemId[1:]) % 41 == 0) for system in systems]
+	monkeypatch.setattr(fio, "getExchanges", lambda: exchanges)
+	monkeypatch.setattr(fio, "getAllPlanets", lambda: planets)
+	center = (3.0, -7.0, 1.0)
+
+	expected = [round(distance, 9) for distance, _ in bruteNearest(systems, center, 3, hasExchange)]
+	assert [round(distance, 9) for _, distance in systemIndex.nearestExchanges(center, 3)] == expected
+	hasShipyard = lambda system: int(system.systemId[1:]) % 41 == 0
+	expected = [f"{systemId}a" for _, systemId in bruteNearest(systems, center, 4, hasShipyard)]
+	assert [planet.planetNaturalId for planet, _ in systemIndex.nearestPlanets(center, 4, hasShipyard=True)] == expected
+	# The filtered trees are only built once
+	assert set(systemIndex._filteredRoots) == {("exchanges",), ("planets", (("hasShipyard", True),))}
+	# With a predicate as well as the flags
+	odd = lambda planet: int(planet.systemId[1:]) % 2 == 1
+	expected = [f"{systemId}a" for _, systemId in bruteNearest(systems, center, 2, lambda system: hasShipyard(system) and int(system.systemId[1:]) % 2 == 1)]
+	assert [planet.planetNaturalId for planet, _ in systemIndex.nearestPlanets(center, 2, odd, hasShipyard=True)] == expected
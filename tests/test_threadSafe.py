@@ -0,0 +1,144 @@
+import random
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from PrUnStuff.FIO import FIO, Material, Building, Exchange, MaterialExchange, System
+from payloads import materialJson, exchangeJson, exchangeSummaryJson, exchangeStationJson, systemJson, buildingJson, recipeJson
+
+TICKERS = [f"M{i}" for i in range(12)]
+EXCHANGES = ["AI1", "CI1", "IC1", "NC1"]
+SYSTEMS = [f"S{i}" for i in range(8)]
+BUILDINGS = ["B0", "B1", "B2"]
+THREADS = 32
+
+
+def addUniverse(stubApi):
+	materials = [materialJson(ticker) for ticker in TICKERS]
+	stubApi.responses["/material/allmaterials"] = materials
+	for material in materials:
+		stubApi.responses[f"/material/{material['Ticker']}"] = material
+	stubApi.responses["/exchange/station"] = [exchangeStationJson(exchangeCode) for exchangeCode in EXCHANGES]
+	for ticker in TICKERS:
+		for exchangeCode in EXCHANGES:
+			stubApi.responses[f"/exchange/{ticker}.{exchangeCode}"] = exchangeJson(ticker, exchangeCode, bids=[(9.0, 10), (8.0, 20)], asks=[(11.0, 10), (12.0, None)])
+	stubApi.responses["/systemstars"] = [systemJson(systemId, (i, 0, 0), [SYSTEMS[i - 1]] if i > 0 else []) for i, systemId in enumerate(SYSTEMS)]
+	for systemId in SYSTEMS:
+		stubApi.responses[f"/systemstars/star/{systemId}"] = {"Luminosity": 1.0, "Mass": 2.0, "MassSol": 3.0}
+	buildings = [
+		buildingJson(ticker, {TICKERS[i]: 4}, [recipeJson(f"{ticker}: 1x{TICKERS[i]} = 2x{TICKERS[i + 1]}", ticker, {TICKERS[i]: 1}, {TICKERS[i + 1]: 2})])
+		for i, ticker in enumerate(BUILDINGS)
+	]
+	stubApi.responses["/building/allbuildings"] = buildings
+	for building in buildings:
+		stubApi.responses[f"/building/{building['Ticker']}"] = building
+
+
+def countConstructed(monkeypatch, cls, key: str) -> Counter:
+	"""Counts each `cls` created, by `key` of the json it was created from"""
+	counts = Counter()
+	lock = threading.Lock()
+	init = cls.__init__
+
+	def countingInit(self, json, *args, **kwargs):
+		with lock:
+			counts[json[key]] += 1
+		init(self, json, *args, **kwargs)
+	monkeypatch.setattr(cls, "__init__", countingInit)
+	return counts
+
+
+def hammer(jobs: dict[str, callable], rounds: int, seed: int) -> dict[str, list]:
+	"""Runs every job `rounds` times on each of `THREADS` threads at once, in a different order on each thread"""
+	start = threading.Barrier(THREADS)
+
+	def worker(workerIndex: int):
+		rnd = random.Random(seed * THREADS + workerIndex)
+		start.wait()
+		results = []
+		for _ in range(rounds):
+			names = list(jobs)
+			rnd.shuffle(names)
+			results.extend((name, jobs[name]()) for name in names)
+		return results
+
+	results = defaultdict(list)
+	with ThreadPoolExecutor(THREADS) as pool:
+		for workerResults in pool.map(worker, range(THREADS)):
+			for name, result in workerResults:
+				results[name].append(result)
+	return results
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sharedFioBuildsEachObjectOnce(stubApi, monkeypatch, seed):
+	addUniverse(stubApi)
+	stubApi.delay = 0.002
+	materials = countConstructed(monkeypatch, Material, "Ticker")
+	buildings = countConstructed(monkeypatch, Building, "Ticker")
+	exchanges = countConstructed(monkeypatch, Exchange, "ComexCode")
+	systems = countConstructed(monkeypatch, System, "SystemId")
+	materialExchanges = countConstructed(monkeypatch, MaterialExchange, "CXDataModelId")
+	fio = FIO("key", threadSafe=True)
+
+	jobs = {
+		"allMaterials": fio.getAllMaterials,
+		"allBuildings": fio.getAllBuildings,
+		"exchanges": fio.getExchanges,
+		"systems": fio.getSystems,
+		"recipeGraph": fio.getRecipeGraph,
+	}
+	for ticker in TICKERS[::3]:
+		jobs[f"material {ticker}"] = lambda ticker=ticker: fio.getMaterial(ticker)
+		jobs[f"materialExchange {ticker}"] = lambda ticker=ticker: fio.getMaterialExchange(ticker, "IC1")
+	for ticker in BUILDINGS:
+		jobs[f"building {ticker}"] = lambda ticker=ticker: fio.getBuilding(ticker)
+	for exchangeCode in EXCHANGES:
+		jobs[f"exchange {exchangeCode}"] = lambda exchangeCode=exchangeCode: fio.getExchange(exchangeCode)
+	for systemId in SYSTEMS[::2]:
+		jobs[f"system {systemId}"] = lambda systemId=systemId: fio.getSystem(systemId)
+	results = hammer(jobs, 3, seed)
+
+	# Every thread got the same cached object
+	for name, values in results.items():
+		assert len(values) == THREADS * 3
+		assert all(value is values[0] for value in values), name
+	# And each was only built once
+	assert set(materials) == set(TICKERS) and max(materials.values()) == 1
+	assert set(buildings) == set(BUILDINGS) and max(buildings.values()) == 1
+	assert set(exchanges) == set(EXCHANGES) and max(exchanges.values()) == 1
+	assert set(systems) == set(SYSTEMS) and max(systems.values()) == 1
+	assert max(materialExchanges.values()) == 1
+	# Nothing was fetched twice either
+	assert max(stubApi.calls.values()) == 1
+
+
+def test_lazyFieldsAreLoadedOnce(stubApi):
+	addUniverse(stubApi)
+	stubApi.delay = 0.002
+	fio = FIO("key", threadSafe=True)
+	fio.getAllMaterials()
+	# Created without it's orders, so the first thread to ask has to load them
+	materialExchange = MaterialExchange(exchangeSummaryJson(stubApi.responses["/exchange/M1.IC1"]), fio)
+	system = fio.getSystem("S2")
+	results = hammer({
+		"sellingOrders": lambda: materialExchange.sellingOrders,
+		"buyingOrders": lambda: materialExchange.buyingOrders,
+		"askBook": lambda: materialExchange.askBook.limitedDepth,
+		"price": lambda: materialExchange.price,
+		"luminosity": lambda: system.luminosity,
+		"mass": lambda: system.mass,
+		"massSol": lambda: system.massSol,
+	}, 2, 0)
+
+	assert stubApi.calls["/exchange/M1.IC1"] == 1
+	assert stubApi.calls["/systemstars/star/S2"] == 1
+	for name in ("sellingOrders", "buyingOrders"):
+		assert all(orders is results[name][0] for orders in results[name]), name
+	assert len(results["sellingOrders"][0]) == 2
+	assert set(results["price"]) == {1.0}
+	assert set(results["luminosity"]) == {1.0}
+	assert set(results["mass"]) == {2.0}
+	assert set(results["massSol"]) == {3.0}
@@ -0,0 +1,28 @@
+from PrUnStuff.FIO import FIO
+from payloads import materialJson, exchangeJson, exchangeSummaryJson, exchangeStationJson
+
+EXCHANGES = ["AI1", "IC1"]
+
+
+def addExchanges(stubApi):
+	entries = [
+		exchangeJson("RAT", "AI1", bids=[(80.0, 10)], asks=[(95.0, 10)]),
+		exchangeJson("RAT", "IC1", bids=[(90.0, 10)], asks=[(100.0, 10), (110.0, 5)])
+	]
+	stubApi.responses["/material/RAT"] = materialJson("RAT")
+	stubApi.responses["/exchange/station"] = [exchangeStationJson(exchangeCode) for exchangeCode in EXCHANGES]
+	stubApi.responses["/exchange/all"] = [exchangeSummaryJson(entry) for entry in entries]
+	for entry in entries:
+		stubApi.responses[f"/exchange/RAT.{entry['ExchangeCode']}"] = entry
+
+
+def test_seedingKeepsTheOrders(stubApi):
+	addExchanges(stubApi)
+	fio = FIO("key")
+	topOfBookIndex = fio.getTopOfBookIndex()
+	assert (topOfBookIndex.bestBid("RAT").exchangeCode, topOfBookIndex.bestAsk("RAT").exchangeCode) == ("IC1", "AI1")
+	# `exchangeall()` used to replace `exchange()`'s cached entry, orders and all, with it's own
+	materialExchange = fio.getMaterialExchange("RAT", "IC1")
+	assert [order.itemCost for order in materialExchange.sellingOrders] == [110.0, 100.0]
+	assert materialExchange.askBook is not None
+	assert stubApi.calls["/exchange/RAT.IC1"] == 1